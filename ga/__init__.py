@@ -1 +1,15 @@
-__all__ = ["genes", "chromosomes", "translators", "algorithms", "util", "examples"]from . import genesfrom . import chromosomesfrom . import translatorsfrom . import algorithmsfrom . import utilfrom . import examples
\ No newline at end of file
+import importlib
+
+__all__ = ["genes", "chromosomes", "translators", "algorithms", "util", "stopping", "multiobjective", "evaluators", "local_search", "serialization", "initialization", "metrics", "batched", "kernels", "surrogate", "noise", "cellular", "speciation", "examples"]
+
+
+def __getattr__(name):
+    # submodules are imported on first use, so ``import ga`` stays cheap for
+    # short-lived worker processes that only need a few of them
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,11 @@
 import abc
-import random
+import heapq
 import time
 
 from .chromosomes import Chromosome
-from .util import weighted_choice, compute_fitness_cdf
+from .kernels import survival_mask
+from .stopping import BaseStoppingCriterion, AnyOf
+from .util import EliteArchive, make_rng, weighted_choice, compute_fitness_cdf
 
 
 class BaseGeneticAlgorithm(abc.ABC):
@@ -12,7 +14,8 @@ class BaseGeneticAlgorithm(abc.ABC):
     
     Subclasses must override the ``eval_fitness`` method.
     """
-    def __init__(self, chromosomes, translator=None, abs_fit_weight=0.25, rel_fit_weight=0.75):
+    def __init__(self, chromosomes, translator=None, abs_fit_weight=0.25, rel_fit_weight=0.75, rng=None,
+                 surrogate=None, noise=None, speciation=None):
         """
         Construct a new ``BaseGeneticAlgorithm`` instance.
         
@@ -39,17 +42,38 @@ class BaseGeneticAlgorithm(abc.ABC):
           Think of this as "competitive" pressure where even bad solutions which are relatively
           better get an relative advantage.
           
+        rng (default=None):  random number generator used for every stochastic step of a run
+                             (competition, reproduction, crossover and mutation);
+                             an int seed or ``random.Random`` instance, defaults to the ``random`` module.
+                             Use ``util.spawn_rngs`` to derive independent generators for parallel runs.
+                             
+        surrogate (default=None):  ``surrogate.KNNSurrogate`` that screens each batch of uncached chromosomes
+                                   in ``evaluate``, so only the most promising ones are evaluated for real
+                                   
+        noise (default=None):  ``noise.NoisyFitness`` for stochastic fitness functions; fitness becomes the mean
+                               of repeated ``eval_fitness`` samples, with extra samples only where ranks are uncertain
+                               
+        speciation (default=None):  ``speciation.Speciation`` that clusters the population into species before
+                                    competition, for shared fitness (see ``selection_fitness``) and per-species elitism
+          
         Asserts that (abs_fit_weight + rel_fit_weight) equals 1.
         """
         assert all(isinstance(c, Chromosome) for c in chromosomes)
         assert 0 <= abs_fit_weight <= 1
         assert 0 <= rel_fit_weight <= 1
         assert abs_fit_weight + rel_fit_weight == 1
+        assert surrogate is None or noise is None
         
         self.chromosomes = chromosomes
         self.translator = translator
         self.abs_fit_weight = abs_fit_weight
         self.rel_fit_weight = rel_fit_weight
+        self.rng = make_rng(rng)
+        self.surrogate = surrogate
+        self.noise = noise
+        self.speciation = speciation
+        # with speciation, the surviving copy of each species elite, kept unchanged for a generation (see ``compete``)
+        self.species_elites = []
         
         self.orig_pop_size = len(self.chromosomes)
         self.min_fit_ever = None
@@ -57,13 +81,25 @@ class BaseGeneticAlgorithm(abc.ABC):
 
         # maps chromosome -> fitness
         self.fitness_cache = {}
+        # maps cache key -> fitness, for chromosomes whose cache key is not their DNA (see ``cache_key``)
+        self.phenotype_cache = {}
+        self.num_evaluations = 0
+        self.num_cache_hits = 0
+        
+        # interned DNA snapshots, so each distinct solution in the run history is stored once
+        self._dna_snapshots = {}
         
-        # run results
+        # run results; solutions are stored as DNA snapshots (see ``chromosome_from_dna``)
+        self.elites = EliteArchive()
         self.generation_fittest = {}
         self.generation_fittest_fit = {}
         self.overall_fittest_fit = {}
         self.new_fittest_generations = []
         self.run_time_s = None
+        self.stopped_by = None
+        
+        # cumulative seconds spent in each phase of a generation during the last run
+        self.phase_time_s = {}
 
     @abc.abstractmethod
     def eval_fitness(self, chromosome):
@@ -74,16 +110,139 @@ class BaseGeneticAlgorithm(abc.ABC):
         """
         pass
 
+    def eval_fitness_batch(self, chromosomes):
+        """
+        Evaluate the fitness scores for several chromosomes at once.
+        Does not use caching.
+        
+        Override this for problems that can score a whole population faster than
+        one chromosome at a time (vectorized lookups, external programs, worker processes).
+        
+        return:  list of fitness values, in the same order as ``chromosomes``
+        """
+        return [self.eval_fitness(c) for c in chromosomes]
+        
+    def evaluate(self, chromosomes):
+        """
+        Make sure the fitness of every chromosome is cached, evaluating all uncached
+        chromosomes with a single ``eval_fitness_batch`` call.
+        
+        With a ``surrogate``, uncached chromosomes are screened by it instead, and only
+        the ones it selects are evaluated for real (see ``surrogate.KNNSurrogate.screen``).
+        With ``noise``, a population with any uncached chromosome is sampled and raced as a whole
+        (see ``noise.NoisyFitness.evaluate``).
+        
+        Without ``noise``, uncached chromosomes that share a cache key (see ``cache_key``)
+        with an evaluated chromosome, or with each other, are only evaluated once.
+        """
+        pending = {}
+        for chromosome in chromosomes:
+            dna = chromosome.dna
+            if dna not in self.fitness_cache and dna not in pending:
+                pending[dna] = chromosome
+                
+        if pending and self.noise is not None:
+            self.num_cache_hits += len(chromosomes) - len(pending)
+            self.noise.evaluate(self, chromosomes)
+            return
+        
+        keys, unknown = self._cache_keys(pending)
+        self.num_cache_hits += len(chromosomes) - len(unknown)
+        
+        if unknown and self.surrogate is not None:
+            fitness = self.surrogate.screen(self, list(unknown.values()))
+        elif unknown:
+            fitness = self.eval_fitness_batch(list(unknown.values()))
+            self.num_evaluations += len(unknown)
+        else:
+            fitness = []
+            
+        self._cache_fitness(keys, unknown, fitness)
+            
+    def _cache_keys(self, pending):
+        """
+        Look up the cache keys (see ``cache_key``) of chromosomes missing from ``fitness_cache``.
+        
+        pending:  dict mapping DNA -> chromosome, for uncached chromosomes
+        
+        return:  dict mapping DNA -> cache key, for chromosomes whose cache key is not their DNA, and
+                 dict mapping each cache key without a known fitness -> 1 of its chromosomes
+        """
+        keys = {}
+        unknown = {}
+        
+        for dna, chromosome in pending.items():
+            key = self.cache_key(chromosome)
+            if key == dna:
+                unknown[dna] = chromosome
+                continue
+            
+            keys[dna] = key
+            if key not in self.phenotype_cache:
+                unknown.setdefault(key, chromosome)
+                
+        return keys, unknown
+        
+    def _cache_fitness(self, keys, unknown, fitness):
+        """
+        Cache newly evaluated fitness values, and share them with chromosomes with the same cache key.
+        
+        keys, unknown:  as returned by ``_cache_keys``
+        fitness:  fitness values of the chromosomes in ``unknown``, in the same order
+        """
+        for (key, chromosome), fit in zip(unknown.items(), fitness):
+            if key == chromosome.dna:
+                self.fitness_cache[key] = fit
+            else:
+                self.phenotype_cache[key] = fit
+                
+        for dna, key in keys.items():
+            self.fitness_cache[dna] = self.phenotype_cache[key]
+        
+    def cache_key(self, chromosome):
+        """
+        Return the key under which a chromosome's fitness is cached:  a hashable value that is equal
+        for chromosomes that always have the same fitness, such as chromosomes that decode to the same solution.
+        
+        The default asks the ``translator``, if there is one (see ``translators.BaseTranslator.cache_key``),
+        and otherwise the chromosome (see ``chromosomes.Chromosome.cache_key``), whose default is its DNA.
+        Override this when the fitness function has symmetries of its own, e.g. the
+        direction of a round trip. Keys are computed once per uncached DNA.
+        """
+        if self.translator is not None:
+            return self.translator.cache_key(chromosome)
+        return chromosome.cache_key()
+
     def get_fitness(self, chromosome):
         """ Get the fitness score for a chromosome, using the cached value if available. """
         fitness = self.fitness_cache.get(chromosome.dna)
 
-        if fitness is None:
-            fitness = self.eval_fitness(chromosome)
-            self.fitness_cache[chromosome.dna] = fitness
+        if fitness is None and self.noise is not None:
+            self.noise.evaluate(self, [chromosome])
+            fitness = self.fitness_cache[chromosome.dna]
+        elif fitness is None:
+            keys, unknown = self._cache_keys({chromosome.dna: chromosome})
+            fitness = [self.eval_fitness(c) for c in unknown.values()]
+            self.num_evaluations += len(fitness)
+            self._cache_fitness(keys, unknown, fitness)
+            fitness = self.fitness_cache[chromosome.dna]
 
         return fitness
             
+    def selection_fitness(self, chromosome):
+        """
+        Get the fitness score that competition and reproduction select by.
+        
+        This is the same as ``get_fitness``, except with ``speciation``, where it is the shared fitness
+        computed for the current population (see ``speciation.Speciation``).
+        """
+        if self.speciation is not None:
+            fitness = self.speciation.shared_fitness.get(chromosome.dna)
+            if fitness is not None:
+                return fitness
+                
+        return self.get_fitness(chromosome)
+            
     def get_fittest(self):
         """ Get the chromosome with the highest fitness score. """
         return max(self.chromosomes, key=self.get_fitness)
@@ -92,13 +251,55 @@ class BaseGeneticAlgorithm(abc.ABC):
         """ Get the chromosome with the lowest fitness score. """
         return min(self.chromosomes, key=self.get_fitness)
         
+    def get_weakest_indices(self, k=1, exclude=()):
+        """
+        Get the population indices of the ``k`` least fit chromosomes, weakest first,
+        without sorting the whole population.
+        
+        exclude (default=()):  chromosomes that are never returned (compared by identity)
+        """
+        indices = range(len(self.chromosomes))
+        if exclude:
+            excluded = {id(c) for c in exclude}
+            indices = [i for i in indices if id(self.chromosomes[i]) not in excluded]
+            if not indices:
+                return []
+            
+        if k == 1:
+            return [min(indices, key=lambda i: self.get_fitness(self.chromosomes[i]))]
+        return heapq.nsmallest(k, indices, key=lambda i: self.get_fitness(self.chromosomes[i]))
+        
+    def snapshot(self, chromosome):
+        """
+        Return an immutable snapshot of a chromosome's DNA.
+        Identical snapshots are interned, so history that repeats a solution costs only a reference.
+        """
+        dna = chromosome.dna
+        return self._dna_snapshots.setdefault(dna, dna)
+        
+    def chromosome_from_dna(self, dna):
+        """
+        Materialize a DNA snapshot as a new chromosome, using the current population as a template.
+        
+        dna:  DNA snapshot, e.g. from ``generation_fittest`` or ``elites``
+        
+        return:  new chromosome
+        """
+        chromosome = self.chromosomes[0].copy()
+        chromosome.dna = dna
+        return chromosome
+        
+    def get_generation_fittest(self, generation):
+        """ Return the fittest solution of a past generation of the last run, as a new chromosome. """
+        return self.chromosome_from_dna(self.generation_fittest[generation])
+        
     def sort(self, chromosomes):
         """ 
-        Sort a list of chromosomes into ascending order based on fitness score.
+        Sort a list of chromosomes into ascending order based on selection fitness (see ``selection_fitness``).
         
         chromosomes:  list of chromosomes to sort in-place
         """
-        chromosomes.sort(key=self.get_fitness)
+        chromosomes.sort(key=self.selection_fitness)
         
     def compete(self, chromosomes):
         """
@@ -110,35 +311,47 @@ class BaseGeneticAlgorithm(abc.ABC):
         ``rel_fit_weight`` attributes determine the degree to which overall and
         current fitness ranges affect the final survival probability.
         
+        With ``speciation``, the population is first clustered into species:  survival
+        probabilities come from shared fitness, and the fittest members of every species survive.
+        One surviving copy of each of them is recorded in ``species_elites``, which ``run`` keeps out of
+        mutation and elitist replacement, so these genomes are still in the population next generation.
+        
         return:  list of surviving chromosomes
         """
         # update overall fitness for this run
+        self.evaluate(chromosomes)
+        if self.speciation is not None:
+            self.speciation.assign(self, chromosomes)
         self.sort(chromosomes)
-        min_fit = self.get_fitness(chromosomes[0])
-        max_fit = self.get_fitness(chromosomes[-1])
+        fitness = [self.selection_fitness(c) for c in chromosomes]
+        min_fit = fitness[0]
+        max_fit = fitness[-1]
         
         if min_fit < self.min_fit_ever:
             self.min_fit_ever = min_fit
         if max_fit > self.max_fit_ever:
             self.max_fit_ever = max_fit
         
-        overall_fit_range = self.max_fit_ever - self.min_fit_ever  # "absolute" fitness range
-        current_fit_range = max_fit - min_fit                      # "relative" fitness range
-        
         # choose survivors based on relative fitness within overall fitness range
-        survivors = []
-        for chromosome in chromosomes:
-            fit = self.get_fitness(chromosome)
-            p_survival_absolute = (fit - self.min_fit_ever) / overall_fit_range if overall_fit_range != 0 else 1
-            p_survival_relative = (fit - min_fit) / current_fit_range if current_fit_range != 0 else 1
+        # a portion of each survival probability accounts for absolute overall fitness for all chromosomes
+        # ever encountered (environment-driven), the other portion accounts for relative fitness within
+        # the current population (competition-driven); see ``kernels.survival_mask``
+        rand = self.rng.random
+        rands = [rand() for _ in chromosomes]
+        alive = survival_mask(fitness, rands, self.min_fit_ever, self.max_fit_ever,
+                              self.abs_fit_weight, self.rel_fit_weight)
+        
+        if self.speciation is not None:
+            elites = self.speciation.elites(self, chromosomes)
+            alive = [survives or c.dna in elites for c, survives in zip(chromosomes, alive)]
             
-            # compute weighted average survival probability
-            # a portion accounts for absolute overall fitness for all chromosomes ever encountered (environment-driven)
-            # the other portion accounts for relative fitness within the current population (competition-driven)
-            p_survival = p_survival_absolute * self.abs_fit_weight + p_survival_relative * self.rel_fit_weight
-
-            if random.random() < p_survival:
-                survivors.append(chromosome)
+            kept = {}
+            for c in chromosomes:
+                if c.dna in elites:
+                    kept.setdefault(c.dna, c)
+            self.species_elites = list(kept.values())
+            
+        survivors = [c for c, survives in zip(chromosomes, alive) if survives]
 
         if not survivors:
             # rarely, nothing survives -- allow everyone to live
@@ -154,11 +367,15 @@ class BaseGeneticAlgorithm(abc.ABC):
         greater chance to be selected for reproduction.
         
         Genetic crossover events may occur for each offspring created.
-        Crossover mates are randomly selected from the pool of survivors.
+        Crossover mates are randomly selected from the pool of survivors
+        (from the survivors of the same species, with ``speciation``).
         Crossover points are randomly selected from the length of the crossed chromosomes.
         If crossover does not occur, an offspring is an exact copy of the selected survivor.
         Crossover only affects the DNA of the offspring, not the survivors/parents.
         
+        Offspring are copy-on-write copies (see ``Chromosome.copy``), so an offspring only
+        allocates its own genes once crossover or mutation actually writes to it.
+        
         survivors:  pool of parent chromosomes to reproduce from
         p_crossover:  probability in [0, 1] that a crossover event will
                       occur for each offspring
@@ -178,34 +395,41 @@ class BaseGeneticAlgorithm(abc.ABC):
         # weakest member gets p=0 but can be crossed-over with
         cdf = compute_fitness_cdf(survivors, self)
         
+        # with speciation, crossover mates come from the same species
+        groups = self.speciation.groups(survivors) if self.speciation is not None else None
+        
         offspring = []
         while num_survivors + len(offspring) < target_size:
             # pick a survivor to reproduce
-            c1 = weighted_choice(survivors, cdf).copy()
+            c1 = weighted_choice(survivors, cdf, rng=self.rng).copy()
             
             # crossover
-            if random.random() < p_crossover:
+            if self.rng.random() < p_crossover:
                 # randomly pick a crossover mate from survivors
                 # same chromosome can be c1 and c2
-                c2 = random.choice(survivors).copy()
-                point1 = random.randrange(0, c1.length)
-                point2 = random.randrange(point1 + 1, c1.length + 1) if two_point_crossover else None
-                c1.crossover(c2, point1, point2)
+                mates = survivors if groups is None else groups.get(self.speciation.species.get(c1.dna), survivors)
+                c2 = self.rng.choice(mates).copy()
+                point1 = self.rng.randrange(0, c1.length)
+                point2 = self.rng.randrange(point1 + 1, c1.length + 1) if two_point_crossover else None
+                c1.crossover(c2, point1, point2, rng=self.rng)
                 
             offspring.append(c1)
             
         return survivors + offspring
         
-    def mutate(self, chromosomes, p_mutate):
+    def mutate(self, chromosomes, p_mutate, exclude=()):
         """ 
         Call every chromosome's ``mutate`` method. 
         
         p_mutate:  probability of mutation in [0, 1]
+        exclude (default=()):  chromosomes left unchanged (compared by identity)
         """
         assert 0 <= p_mutate <= 1
         
+        excluded = {id(c) for c in exclude}
         for chromosome in chromosomes:
-            chromosome.mutate(p_mutate)
+            if id(chromosome) not in excluded:
+                chromosome.mutate(p_mutate, rng=self.rng)
             
     def refresh(self, chromosomes, p_mutate=0.5):
         """
@@ -216,8 +440,40 @@ class BaseGeneticAlgorithm(abc.ABC):
         """
         self.mutate(chromosomes, p_mutate)
         
+    def _time_phase(self, phase, since):
+        """ Add the time since ``since`` (a ``time.perf_counter`` value) to a phase's total; return the current time. """
+        now = time.perf_counter()
+        self.phase_time_s[phase] = self.phase_time_s.get(phase, 0.0) + now - since
+        return now
+        
+    def _start_run(self, stopping=None, local_search=None, metrics=None):
+        """
+        Reset the results of the previous run and start the objects plugged into this one
+        (stopping criteria, local search, surrogate, noise, speciation and metrics), for ``run``
+        and the ``run`` methods of other engines built on this class.
+        
+        return:  the stopping criterion, with a sequence of criteria combined by ``AnyOf``
+        """
+        if stopping is not None and not isinstance(stopping, BaseStoppingCriterion):
+            stopping = AnyOf(*stopping)
+            
+        self._dna_snapshots.clear()
+        self.generation_fittest.clear()
+        self.generation_fittest_fit.clear()
+        self.overall_fittest_fit.clear()
+        self.new_fittest_generations.clear()
+        self.stopped_by = None
+        self.phase_time_s = {}
+        self.species_elites = []
+        
+        for plugin in (stopping, local_search, self.surrogate, self.noise, self.speciation, metrics):
+            if plugin is not None:
+                plugin.start(self)
+                
+        return stopping
+        
     def run(self, generations, p_mutate, p_crossover, elitist=True, two_point_crossover=False,
-            refresh_after=None, quit_after=None):
+            refresh_after=None, quit_after=None, stopping=None, elite_size=1, local_search=None, metrics=None):
         """
         Run a standard genetic algorithm simulation for a set number
         of generations (iterations), each consisting of the following
@@ -226,19 +482,28 @@ class BaseGeneticAlgorithm(abc.ABC):
           1. competition/survival of the fittest (``compete`` method)
           2. reproduction (``reproduce`` method)
           3. mutation (``mutate`` method)
+          3a.  if a ``local_search`` operator is given and due, improve the fittest solutions in place
           4. check if the new population's fittest is fitter than the overall fittest
-          4a.  if not and the ``elitist`` option is active, replace the weakest solution
-               with the overall fittest
+          4a.  if not and the ``elitist`` option is active, replace the weakest solutions
+               with the fittest solutions of the run so far
         
         generations:  how many generations to run
         p_mutate:  probability of mutation in [0, 1]
         p_crossover:  probability in [0, 1] that a crossover event will occur for each offspring
-        elitist (default=True):  option to replace the weakest solution with the 
+        elitist (default=True):  option to replace the weakest solution(s) with the 
                                  strongest if a new one is not found each generation
         two_point_crossover (default=False):  whether 2-point crossover is used
         refresh_after:  number of generations since the last upset after which to randomly generate a new population
         quit_after:  number of generations since the last upset after which to stop the run, possibly before reaching
                      ``generations`` iterations
+        stopping (default=None):  ``stopping.BaseStoppingCriterion`` (or a sequence of them, any of which
+                                  may stop the run) checked at the end of each generation;
+                                  the criterion that stopped the run is stored in ``stopped_by``
+        elite_size (default=1):  number of fittest distinct solutions kept in the ``elites`` archive;
+                                 with ``elitist``, this many weakest solutions are replaced by them
+        local_search (default=None):  ``local_search.BaseLocalSearch`` operator that refines the fittest
+                                      solutions every few generations (a "memetic" GA)
+        metrics (default=None):  ``metrics.MetricsExporter`` that publishes live progress while the run is in progress
                                  
         return:  the overall fittest solution (chromosome)
         """
@@ -251,58 +516,97 @@ class BaseGeneticAlgorithm(abc.ABC):
         self.min_fit_ever =  1e999999999
         self.max_fit_ever = -1e999999999
         
-        self.generation_fittest.clear()
-        self.generation_fittest_fit.clear()
-        self.overall_fittest_fit.clear()
-        self.new_fittest_generations.clear()
-        
-        overall_fittest = self.get_fittest()
-        overall_fittest_fit = self.get_fitness(overall_fittest)
-        gens_since_upset = 0
-    
-        for gen in range(1, generations + 1):
-            survivors = self.compete(self.chromosomes)
-            self.chromosomes = self.reproduce(survivors, p_crossover, two_point_crossover=two_point_crossover)
-            self.mutate(self.chromosomes, p_mutate)
+        self.elites = EliteArchive(elite_size)
+        stopping = self._start_run(stopping=stopping, local_search=local_search, metrics=metrics)
+        
+        try:
+            self.evaluate(self.chromosomes)
+            overall_fittest = self.get_fittest().copy()
+            overall_fittest_fit = self.get_fitness(overall_fittest)
+            self.elites.offer(self.snapshot(overall_fittest), overall_fittest_fit)
+            gens_since_upset = 0
+        
+            for gen in range(1, generations + 1):
+                t = time.perf_counter()
+                survivors = self.compete(self.chromosomes)
+                t = self._time_phase('compete', t)
+                self.chromosomes = self.reproduce(survivors, p_crossover, two_point_crossover=two_point_crossover)
+                t = self._time_phase('reproduce', t)
+                self.mutate(self.chromosomes, p_mutate, exclude=self.species_elites)
+                t = self._time_phase('mutate', t)
+                self.evaluate(self.chromosomes)
+                t = self._time_phase('evaluate', t)
+            
+                if local_search is not None:
+                    local_search.apply(self, gen)
+                    t = self._time_phase('local_search', t)
                     
-            # check for new fittest
-            gen_fittest = self.get_fittest().copy()
-            gen_fittest_fit = self.get_fitness(gen_fittest)
+                # check for new fittest
+                if elite_size == 1:
+                    gen_elites = [self.get_fittest()]
+                else:
+                    gen_elites = heapq.nlargest(elite_size, self.chromosomes, key=self.get_fitness)
+                
+                gen_fittest_dna = self.snapshot(gen_elites[0])
+                gen_fittest_fit = self.get_fitness(gen_elites[0])
             
-            if gen_fittest_fit > overall_fittest_fit:
-                overall_fittest = gen_fittest
-                overall_fittest_fit = gen_fittest_fit
-                self.new_fittest_generations.append(gen)
-                gens_since_upset = 0
-            else:
-                gens_since_upset += 1
+                for chromosome in gen_elites:
+                    self.elites.offer(self.snapshot(chromosome), self.get_fitness(chromosome))
+            
+                if gen_fittest_fit > overall_fittest_fit:
+                    overall_fittest = self.chromosome_from_dna(gen_fittest_dna)
+                    overall_fittest_fit = gen_fittest_fit
+                    self.new_fittest_generations.append(gen)
+                    gens_since_upset = 0
+                else:
+                    gens_since_upset += 1
                 
-                if elitist:
-                    # no new fittest found, replace least fit with overall fittest
-                    self.sort(self.chromosomes)
-                    self.chromosomes[0].dna = overall_fittest.dna
+                    if elitist:
+                        # no new fittest found, replace least fit with the fittest found so far
+                        elite_dnas = self.elites.dnas
+                        weakest = self.get_weakest_indices(len(elite_dnas), exclude=self.species_elites)
+                        for idx, dna in zip(weakest, elite_dnas):
+                            self.chromosomes[idx].dna = dna
             
-            if quit_after and gens_since_upset >= quit_after:
-                print("quitting on generation", gen, "after", quit_after, "generations with no upset")
-                break
+                if quit_after and gens_since_upset >= quit_after:
+                    print("quitting on generation", gen, "after", quit_after, "generations with no upset")
+                    break
             
-            if refresh_after and gens_since_upset >= refresh_after:
-                # been a very long time since a new best solution -- mix things up
-                print("refreshing on generation", gen)
-                self.mutate(self.chromosomes, 0.5)
-                gens_since_upset = 0
+                if refresh_after and gens_since_upset >= refresh_after:
+                    # been a very long time since a new best solution -- mix things up
+                    print("refreshing on generation", gen)
+                    self.mutate(self.chromosomes, 0.5, exclude=self.species_elites)
+                    gens_since_upset = 0
                 
-            self.generation_fittest[gen] = gen_fittest
-            self.generation_fittest_fit[gen] = gen_fittest_fit
-            self.overall_fittest_fit[gen] = overall_fittest_fit
+                self.generation_fittest[gen] = gen_fittest_dna
+                self.generation_fittest_fit[gen] = gen_fittest_fit
+                self.overall_fittest_fit[gen] = overall_fittest_fit
+                self._time_phase('elitism', t)
+            
+                if metrics is not None:
+                    metrics.update(self, gen, start_time)
             
-            if self.should_terminate(overall_fittest):
-                break
+                if self.should_terminate(overall_fittest):
+                    break
+                
+                if stopping is not None and stopping.should_stop(self, gen, overall_fittest_fit):
+                    self.stopped_by = stopping
+                    print("stopping on generation", gen, "by", stopping)
+                    break
 
-            self.fitness_cache.clear()
+                self.fitness_cache.clear()
+                self.phenotype_cache.clear()
+        except BaseException:
+            if metrics is not None:
+                # the run failed:  also shut down the HTTP endpoint, releasing its port
+                metrics.close()
+            raise
             
         self.run_time_s = time.time() - start_time
         
+        if metrics is not None:
+            metrics.stop()
+        
         return overall_fittest
         
     def should_terminate(self, overall_fittest):
@@ -0,0 +1,336 @@
+import abc
+import math
+import time
+
+from .chromosomes import Chromosome
+from .genes import BinaryGene
+from .kernels import cdf_indices
+from .util import mutation_sites, spawn_rngs
+
+
+class BaseBatchedGeneticAlgorithm(abc.ABC):
+    """
+    Evolves many independent replicate runs of a binary-coded genetic algorithm at once,
+    e.g. to repeat a small experiment over hundreds of seeds.
+
+    The ``num_runs`` x ``pop_size`` x ``length`` population is stored as ``num_runs`` lists
+    of Python ints, one bitmask per chromosome, with the first DNA element in the highest bit.
+    Crossover and mutation are whole-chromosome bit operations instead of gene and chromosome
+    objects, every phase of a generation is applied to all runs in one pass, and the fitness of
+    all runs' populations is evaluated with a single ``eval_fitness_batch`` call, so small
+    runs no longer pay per-object and per-call overhead for every solution.
+
+    Each run follows the steps of ``BaseGeneticAlgorithm.run`` (competition, fitness-weighted
+    reproduction with 1- or 2-point crossover, bit-flip mutation and single-solution elitism)
+    and draws from its own generator, so a run's result does not depend on the others.
+
+    Subclasses must override the ``eval_fitness_batch`` method.
+    """
+    def __init__(self, gene_length, pop_size, num_runs, abs_fit_weight=0.25, rel_fit_weight=0.75, rng=None,
+                 populations=None):
+        """
+        Construct a new ``BaseBatchedGeneticAlgorithm`` instance.
+
+        gene_length:  int (or sequence of ints) describing gene DNA length; see ``decode``
+        pop_size:  number of chromosomes in each run
+        num_runs:  number of independent replicate runs
+        abs_fit_weight (default=0.25):  see ``BaseGeneticAlgorithm``
+        rel_fit_weight (default=0.75):  see ``BaseGeneticAlgorithm``
+        rng (default=None):  generator (or seed) from which one generator per run is spawned (see ``util.spawn_rngs``)
+        populations (default=None):  ``num_runs`` lists of ``pop_size`` initial bitmasks; random if ``None``
+
+        Asserts that (abs_fit_weight + rel_fit_weight) equals 1.
+        """
+        assert 0 <= abs_fit_weight <= 1
+        assert 0 <= rel_fit_weight <= 1
+        assert abs_fit_weight + rel_fit_weight == 1
+        assert pop_size >= 1 and num_runs >= 1
+
+        if not hasattr(gene_length, '__iter__'):
+            gene_length = [gene_length]
+        self.gene_length = list(gene_length)
+        self.length = sum(self.gene_length)
+        assert self.length >= 1
+
+        self.pop_size = pop_size
+        self.num_runs = num_runs
+        self.abs_fit_weight = abs_fit_weight
+        self.rel_fit_weight = rel_fit_weight
+        self.rngs = spawn_rngs(rng, num_runs)
+
+        if populations is None:
+            populations = [[r.getrandbits(self.length) for _ in range(pop_size)] for r in self.rngs]
+        assert len(populations) == num_runs
+        assert all(len(population) == pop_size for population in populations)
+        self.populations = [list(population) for population in populations]
+
+        # (shift, mask) of each gene within a chromosome's bitmask, first gene in the highest bits
+        self._gene_fields = []
+        shift = self.length
+        for length in self.gene_length:
+            shift -= length
+            self._gene_fields.append((shift, (1 << length) - 1))
+
+        # _tails[i] selects DNA positions i and later
+        self._tails = [(1 << (self.length - i)) - 1 for i in range(self.length + 1)]
+
+        # maps bitmask -> fitness, shared by all runs and cleared each generation
+        self.fitness_cache = {}
+        self.num_evaluations = 0
+
+        # run results, one entry per run
+        self.best = [None] * num_runs
+        self.best_fit = [None] * num_runs
+        self.generation_fittest_fit = [{} for _ in range(num_runs)]
+        self.overall_fittest_fit = [{} for _ in range(num_runs)]
+        self.new_fittest_generations = [[] for _ in range(num_runs)]
+        self.run_time_s = None
+
+    @abc.abstractmethod
+    def eval_fitness_batch(self, bitmasks):
+        """
+        Evaluate the fitness scores for several chromosomes at once.
+        Does not use caching. See ``decode`` and ``decode_batch`` for reading gene values from bitmasks.
+
+        bitmasks:  list of distinct chromosome bitmasks, drawn from any of the runs
+
+        return:  list of fitness values, in the same order as ``bitmasks``
+        """
+        raise NotImplementedError
+
+    def decode(self, bitmask):
+        """
+        Return the non-negative integer of each gene in a chromosome,
+        as ``translators.BinaryIntTranslator`` reads the same DNA.
+        """
+        return [(bitmask >> shift) & mask for shift, mask in self._gene_fields]
+
+    def decode_batch(self, bitmasks):
+        """
+        Decode several chromosomes at once (see ``decode``).
+
+        return:  list with one list of values per gene, parallel to ``bitmasks``
+        """
+        return [[(bitmask >> shift) & mask for bitmask in bitmasks] for shift, mask in self._gene_fields]
+
+    def to_dna(self, bitmask):
+        """ Return the binary DNA string of a chromosome bitmask. """
+        return format(bitmask, '0{}b'.format(self.length))
+
+    def to_chromosome(self, bitmask):
+        """ Return a ``chromosomes.Chromosome`` of ``genes.BinaryGene`` genes with a bitmask's DNA. """
+        dna = self.to_dna(bitmask)
+        genes = []
+        start = 0
+
+        for length in self.gene_length:
+            genes.append(BinaryGene._from_valid_dna(dna[start:start + length]))
+            start += length
+
+        return Chromosome(genes)
+
+    def evaluate(self):
+        """
+        Make sure the fitness of every chromosome of every run is cached, evaluating
+        all uncached distinct bitmasks with a single ``eval_fitness_batch`` call.
+
+        return:  list of fitness lists, parallel to ``populations``
+        """
+        cache = self.fitness_cache
+        pending = {}
+
+        for population in self.populations:
+            for bitmask in population:
+                if bitmask not in cache:
+                    pending[bitmask] = None
+
+        if pending:
+            pending = list(pending)
+            cache.update(zip(pending, self.eval_fitness_batch(pending)))
+            self.num_evaluations += len(pending)
+
+        return [[cache[bitmask] for bitmask in population] for population in self.populations]
+
+    def _compete(self, population, fitness, run):
+        """ Return surviving ``(fitness, bitmask)`` pairs, sorted by ascending fitness; see ``BaseGeneticAlgorithm.compete``. """
+        ranked = sorted(zip(fitness, population))
+        min_fit = ranked[0][0]
+        max_fit = ranked[-1][0]
+
+        if min_fit < self._min_fit_ever[run]:
+            self._min_fit_ever[run] = min_fit
+        if max_fit > self._max_fit_ever[run]:
+            self._max_fit_ever[run] = max_fit
+
+        min_fit_ever = self._min_fit_ever[run]
+        overall_fit_range = self._max_fit_ever[run] - min_fit_ever
+        current_fit_range = max_fit - min_fit
+
+        # the weighted survival probability is linear in fitness:  p = fit * slope + intercept
+        slope = 0.0
+        intercept = 0.0
+        if overall_fit_range != 0:
+            slope += self.abs_fit_weight / overall_fit_range
+            intercept -= self.abs_fit_weight * min_fit_ever / overall_fit_range
+        else:
+            intercept += self.abs_fit_weight
+        if current_fit_range != 0:
+            slope += self.rel_fit_weight / current_fit_range
+            intercept -= self.rel_fit_weight * min_fit / current_fit_range
+        else:
+            intercept += self.rel_fit_weight
+
+        rand = self.rngs[run].random
+        survivors = [pair for pair in ranked if rand() < pair[0] * slope + intercept]
+
+        # rarely, nothing survives -- allow everyone to live
+        return survivors or ranked
+
+    def _reproduce(self, survivors, p_crossover, two_point_crossover, run):
+        """ Return the survivors' bitmasks plus offspring up to ``pop_size``; see ``BaseGeneticAlgorithm.reproduce``. """
+        rng = self.rngs[run]
+        rand = rng.random
+        length = self.length
+        tails = self._tails
+
+        population = [bitmask for _, bitmask in survivors]
+        num_survivors = len(population)
+
+        # fitness-weighted cumulative probabilities; the weakest survivor gets p=0 but can be crossed-over with
+        min_fit = survivors[0][0]
+        fit_range = survivors[-1][0] - min_fit
+        if fit_range == 0:
+            cdf = [i / num_survivors for i in range(1, num_survivors + 1)]
+        else:
+            cdf = [(fit - min_fit) / fit_range for fit, _ in survivors]
+
+        # pick the survivors to reproduce
+        parents = cdf_indices(cdf, [rand() for _ in range(self.pop_size - num_survivors)])
+
+        for parent in parents:
+            child = population[parent]
+
+            if rand() < p_crossover:
+                mate = population[int(rand() * num_survivors)]
+                point1 = int(rand() * length)
+                if two_point_crossover:
+                    # DNA positions point1..point2 (inclusive) come from the mate
+                    point2 = point1 + 1 + int(rand() * (length - point1))
+                    mask = tails[point1] ^ tails[min(point2 + 1, length)]
+                else:
+                    mask = tails[point1]
+                child = (child & ~mask) | (mate & mask)
+
+            population.append(child)
+
+        return population
+
+    def _mutate(self, population, p_mutate, run):
+        """
+        Flip each bit of a population with probability ``p_mutate``.
+
+        When few flips are expected, their positions across the whole population are drawn
+        as geometric gaps (see ``util.mutation_sites``), so the cost is proportional to the number of mutations. Otherwise
+        a mask of the population's ``pop_size * length`` bits is built from a few random words:
+        combining masks with ``|`` and ``&`` according to the binary digits of ``p_mutate``
+        sets each bit with probability ``p_mutate`` (to a relative error below 2^-16).
+        """
+        if p_mutate <= 0:
+            return
+
+        length = self.length
+        full = self._tails[0]
+
+        if p_mutate >= 1:
+            population[:] = [bitmask ^ full for bitmask in population]
+            return
+
+        rng = self.rngs[run]
+        num_bits = len(population) * length
+
+        # p_mutate ~= numerator / 2^precision, with a 16-bit numerator
+        precision = 16 - math.frexp(p_mutate)[1]
+        numerator = round(p_mutate * (1 << precision))
+
+        if p_mutate * num_bits > precision and numerator:
+            getrandbits = rng.getrandbits
+            mask = 0
+            # skip trailing zero digits, which would only clear an all-zero mask
+            for j in range((numerator & -numerator).bit_length() - 1, precision):
+                if numerator >> j & 1:
+                    mask |= getrandbits(num_bits)
+                else:
+                    mask &= getrandbits(num_bits)
+
+            population[:] = [bitmask ^ ((mask >> shift) & full)
+                             for bitmask, shift in zip(population, range(0, num_bits, length))]
+            return
+
+        for position in mutation_sites(num_bits, p_mutate, rng):
+            idx, bit = divmod(position, length)
+            population[idx] ^= 1 << bit
+
+    def run(self, generations, p_mutate, p_crossover, elitist=True, two_point_crossover=False):
+        """
+        Run every replicate for a set number of generations; see ``BaseGeneticAlgorithm.run``.
+
+        Per-run history is kept in ``generation_fittest_fit``, ``overall_fittest_fit`` and
+        ``new_fittest_generations``, each a list with one entry per run.
+
+        generations:  how many generations to run
+        p_mutate:  probability of mutation of each bit in [0, 1]
+        p_crossover:  probability in [0, 1] that a crossover event will occur for each offspring
+        elitist (default=True):  option to replace the weakest solution of a run with
+                                 its strongest if a new one is not found in a generation
+        two_point_crossover (default=False):  whether 2-point crossover is used
+
+        return:  list of each run's overall fittest bitmask (also kept in ``best``, with fitness in ``best_fit``)
+        """
+        start_time = time.time()
+
+        assert 0 <= p_mutate <= 1
+        assert 0 <= p_crossover <= 1
+
+        num_runs = self.num_runs
+        self._min_fit_ever = [1e999999999] * num_runs
+        self._max_fit_ever = [-1e999999999] * num_runs
+
+        for history in (self.generation_fittest_fit, self.overall_fittest_fit, self.new_fittest_generations):
+            for run_history in history:
+                run_history.clear()
+
+        self.fitness_cache.clear()
+        fitnesses = self.evaluate()
+
+        for run, (population, fitness) in enumerate(zip(self.populations, fitnesses)):
+            self.best_fit[run], self.best[run] = max(zip(fitness, population))
+
+        for gen in range(1, generations + 1):
+            for run in range(num_runs):
+                survivors = self._compete(self.populations[run], fitnesses[run], run)
+                population = self._reproduce(survivors, p_crossover, two_point_crossover, run)
+                self._mutate(population, p_mutate, run)
+                self.populations[run] = population
+
+            self.fitness_cache.clear()
+            fitnesses = self.evaluate()
+
+            for run, (population, fitness) in enumerate(zip(self.populations, fitnesses)):
+                gen_fittest_fit = max(fitness)
+
+                if gen_fittest_fit > self.best_fit[run]:
+                    self.best_fit[run] = gen_fittest_fit
+                    self.best[run] = population[fitness.index(gen_fittest_fit)]
+                    self.new_fittest_generations[run].append(gen)
+                elif elitist:
+                    # no new fittest found, replace least fit with the fittest found so far
+                    weakest = fitness.index(min(fitness))
+                    population[weakest] = self.best[run]
+                    fitness[weakest] = self.best_fit[run]
+
+                self.generation_fittest_fit[run][gen] = gen_fittest_fit
+                self.overall_fittest_fit[run][gen] = self.best_fit[run]
+
+        self.run_time_s = time.time() - start_time
+
+        return list(self.best)
@@ -0,0 +1,255 @@
+import time
+
+from .algorithms import BaseGeneticAlgorithm
+
+
+NEIGHBORHOODS = ('von_neumann', 'moore')
+UPDATES = ('synchronous', 'asynchronous')
+REPLACEMENTS = ('if_not_worse', 'always')
+
+
+def neighbor_table(width, height, neighborhood='von_neumann', radius=1):
+    """
+    Return the neighbors of every cell of a toroidal (wrap-around) grid.
+
+    Cells are numbered row by row:  cell ``y * width + x`` is at column ``x`` of row ``y``.
+
+    width:  number of columns
+    height:  number of rows
+    neighborhood (default="von_neumann"):  "von_neumann" for cells within Manhattan distance ``radius``
+                                           (5 cells for radius 1), or "moore" for cells within
+                                           Chebyshev distance ``radius`` (9 cells for radius 1)
+    radius (default=1):  size of the neighborhood
+
+    return:  list with a tuple of distinct cell indices per cell, the cell itself first
+    """
+    assert width >= 1 and height >= 1
+    assert neighborhood in NEIGHBORHOODS
+    assert radius >= 1
+
+    offsets = [(0, 0)]
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if (dx, dy) == (0, 0):
+                continue
+            if neighborhood == 'moore' or abs(dx) + abs(dy) <= radius:
+                offsets.append((dx, dy))
+
+    table = []
+    for y in range(height):
+        for x in range(width):
+            # grids smaller than the neighborhood wrap onto the same cells more than once
+            cells = dict.fromkeys(((y + dy) % height) * width + (x + dx) % width for dx, dy in offsets)
+            table.append(tuple(cells))
+
+    return table
+
+
+class BaseCellularGeneticAlgorithm(BaseGeneticAlgorithm):
+    """
+    Cellular genetic algorithm:  chromosomes sit on the cells of a 2-D toroidal grid, and
+    selection and replacement only involve a cell's small neighborhood instead of the whole population.
+
+    Each generation, every cell breeds one offspring from 2 parents chosen by binary tournament
+    among its neighbors (see ``neighbor_table``), using the chromosomes' own ``crossover`` and
+    ``mutate`` methods, and the offspring replaces the cell's chromosome if it is at least as fit.
+    Good solutions spread slowly across the grid, which keeps diversity longer than a global
+    (panmictic) population, and there is no population-wide sort, fitness range or CDF:
+    the work per cell is constant.
+
+    Updates are either:
+      * "synchronous" - all offspring are bred from the previous grid, evaluated with one
+        ``evaluate`` call (a single ``eval_fitness_batch``, e.g. spread over worker processes),
+        then replace their cells together
+      * "asynchronous" - cells are updated one by one in a new random order every generation,
+        and each replacement is visible to the cells after it; offspring are evaluated one at a time,
+        each with its own ``evaluate`` call (so a ``surrogate`` evaluates them for real until its ``budget`` is spent)
+
+    Subclasses must override the ``eval_fitness`` method.
+    """
+    def __init__(self, chromosomes, width, translator=None, neighborhood='von_neumann', radius=1,
+                 update='synchronous', replacement='if_not_worse', rng=None, **kwargs):
+        """
+        Construct a new ``BaseCellularGeneticAlgorithm`` instance.
+
+        chromosomes:  initial chromosomes, one per cell, row by row; their number must be a multiple of ``width``
+        width:  number of columns of the grid
+        translator (default=None):  ``translators.BaseTranslator`` instance that may be needed
+                                    by ``eval_fitness`` method
+        neighborhood (default="von_neumann"):  "von_neumann" or "moore" (see ``neighbor_table``)
+        radius (default=1):  size of the neighborhood
+        update (default="synchronous"):  "synchronous" or "asynchronous"
+        replacement (default="if_not_worse"):  "if_not_worse" to keep a cell's chromosome when its
+                                               offspring is less fit, or "always"
+        rng (default=None):  random number generator (see ``BaseGeneticAlgorithm``)
+        **kwargs:  forwarded to the ``BaseGeneticAlgorithm`` constructor; ``speciation`` raises ``ValueError``,
+                   since the grid neighborhoods already keep niches apart
+        """
+        super().__init__(chromosomes, translator=translator, rng=rng, **kwargs)
+        assert width >= 1 and len(self.chromosomes) % width == 0
+        assert update in UPDATES
+        assert replacement in REPLACEMENTS
+
+        if self.speciation is not None:
+            raise ValueError('cellular runs select within grid neighborhoods and do not support speciation')
+
+        self.width = width
+        self.height = len(self.chromosomes) // width
+        self.neighborhood = neighborhood
+        self.radius = radius
+        self.update = update
+        self.replacement = replacement
+        self.neighbors = neighbor_table(self.width, self.height, neighborhood=neighborhood, radius=radius)
+
+    def local_tournament(self, neighbors, fitness):
+        """
+        Return the index of the fitter of 2 cells drawn at random (with replacement) from a neighborhood.
+
+        neighbors:  cell indices of the neighborhood
+        fitness:  fitness of every cell of the grid
+        """
+        rand = self.rng.random
+        i = neighbors[int(rand() * len(neighbors))]
+        j = neighbors[int(rand() * len(neighbors))]
+        return j if fitness[j] > fitness[i] else i
+
+    def breed_cell(self, cell, grid, fitness, p_mutate, p_crossover, two_point_crossover=False):
+        """
+        Return a new offspring for a cell, bred from its neighborhood. Parents are not changed.
+
+        cell:  index of the cell
+        grid:  chromosome of every cell
+        fitness:  fitness of every cell
+        """
+        neighbors = self.neighbors[cell]
+        c1 = grid[self.local_tournament(neighbors, fitness)].copy()
+
+        if self.rng.random() < p_crossover:
+            c2 = grid[self.local_tournament(neighbors, fitness)].copy()
+            point1 = self.rng.randrange(0, c1.length)
+            point2 = self.rng.randrange(point1 + 1, c1.length + 1) if two_point_crossover else None
+            c1.crossover(c2, point1, point2, rng=self.rng)
+
+        c1.mutate(p_mutate, rng=self.rng)
+        return c1
+
+    def step(self, p_mutate, p_crossover, two_point_crossover=False):
+        """
+        Update every cell of the grid once (one generation).
+
+        return:  list with the fitness of every cell after the update
+        """
+        t = time.perf_counter()
+        grid = self.chromosomes
+        self.evaluate(grid)
+        fitness = [self.get_fitness(c) for c in grid]
+        always = self.replacement == 'always'
+        t = self._time_phase('evaluate', t)
+
+        if self.update == 'synchronous':
+            offspring = [self.breed_cell(cell, grid, fitness, p_mutate, p_crossover, two_point_crossover)
+                         for cell in range(len(grid))]
+            t = self._time_phase('breed', t)
+            self.evaluate(offspring)
+            t = self._time_phase('evaluate', t)
+
+            new_grid = list(grid)
+            for cell, child in enumerate(offspring):
+                child_fit = self.get_fitness(child)
+                if always or child_fit >= fitness[cell]:
+                    new_grid[cell] = child
+                    fitness[cell] = child_fit
+
+            self.chromosomes = new_grid
+            self._time_phase('replace', t)
+        else:
+            order = list(range(len(grid)))
+            self.rng.shuffle(order)
+
+            # breeding and replacement are timed together, as "breed"
+            for cell in order:
+                child = self.breed_cell(cell, grid, fitness, p_mutate, p_crossover, two_point_crossover)
+                t = self._time_phase('breed', t)
+                # goes through ``evaluate`` so a surrogate can screen it
+                self.evaluate([child])
+                t = self._time_phase('evaluate', t)
+                child_fit = self.get_fitness(child)
+                if always or child_fit >= fitness[cell]:
+                    grid[cell] = child
+                    fitness[cell] = child_fit
+
+            self._time_phase('breed', t)
+
+        return fitness
+
+    def run(self, generations, p_mutate, p_crossover, two_point_crossover=False, stopping=None, metrics=None):
+        """
+        Run a cellular genetic algorithm simulation for a set number of generations (see ``step``).
+
+        generations:  how many generations to run
+        p_mutate:  probability of mutation in [0, 1]
+        p_crossover:  probability in [0, 1] that a crossover event will occur for each offspring
+        two_point_crossover (default=False):  whether 2-point crossover is used
+        stopping (default=None):  ``stopping.BaseStoppingCriterion`` (or a sequence of them, any of which
+                                  may stop the run) checked at the end of each generation
+        metrics (default=None):  ``metrics.MetricsExporter`` that publishes live progress while the run is in progress
+
+        return:  the overall fittest solution (chromosome)
+        """
+        start_time = time.time()
+
+        assert 0 <= p_mutate <= 1
+        assert 0 <= p_crossover <= 1
+
+        stopping = self._start_run(stopping=stopping, metrics=metrics)
+
+        try:
+            self.evaluate(self.chromosomes)
+            overall_fittest = self.get_fittest().copy()
+            overall_fittest_fit = self.get_fitness(overall_fittest)
+
+            for gen in range(1, generations + 1):
+                fitness = self.step(p_mutate, p_crossover, two_point_crossover=two_point_crossover)
+
+                gen_fittest_fit = max(fitness)
+                gen_fittest = self.chromosomes[fitness.index(gen_fittest_fit)]
+
+                if gen_fittest_fit > overall_fittest_fit:
+                    overall_fittest = gen_fittest.copy()
+                    overall_fittest_fit = gen_fittest_fit
+                    self.new_fittest_generations.append(gen)
+
+                self.generation_fittest[gen] = self.snapshot(gen_fittest)
+                self.generation_fittest_fit[gen] = gen_fittest_fit
+                self.overall_fittest_fit[gen] = overall_fittest_fit
+
+                if metrics is not None:
+                    metrics.update(self, gen, start_time)
+
+                if self.should_terminate(overall_fittest):
+                    break
+
+                if stopping is not None and stopping.should_stop(self, gen, overall_fittest_fit):
+                    self.stopped_by = stopping
+                    print("stopping on generation", gen, "by", stopping)
+                    break
+
+                if self.noise is not None:
+                    # surviving solutions are raced again next generation, from their kept samples
+                    self.fitness_cache.clear()
+                    self.phenotype_cache.clear()
+                else:
+                    # keep cached fitness for the current grid only
+                    self.fitness_cache = {c.dna: fit for c, fit in zip(self.chromosomes, fitness)}
+                    self.phenotype_cache.clear()
+        except BaseException:
+            if metrics is not None:
+                metrics.close()
+            raise
+
+        self.run_time_s = time.time() - start_time
+
+        if metrics is not None:
+            metrics.stop()
+
+        return overall_fittest
@@ -1,25 +1,33 @@
-import random
-
 from .genes import BaseGene, BinaryGene
+from .kernels import BACKEND, order_crossover, swap_mutation
+from .util import make_rng, mutation_sites
 
 
 class Chromosome:
     """
     Represents a chromosome, a single strand of DNA with
     at least 1 gene. Genes are ordered along the chromosome.
+    
+    The full DNA string is built lazily and cached until one of the genes is written to.
+    Copies are copy-on-write:  they share gene objects with the original until either
+    side modifies its genes (through ``genes``, ``dna``, ``mutate`` or ``crossover``).
+    Iterating over a chromosome yields its genes for reading only.
     """
     @classmethod
-    def create_random(cls, gene_length, n=1, gene_class=BinaryGene):
+    def create_random(cls, gene_length, n=1, gene_class=BinaryGene, rng=None):
         """
         Create 1 or more chromosomes with randomly generated DNA.
+        See ``initialization.create_population`` for creating large populations in bulk.
 
         gene_length:  int (or sequence of ints) describing gene DNA length
         n:  number of chromosomes to create (default=1); returns a list if n>1, else a single chromosome
         gene_class:  subclass of ``ga.chromosomes.BaseGene`` to use for genes
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
 
         return:  new chromosome
         """
         assert issubclass(gene_class, BaseGene)
+        rng = make_rng(rng)
         chromosomes = []
 
         # when gene_length is scalar, convert to a list to keep subsequent code simple
@@ -27,7 +35,7 @@ class Chromosome:
             gene_length = [gene_length]
 
         for _ in range(n):
-            genes = [gene_class.create_random(length) for length in gene_length]
+            genes = [gene_class.create_random(length, rng=rng) for length in gene_length]
             chromosomes.append(cls(genes))
 
         if n == 1:
@@ -44,10 +52,55 @@ class Chromosome:
         assert all(isinstance(g, BaseGene) for g in genes)
         self.genes = genes
         
+    @property
+    def genes(self):
+        """
+        Return this chromosome's list of genes, which may be modified.
+        A private copy of the genes is taken first if they are shared with a copy of this chromosome.
+        """
+        self._own_genes()
+        return self._genes
+        
+    @genes.setter
+    def genes(self, genes):
+        self._genes = genes
+        self._sharers = [1]  # number of chromosomes sharing ``_genes``; shared by all of them
+        self._length = sum(g.length for g in genes)
+        self._dna = None
+        self._dna_stamps = None
+        
+    def _own_genes(self):
+        """ Stop sharing genes with copies of this chromosome by copying them. """
+        if self._sharers[0] > 1:
+            cached = self._dna_is_current()
+            
+            self._sharers[0] -= 1
+            self._sharers = [1]
+            self._genes = [g.copy() for g in self._genes]
+            
+            if cached:
+                self._dna_stamps = [g._stamp for g in self._genes]
+                
+    def _dna_is_current(self):
+        """ Return whether the cached DNA string still matches the genes. """
+        stamps = self._dna_stamps
+        if stamps is None or len(stamps) != len(self._genes):
+            return False
+        
+        for gene, stamp in zip(self._genes, stamps):
+            if gene._stamp != stamp:
+                return False
+            
+        return True
+        
     @property
     def dna(self):
         """ Return the full DNA string for all genes in this chromosome. """
-        return ''.join(g.dna for g in self.genes)
+        if not self._dna_is_current():
+            self._dna = ''.join(g.dna for g in self._genes)
+            self._dna_stamps = [g._stamp for g in self._genes]
+            
+        return self._dna
         
     @dna.setter
     def dna(self, dna):
@@ -67,16 +120,31 @@ class Chromosome:
         i = 0
         
         for gene in self.genes:
-            gene.dna = dna[i:i + gene.length]
+            gene_length = gene.length
+            gene_dna = dna[i:i + gene_length]
+            
+            if gene.dna != gene_dna:
+                gene.dna = gene_dna
+            
+            i += gene_length
             
-            i += gene.length
+        self._dna = dna
+        self._dna_stamps = [g._stamp for g in self._genes]
         
     @property
     def length(self):
-        """ Return the length of this chromosome's full DNA string. """
-        return len(self.dna)
+        """ Return the length of this chromosome's full DNA string, computed once from its genes. """
+        return self._length
         
-    def crossover(self, chromosome, point1, point2=None):
+    def cache_key(self):
+        """
+        Return the key under which this chromosome's fitness is cached (see ``BaseGeneticAlgorithm.cache_key``).
+        Defaults to the DNA; chromosome types whose different DNA always means the same solution
+        can return a canonical form instead.
+        """
+        return self.dna
+        
+    def crossover(self, chromosome, point1, point2=None, rng=None):
         """
         Exchange DNA with another chromosome of equal length at one or two common points.
         
@@ -96,45 +164,100 @@ class Chromosome:
         chromosome:  other ``Chromosome`` to exchange DNA with
         point1:  zero-based index used for the first (and possibly only) crossover point
         point2:  zero-based index used for the second (optional) crossover point; must be > point1
+        rng (default=None):  unused here; subclasses with stochastic crossover draw from it
         """
         assert self.length == chromosome.length
+        self_dna = self.dna
+        other_dna = chromosome.dna
 
         if point2 is None:
-            new_dna = self.dna[:point1] + chromosome.dna[point1:]
-            other_new_dna = chromosome.dna[:point1] + self.dna[point1:]
-
-            self.dna = new_dna
-            chromosome.dna = other_new_dna
+            self.dna = self_dna[:point1] + other_dna[point1:]
+            chromosome.dna = other_dna[:point1] + self_dna[point1:]
         else:
             assert point2 > point1
-            self_substr = self.dna[point1:point2 + 1]
-            other_substr = chromosome.dna[point1:point2 + 1]
+            self_substr = self_dna[point1:point2 + 1]
+            other_substr = other_dna[point1:point2 + 1]
 
-            self.dna = self.dna[:point1] + other_substr + self.dna[point2 + 1:]
-            chromosome.dna = chromosome.dna[:point1] + self_substr + chromosome.dna[point2 + 1:]
+            self.dna = self_dna[:point1] + other_substr + self_dna[point2 + 1:]
+            chromosome.dna = other_dna[:point1] + self_substr + other_dna[point2 + 1:]
         
-    def mutate(self, p_mutate):
+    def mutate(self, p_mutate, rng=None):
         """ 
         Check all genes in this chromosome for mutation. 
         
+        When every gene mutates the ``BaseGene`` way, mutation sites are drawn once for the whole
+        chromosome (see ``util.mutation_sites``) and only the genes they fall in are visited,
+        so the cost is proportional to the number of mutations. Otherwise, each gene's own
+        ``mutate`` method is called.
+        
         p_mutate:  probability for mutation to occur
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
         """
         assert 0 <= p_mutate <= 1
+        rng = make_rng(rng)
+        genes = self._genes
         
-        for gene in self.genes:
-            gene.mutate(p_mutate)
+        if any(type(gene).mutate is not BaseGene.mutate for gene in genes):
+            self._mutate_genes(p_mutate, rng)
+            return
+        
+        sites = mutation_sites(self.length, p_mutate, rng)
+        k = 0
+        start = 0
+        
+        for i, gene in enumerate(genes):
+            if k == len(sites):
+                break
+                
+            end = start + gene.length
+            gene_sites = []
+            while k < len(sites) and sites[k] < end:
+                gene_sites.append(sites[k] - start)
+                k += 1
+                
+            if gene_sites:
+                self._mutate_gene(i, lambda g: g.mutate_sites(gene_sites, rng=rng))
+                
+            start = end
+            
+    def _mutate_genes(self, p_mutate, rng):
+        """ Call every gene's ``mutate`` method. """
+        for i in range(len(self._genes)):
+            self._mutate_gene(i, lambda g: g.mutate(p_mutate, rng=rng))
+            
+    def _mutate_gene(self, i, mutate):
+        """ Apply a mutation function to the ``i``th gene, copying shared genes only if it changed. """
+        gene = self._genes[i]
+        
+        if self._sharers[0] == 1:
+            mutate(gene)
+            return
+        
+        # genes are shared with a copy:  mutate a scratch copy, and only
+        # take ownership of the genes if a mutation actually happened
+        scratch = gene.copy()
+        mutate(scratch)
+        
+        if scratch._stamp != gene._stamp:
+            self._own_genes()
+            self._genes[i] = scratch
             
     def copy(self):
-        """ Return a new instance of this chromosome by copying its genes. """
-        genes = [g.copy() for g in self.genes]
-        return type(self)(genes)
+        """
+        Return a new instance of this chromosome with the same DNA.
+        Genes are shared with the copy until either chromosome modifies them.
+        """
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        self._sharers[0] += 1
+        return other
         
     def __iter__(self):
-        for g in self.genes:
+        for g in self._genes:
             yield g
             
     def __str__(self):
-        return 'Chromosome<{}>'.format(','.join(g.dna for g in self.genes))
+        return 'Chromosome<{}>'.format(','.join(g.dna for g in self._genes))
         
 
 class ReorderingSetChromosome(Chromosome):
@@ -159,48 +282,371 @@ class ReorderingSetChromosome(Chromosome):
         
     def check_genes(self):
         """ Assert that every DNA choice is represented by exactly one gene. """
-        gene_dna_set = set([g.dna for g in self.genes])
+        gene_dna_set = set([g.dna for g in self._genes])
         assert gene_dna_set == self.dna_choices_set
         
-    def mutate(self, p_mutate):
+    def mutate(self, p_mutate, rng=None):
         # gene-swapping mutation
-        for g1_idx, gene in enumerate(self.genes):
-            if random.random() < p_mutate:
-                num_genes = len(self.genes)
-                g2_idx = g1_idx
-
-                while g1_idx == g2_idx:
-                    g2_idx = random.randrange(num_genes)
-
-                tmp = self.genes[g2_idx].copy()
-                self.genes[g2_idx] = gene.copy()
-                self.genes[g1_idx] = tmp
+        rng = make_rng(rng)
+        rand = rng.random
+        genes = self.genes
+        
+        swap_mutation(genes, [rand() for _ in genes], p_mutate)
             
         self.check_genes()
             
-    def crossover(self, chromosome, point1, point2=None):
+    def crossover(self, chromosome, point1, point2=None, rng=None):
         # find gene on other chromosome at point
         i = 0
         other_gene_idx = 0
-        for g in chromosome.genes:
+        for g in chromosome:
             i += g.length
             if point1 < i:
                 break
                 
             other_gene_idx += 1
-        other_gene = chromosome.genes[other_gene_idx]
+        other_gene = chromosome._genes[other_gene_idx]
             
         # find idx of gene on this chromosome
-        for i, g in enumerate(self.genes):
+        genes = self.genes
+        for i, g in enumerate(genes):
             if g.dna == other_gene.dna:
                 # perform swap
-                tmp = self.genes[other_gene_idx].copy()
-                self.genes[other_gene_idx] = g.copy()
-                self.genes[i] = tmp
+                genes[other_gene_idx], genes[i] = g, genes[other_gene_idx]
                 break
                 
         self.check_genes()
+
+
+class FloatChromosome(Chromosome):
+    """
+    A chromosome that stores a vector of real numbers directly instead of genes,
+    so no DNA has to be decoded before fitness evaluation.
+    
+    Each value is kept within its own (low, high) bounds.
+    The chromosome's ``dna`` is the tuple of its values.
+    
+    Mutation operators:
+      * "gaussian" - add normally distributed noise scaled by ``sigma`` times the bounds' width
+      * "polynomial" - Deb's polynomial mutation with distribution index ``eta``
+      
+    Crossover operators (crossover points are ignored except by "point"):
+      * "sbx" - simulated binary crossover with distribution index ``eta``
+      * "blend" - BLX-alpha blend crossover with parameter ``alpha``
+      * "point" - exchange values at 1 or 2 points, like ``Chromosome.crossover``
+    """
+    MUTATION_TYPES = ('gaussian', 'polynomial')
+    CROSSOVER_TYPES = ('sbx', 'blend', 'point')
+    BOUNDS_HANDLING = ('clip', 'reflect')
+    
+    @classmethod
+    def create_random(cls, bounds, n=1, rng=None, **kwargs):
+        """
+        Create 1 or more chromosomes with values drawn uniformly within their bounds.
+        
+        bounds:  sequence of (low, high) pairs, one per value
+        n:  number of chromosomes to create (default=1); returns a list if n>1, else a single chromosome
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        **kwargs:  forwarded to the ``cls`` constructor
+        
+        return:  new chromosome
+        """
+        rng = make_rng(rng)
+        bounds = tuple((low, high) for low, high in bounds)
+        
+        chromosomes = [cls([rng.uniform(low, high) for low, high in bounds], bounds, **kwargs) for _ in range(n)]
+        
+        if n == 1:
+            return chromosomes[0]
+        else:
+            return chromosomes
+    
+    def __init__(self, values, bounds, mutation='gaussian', crossover_type='sbx',
+                 sigma=0.1, eta=20, alpha=0.5, bounds_handling='clip'):
+        """
+        Construct a new ``FloatChromosome`` instance.
+        
+        values:  sequence of real numbers
+        bounds:  sequence of (low, high) pairs, one per value
+        mutation (default="gaussian"):  mutation operator, one of ``MUTATION_TYPES``
+        crossover_type (default="sbx"):  crossover operator, one of ``CROSSOVER_TYPES``
+        sigma (default=0.1):  gaussian mutation standard deviation, as a fraction of each value's bounds
+        eta (default=20):  distribution index for SBX crossover and polynomial mutation;
+                           larger values keep offspring closer to their parents
+        alpha (default=0.5):  how far past its parents' range blend crossover may reach, as a fraction of that range
+        bounds_handling (default="clip"):  how values pushed out of bounds are repaired, one of ``BOUNDS_HANDLING``
+        """
+        assert len(values) == len(bounds)
+        assert all(low <= high for low, high in bounds)
+        assert mutation in self.MUTATION_TYPES
+        assert crossover_type in self.CROSSOVER_TYPES
+        assert bounds_handling in self.BOUNDS_HANDLING
+        
+        self.genes = []
+        self.values = [float(v) for v in values]
+        self.bounds = tuple(bounds)
+        self.mutation = mutation
+        self.crossover_type = crossover_type
+        self.sigma = sigma
+        self.eta = eta
+        self.alpha = alpha
+        self.bounds_handling = bounds_handling
+        
+        self._repair()
+        
+    @property
+    def dna(self):
+        """ Return this chromosome's values as a tuple. """
+        return tuple(self.values)
+        
+    @dna.setter
+    def dna(self, dna):
+        """ Replace this chromosome's values with a sequence of equal length. """
+        assert self.length == len(dna)
+        self.values = [float(v) for v in dna]
+        self._repair()
+        
+    @property
+    def length(self):
+        """ Return the number of values in this chromosome. """
+        return len(self.values)
+        
+    def _repair(self):
+        """ Move out-of-bounds values back within bounds. """
+        values = self.values
+        
+        for i, (low, high) in enumerate(self.bounds):
+            v = values[i]
+            
+            if low <= v <= high:
+                continue
+                
+            if self.bounds_handling == 'reflect' and high > low:
+                width = high - low
+                offset = (v - low) % (2 * width)
+                v = low + (offset if offset <= width else 2 * width - offset)
+            else:
+                v = min(max(v, low), high)
+                
+            values[i] = v
+        
+    def crossover(self, chromosome, point1, point2=None, rng=None):
+        """
+        Recombine values with another ``FloatChromosome`` of equal length using ``crossover_type``.
+        
+        chromosome:  other ``FloatChromosome`` to recombine with
+        point1, point2:  crossover points, only used by "point" crossover (see ``Chromosome.crossover``)
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        """
+        assert self.length == chromosome.length
+        rng = make_rng(rng)
+        
+        if self.crossover_type == 'point':
+            super().crossover(chromosome, point1, point2)
+            return
+        
+        x1, x2 = self.values, chromosome.values
+        
+        for i in range(len(x1)):
+            a, b = x1[i], x2[i]
+            
+            if self.crossover_type == 'sbx':
+                if rng.random() >= 0.5:
+                    continue
+                    
+                u = rng.random()
+                if u <= 0.5:
+                    beta = (2 * u) ** (1 / (self.eta + 1))
+                else:
+                    beta = (1 / (2 * (1 - u))) ** (1 / (self.eta + 1))
+                    
+                x1[i] = 0.5 * ((1 + beta) * a + (1 - beta) * b)
+                x2[i] = 0.5 * ((1 - beta) * a + (1 + beta) * b)
+            else:
+                low, high = min(a, b), max(a, b)
+                reach = self.alpha * (high - low)
+                x1[i] = rng.uniform(low - reach, high + reach)
+                x2[i] = rng.uniform(low - reach, high + reach)
+                
+        self._repair()
+        chromosome._repair()
+        
+    def mutate(self, p_mutate, rng=None):
+        """
+        Check each value for mutation using the ``mutation`` operator.
+        
+        p_mutate:  probability for mutation to occur
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        """
+        assert 0 <= p_mutate <= 1
+        rng = make_rng(rng)
+        values = self.values
+        
+        for i in mutation_sites(len(self.bounds), p_mutate, rng):
+            low, high = self.bounds[i]
+            if self.mutation == 'gaussian':
+                values[i] += rng.gauss(0, self.sigma * (high - low))
+            else:
+                u = rng.random()
+                if u < 0.5:
+                    delta = (2 * u) ** (1 / (self.eta + 1)) - 1
+                else:
+                    delta = 1 - (2 * (1 - u)) ** (1 / (self.eta + 1))
+                values[i] += delta * (high - low)
+                
+        self._repair()
+        
+    def copy(self):
+        """ Return a new instance of this chromosome with the same values and settings. """
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.values = self.values[:]
+        return other
+        
+    def __iter__(self):
+        for v in self.values:
+            yield v
+            
+    def __str__(self):
+        return 'FloatChromosome<{}>'.format(','.join('{:g}'.format(v) for v in self.values))
+
+
+class PermutationChromosome(Chromosome):
+    """
+    A chromosome that stores an ordering of distinct items (e.g. integer city IDs) directly,
+    such as a travelling salesman's tour. No genes are decoded.
+    
+    The chromosome's ``dna`` is the tuple of its items. Mutation swaps items
+    and crossover is order crossover (OX), so every chromosome stays a permutation.
+    """
+    @classmethod
+    def create_random(cls, items, n=1, rng=None):
+        """
+        Create 1 or more chromosomes holding random orderings of a collection of items.
+        
+        items:  distinct items to order, or an int ``k`` for the items ``0..k-1``
+        n:  number of chromosomes to create (default=1); returns a list if n>1, else a single chromosome
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        
+        return:  new chromosome
+        """
+        rng = make_rng(rng)
+        items = list(range(items)) if isinstance(items, int) else list(items)
+        chromosomes = []
+        
+        for _ in range(n):
+            order = items[:]
+            rng.shuffle(order)
+            chromosomes.append(cls(order))
+            
+        if n == 1:
+            return chromosomes[0]
+        else:
+            return chromosomes
+    
+    def __init__(self, items):
+        """
+        Construct a new ``PermutationChromosome`` instance.
+        
+        items:  sequence of distinct, hashable items
+        """
+        self.genes = []
+        self.values = list(items)
+        items = set(self.values)
+        assert len(items) == len(self.values)
+        
+        # orderings of 0..n-1 can use the compiled crossover kernel (see ``kernels.order_crossover``)
+        self._range_items = all(type(item) is int for item in items) and items == set(range(len(items)))
+        
+    @property
+    def dna(self):
+        """ Return this chromosome's items as a tuple. """
+        return tuple(self.values)
+        
+    @dna.setter
+    def dna(self, dna):
+        """ Replace this chromosome's ordering with another ordering of the same items. """
+        assert self.length == len(dna)
+        self.values = list(dna)
+        
+    @property
+    def length(self):
+        """ Return the number of items in this chromosome. """
+        return len(self.values)
+        
+    def mutate(self, p_mutate, rng=None):
+        """
+        Swap each item with another randomly chosen item with probability ``p_mutate``.
+        
+        p_mutate:  probability for mutation to occur
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        """
+        assert 0 <= p_mutate <= 1
+        rng = make_rng(rng)
+        rand = rng.random
+        values = self.values
+        
+        if len(values) < 2:
+            return
+        
+        # one draw per item decides whether it moves and, rescaled, where to (see ``kernels.swap_mutation``)
+        swap_mutation(values, [rand() for _ in values], p_mutate)
+                
+    def crossover(self, chromosome, point1, point2=None, rng=None):
+        """
+        Order crossover (OX) with another ``PermutationChromosome`` of the same items.
+        
+        Each chromosome keeps its own items between ``point1`` and ``point2`` (inclusive;
+        the end of the chromosome if ``point2`` is ``None``) and fills the remaining positions,
+        starting after the kept segment, with the missing items in the other chromosome's order.
+        
+        chromosome:  other ``PermutationChromosome`` to exchange order with
+        point1:  zero-based index of the start of the kept segment
+        point2:  zero-based index of the end of the kept segment (optional); must be > point1
+        rng (default=None):  unused; OX is deterministic given its points
+        """
+        assert self.length == chromosome.length
+        end = self.length - 1 if point2 is None else min(point2, self.length - 1)
+        assert end >= point1
+        
+        if BACKEND == 'numba' and self._range_items and chromosome._range_items:
+            new_values = order_crossover(self.values, chromosome.values, point1, end)
+            other_new_values = order_crossover(chromosome.values, self.values, point1, end)
+        else:
+            new_values = self._order_crossover(self.values, chromosome.values, point1, end)
+            other_new_values = self._order_crossover(chromosome.values, self.values, point1, end)
+        
+        self.values = new_values
+        chromosome.values = other_new_values
+        
+    @staticmethod
+    def _order_crossover(keep, fill, start, end):
+        """ Return an OX child of ``keep`` (segment [start, end]) and ``fill`` (everything else). """
+        n = len(keep)
+        kept = set(keep[start:end + 1])
+        
+        # the other parent's items, read from just after the segment and wrapping around
+        fill_items = [item for item in fill[end + 1:] + fill[:end + 1] if item not in kept]
+        
+        child = [None] * n
+        child[start:end + 1] = keep[start:end + 1]
+        
+        positions = list(range(end + 1, n)) + list(range(0, start))
+        for pos, item in zip(positions, fill_items):
+            child[pos] = item
+            
+        return child
         
     def copy(self):
-        genes = [g.copy() for g in self.genes]
-        return ReorderingSetChromosome(genes, self.dna_choices)
+        """ Return a new instance of this chromosome with the same ordering. """
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        other.values = self.values[:]
+        return other
+        
+    def __iter__(self):
+        for item in self.values:
+            yield item
+            
+    def __str__(self):
+        return 'PermutationChromosome<{}>'.format(','.join(str(item) for item in self.values))
@@ -0,0 +1,546 @@
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+from .chromosomes import Chromosome
+from .genes import BaseGene, get_alphabet
+
+
+class EvaluationError(RuntimeError):
+    """ Raised when an external evaluation fails and no failure fitness was configured. """
+    pass
+
+
+def serve(fitness_fn, infile=None, outfile=None):
+    """
+    Run the child side of the ``SubprocessEvaluator`` protocol until stdin is closed.
+
+    Each request line is a JSON object ``{"id": ..., "solution": ...}``; each reply line is
+    ``{"id": ..., "fitness": ...}``, or ``{"id": ..., "error": "..."}`` if ``fitness_fn`` raised.
+
+    A complete child program:
+
+        from ga.evaluators import serve
+
+        def fitness(solution):
+            return sum(solution)
+
+        if __name__ == '__main__':
+            serve(fitness)
+
+    fitness_fn:  function of a decoded solution (as sent by the parent) returning a number
+    infile (default=sys.stdin):  stream to read requests from
+    outfile (default=sys.stdout):  stream to write replies to
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+
+    for line in infile:
+        if not line.strip():
+            continue
+
+        request = json.loads(line)
+        try:
+            reply = {'id': request['id'], 'fitness': fitness_fn(request['solution'])}
+        except Exception as e:
+            reply = {'id': request['id'], 'error': '{}: {}'.format(type(e).__name__, e)}
+
+        outfile.write(json.dumps(reply) + '\n')
+        outfile.flush()
+
+
+class _Worker:
+    """ One long-lived child process and the thread reading its replies. """
+    def __init__(self, index, command, replies, **popen_kwargs):
+        self.index = index
+        self.command = command
+        self.replies = replies
+        self.popen_kwargs = popen_kwargs
+
+        self.proc = None
+        self.incarnation = 0
+        self.task = None        # (task index, attempt) in flight
+        self.request_id = None
+        self.deadline = None
+
+        self.start()
+
+    def start(self):
+        self.incarnation += 1
+        self.proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     universal_newlines=True, bufsize=1, **self.popen_kwargs)
+
+        reader = threading.Thread(target=self._read, args=(self.proc, self.incarnation), daemon=True)
+        reader.start()
+
+    def _read(self, proc, incarnation):
+        for line in proc.stdout:
+            self.replies.put((self.index, incarnation, line))
+
+        # end of output:  the process exited or was killed
+        self.replies.put((self.index, incarnation, None))
+
+    def send(self, request_id, solution, timeout):
+        self.proc.stdin.write(json.dumps({'id': request_id, 'solution': solution}) + '\n')
+        self.proc.stdin.flush()
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def restart(self):
+        self.kill()
+        self.start()
+
+    def kill(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+        for stream in (self.proc.stdin, self.proc.stdout):
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+
+    def close(self, grace_s=5):
+        """ Ask the child to exit by closing its stdin, killing it if it does not. """
+        try:
+            self.proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+        try:
+            self.proc.wait(grace_s)
+        except subprocess.TimeoutExpired:
+            pass
+
+        self.kill()
+
+
+class SubprocessEvaluator:
+    """
+    Evaluate fitness with a pool of long-lived external programs.
+
+    Each child process reads one JSON request per line on stdin and writes one JSON reply
+    per line on stdout (see ``serve`` for the protocol and a ready-made child loop), so the
+    cost of starting a process is paid once per worker instead of once per evaluation.
+
+    Batches of chromosomes are streamed to all workers at once, one request in flight per worker.
+    A worker that crashes is restarted and its request retried; a request that exceeds
+    ``timeout`` kills and restarts its worker. Requests that still fail get ``failure_fitness``,
+    or raise ``EvaluationError`` if it is ``None``.
+    """
+    def __init__(self, command, translator=None, processes=1, timeout=None, failure_fitness=None,
+                 max_retries=1, **popen_kwargs):
+        """
+        Construct a new ``SubprocessEvaluator``. Workers start on the first evaluation.
+
+        command:  program to run for each worker, as a list of arguments for ``subprocess.Popen``
+        translator (default=None):  ``translators.BaseTranslator`` used to decode chromosomes before sending;
+                                    the chromosome's DNA is sent if ``None``. Decoded values must be JSON-serializable.
+        processes (default=1):  number of worker processes
+        timeout (default=None):  seconds allowed for each evaluation, or ``None`` to wait indefinitely
+        failure_fitness (default=None):  fitness given to failed or timed-out evaluations;
+                                         ``None`` raises ``EvaluationError`` instead
+        max_retries (default=1):  how many times a request is retried after its worker crashed
+        **popen_kwargs:  forwarded to ``subprocess.Popen`` (e.g. ``cwd``, ``env``)
+        """
+        assert processes >= 1
+        assert timeout is None or timeout > 0
+        assert max_retries >= 0
+
+        self.command = list(command)
+        self.translator = translator
+        self.processes = processes
+        self.timeout = timeout
+        self.failure_fitness = failure_fitness
+        self.max_retries = max_retries
+        self.popen_kwargs = popen_kwargs
+
+        self._workers = []
+        self._replies = queue.Queue()
+        self._next_id = 0
+
+        # statistics
+        self.num_requests = 0
+        self.num_failures = 0
+        self.num_restarts = 0
+
+    def _start(self):
+        self._workers = [_Worker(i, self.command, self._replies, **self.popen_kwargs)
+                         for i in range(self.processes)]
+
+    def encode(self, chromosome):
+        """ Return the JSON-serializable solution sent to a worker for a chromosome. """
+        if self.translator is None:
+            return chromosome.dna
+        return self.translator.translate_chromosome(chromosome)
+
+    def evaluate(self, chromosomes):
+        """
+        Evaluate a batch of chromosomes across the worker pool.
+
+        return:  list of fitness values, in the same order as ``chromosomes``
+        """
+        if not self._workers:
+            self._start()
+
+        for worker in self._workers:
+            if worker.task is not None:
+                # left busy by an earlier batch that raised -- its reply would be stale
+                worker.task = None
+                worker.restart()
+
+        solutions = [self.encode(c) for c in chromosomes]
+        results = [None] * len(solutions)
+        pending = [(i, 0) for i in reversed(range(len(solutions)))]  # (task index, attempt); popped from the end
+        in_flight = 0
+
+        while pending or in_flight:
+            # hand out work to idle workers
+            for worker in self._workers:
+                if worker.task is None and pending:
+                    task_idx, attempt = pending.pop()
+                    worker.request_id = self._next_id
+                    self._next_id += 1
+                    self.num_requests += 1
+
+                    try:
+                        worker.send(worker.request_id, solutions[task_idx], self.timeout)
+                    except OSError:
+                        # the worker died while idle
+                        self.num_restarts += 1
+                        worker.restart()
+
+                        if attempt < self.max_retries:
+                            pending.append((task_idx, attempt + 1))
+                        else:
+                            results[task_idx] = self._fail(task_idx, 'worker exited before evaluation')
+                        continue
+
+                    worker.task = (task_idx, attempt)
+                    in_flight += 1
+
+            try:
+                index, incarnation, line = self._replies.get(timeout=self._wait_time())
+            except queue.Empty:
+                in_flight -= self._expire_timeouts(results)
+                continue
+
+            worker = self._workers[index]
+            if incarnation != worker.incarnation or worker.task is None:
+                # output from a process that was already replaced, or an unsolicited line
+                continue
+
+            task_idx, attempt = worker.task
+
+            if line is None:
+                # crash:  restart and retry if allowed
+                worker.task = None
+                in_flight -= 1
+                self.num_restarts += 1
+                worker.restart()
+
+                if attempt < self.max_retries:
+                    pending.append((task_idx, attempt + 1))
+                else:
+                    results[task_idx] = self._fail(task_idx, 'worker exited during evaluation')
+                continue
+
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                # not protocol output (e.g. a stray print); keep waiting
+                continue
+
+            if reply.get('id') != worker.request_id:
+                continue
+
+            worker.task = None
+            in_flight -= 1
+
+            if 'error' in reply:
+                results[task_idx] = self._fail(task_idx, reply['error'])
+            else:
+                results[task_idx] = reply['fitness']
+
+        return results
+
+    def _wait_time(self):
+        """ Return how long to wait for the next reply before checking timeouts. """
+        deadlines = [w.deadline for w in self._workers if w.task is not None and w.deadline is not None]
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - time.monotonic())
+
+    def _expire_timeouts(self, results):
+        """ Kill and restart workers whose request timed out; return how many requests expired. """
+        expired = 0
+        now = time.monotonic()
+
+        for worker in self._workers:
+            if worker.task is not None and worker.deadline is not None and now >= worker.deadline:
+                task_idx, _ = worker.task
+                worker.task = None
+                expired += 1
+                self.num_restarts += 1
+                worker.restart()
+                results[task_idx] = self._fail(task_idx, 'timed out after {} s'.format(self.timeout))
+
+        return expired
+
+    def _fail(self, task_idx, reason):
+        self.num_failures += 1
+
+        if self.failure_fitness is None:
+            raise EvaluationError('evaluation {} failed: {}'.format(task_idx, reason))
+        return self.failure_fitness
+
+    def close(self):
+        """ Shut down all worker processes. """
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# per worker process state of a ``SharedMemoryEvaluator`` pool
+_shared_worker = {}
+
+
+def _init_shared_worker(fitness_fn, translator, gene_class, gene_lengths):
+    _shared_worker.update(fitness_fn=fitness_fn, translator=translator, gene_class=gene_class,
+                          gene_lengths=gene_lengths, alphabet=get_alphabet(gene_class.GENETIC_MATERIAL_OPTIONS),
+                          names=None, segments=None)
+
+
+def _attach_shared(dna_name, fitness_name):
+    """ Return the (DNA, fitness) shared memory segments with these names, attaching to them on first use. """
+    if _shared_worker['names'] != (dna_name, fitness_name):
+        if _shared_worker['segments'] is not None:
+            for shm in _shared_worker['segments']:
+                shm.close()
+
+        _shared_worker['segments'] = (shared_memory.SharedMemory(name=dna_name),
+                                      shared_memory.SharedMemory(name=fitness_name))
+        _shared_worker['names'] = (dna_name, fitness_name)
+
+    return _shared_worker['segments']
+
+
+def _evaluate_rows(task):
+    """
+    Evaluate a range of rows of the shared DNA matrix, writing fitness into the shared fitness array.
+
+    return:  list of (row, error message) for rows whose evaluation raised
+    """
+    dna_name, fitness_name, row_length, start, stop = task
+    dna_shm, fitness_shm = _attach_shared(dna_name, fitness_name)
+    dna_buf = dna_shm.buf
+
+    fitness_fn = _shared_worker['fitness_fn']
+    translator = _shared_worker['translator']
+    make_gene = _shared_worker['gene_class']._from_valid_dna
+    gene_lengths = _shared_worker['gene_lengths']
+    decode = _shared_worker['alphabet'].decode
+    failures = []
+
+    # views are released after each task, so segments can be closed when the worker exits
+    with fitness_shm.buf.cast('d') as fitness_view:
+        for row in range(start, stop):
+            dna = decode(dna_buf[row * row_length:(row + 1) * row_length])
+
+            try:
+                if translator is None:
+                    solution = dna
+                else:
+                    genes = []
+                    i = 0
+                    for length in gene_lengths:
+                        genes.append(make_gene(dna[i:i + length]))
+                        i += length
+                    solution = translator.translate_chromosome(Chromosome(genes))
+
+                fitness_view[row] = fitness_fn(solution)
+            except Exception as e:
+                fitness_view[row] = float('nan')
+                failures.append((row, '{}: {}'.format(type(e).__name__, e)))
+
+    return failures
+
+
+class SharedMemoryEvaluator:
+    """
+    Evaluate fitness with a pool of worker processes that read the population from shared memory.
+
+    Each batch's DNA is written once into a ``multiprocessing.shared_memory`` matrix, one row
+    per chromosome and one byte per DNA element (its alphabet code, see ``genes.Alphabet``).
+    Workers decode their own ranges of rows in place, translate them, and write fitness into a
+    shared array of doubles, so the only messages per batch are small row-range tasks instead of
+    pickled chromosomes. Segments are reused between batches and only reallocated to grow.
+
+    Chromosomes must be made of genes of a single class with the same gene lengths (the usual
+    ``Chromosome.create_random`` layout), and fitness must be a single number.
+
+        def fitness(solution):
+            return sum(solution)
+
+        with SharedMemoryEvaluator(fitness, translator=BinaryIntTranslator(), processes=8) as evaluator:
+            fitness_values = evaluator.evaluate(chromosomes)
+
+    ``fitness`` and ``translator`` must be picklable (e.g. ``fitness`` defined at module level).
+    """
+    def __init__(self, fitness_fn, translator=None, processes=None, chunks_per_process=4,
+                 failure_fitness=None, mp_context=None):
+        """
+        Construct a new ``SharedMemoryEvaluator``. Workers start on the first evaluation.
+
+        fitness_fn:  function of a decoded solution returning a number
+        translator (default=None):  ``translators.BaseTranslator`` used by workers to decode chromosomes;
+                                    ``fitness_fn`` gets the DNA string if ``None``
+        processes (default=None):  number of worker processes; ``os.cpu_count()`` if ``None``
+        chunks_per_process (default=4):  row ranges per worker in each batch; more ranges balance uneven
+                                         evaluation times at the cost of a few more messages
+        failure_fitness (default=None):  fitness given to evaluations that raised;
+                                         ``None`` raises ``EvaluationError`` instead
+        mp_context (default=None):  ``multiprocessing`` start method name or context; the default context if ``None``
+        """
+        assert processes is None or processes >= 1
+        assert chunks_per_process >= 1
+
+        self.fitness_fn = fitness_fn
+        self.translator = translator
+        self.processes = processes or os.cpu_count() or 1
+        self.chunks_per_process = chunks_per_process
+        self.failure_fitness = failure_fitness
+
+        if mp_context is None or isinstance(mp_context, str):
+            mp_context = multiprocessing.get_context(mp_context)
+        self.mp_context = mp_context
+
+        self._pool = None
+        self._layout = None
+        self._dna_shm = None
+        self._fitness_shm = None
+
+        # statistics
+        self.num_batches = 0
+        self.num_failures = 0
+
+    def _layout_of(self, chromosome):
+        """ Return (gene class, gene lengths) for a chromosome, checking that it can be shared. """
+        genes = list(chromosome)
+        if not genes or not all(isinstance(g, BaseGene) for g in genes):
+            raise ValueError('only chromosomes made of genes.BaseGene genes can be evaluated from shared memory')
+
+        gene_class = type(genes[0])
+        if not all(type(g) is gene_class for g in genes):
+            raise ValueError('all genes must be of the same class')
+
+        return gene_class, tuple(g.length for g in genes)
+
+    def _reserve(self, num_rows, row_length):
+        """ Make sure the shared segments can hold ``num_rows`` rows, growing them if needed. """
+        if (self._dna_shm is not None and self._dna_shm.size >= num_rows * row_length
+                and self._fitness_shm.size >= num_rows * 8):
+            return
+
+        self._release_segments()
+
+        # leave room to grow, so slightly larger batches do not reallocate
+        capacity = num_rows + num_rows // 4 + 1
+        self._dna_shm = shared_memory.SharedMemory(create=True, size=max(1, capacity * row_length))
+        self._fitness_shm = shared_memory.SharedMemory(create=True, size=capacity * 8)
+
+    def _release_segments(self):
+        for shm in (self._dna_shm, self._fitness_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+        self._dna_shm = None
+        self._fitness_shm = None
+
+    def evaluate(self, chromosomes):
+        """
+        Evaluate a batch of chromosomes across the worker pool.
+
+        return:  list of fitness values, in the same order as ``chromosomes``
+        """
+        chromosomes = list(chromosomes)
+        if not chromosomes:
+            return []
+
+        layout = self._layout_of(chromosomes[0])
+        gene_class, gene_lengths = layout
+        row_length = sum(gene_lengths)
+
+        # rows are decoded with one layout, so equal DNA lengths are not enough
+        if any(self._layout_of(c) != layout for c in chromosomes[1:]):
+            raise ValueError('all chromosomes must have the same gene layout')
+
+        if layout != self._layout:
+            # workers decode rows with the layout they were started with
+            self._close_pool()
+            self._layout = layout
+
+        dnas = [c.dna for c in chromosomes]
+
+        num_rows = len(dnas)
+        self._reserve(num_rows, row_length)
+
+        if self._pool is None:
+            # started after the first segment exists, so workers share this process's resource tracker
+            # instead of starting their own, which would unlink the segments when a worker exits
+            self._pool = self.mp_context.Pool(self.processes, initializer=_init_shared_worker,
+                                              initargs=(self.fitness_fn, self.translator, gene_class, gene_lengths))
+
+        self._dna_shm.buf[:num_rows * row_length] = get_alphabet(gene_class.GENETIC_MATERIAL_OPTIONS).encode(''.join(dnas))
+
+        num_tasks = min(num_rows, self.processes * self.chunks_per_process)
+        bounds = [num_rows * i // num_tasks for i in range(num_tasks + 1)]
+        tasks = [(self._dna_shm.name, self._fitness_shm.name, row_length, start, stop)
+                 for start, stop in zip(bounds, bounds[1:])]
+
+        failures = [failure for task_failures in self._pool.map(_evaluate_rows, tasks) for failure in task_failures]
+        self.num_batches += 1
+
+        fitness_view = self._fitness_shm.buf.cast('d')
+        try:
+            results = fitness_view[:num_rows].tolist()
+        finally:
+            fitness_view.release()
+
+        for row, reason in failures:
+            self.num_failures += 1
+            if self.failure_fitness is None:
+                raise EvaluationError('evaluation {} failed: {}'.format(row, reason))
+            results[row] = self.failure_fitness
+
+        return results
+
+    def _close_pool(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def close(self):
+        """ Shut down the worker processes and free the shared memory. """
+        self._close_pool()
+        self._release_segments()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,25 +1,60 @@
 __all__ = ['biggest_multiple', 'polynomials', 'travelling_salesman', 'irrigation']
 
-from . import biggest_multiple
-from . import polynomials
-from . import travelling_salesman
-from . import irrigation
+import importlib
+
+from ..util import make_rng, spawn_rngs
+
+
+def __getattr__(name):
+    # examples are imported on first use
+    if name in __all__:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+def import_pyplot():
+    """
+    Import ``matplotlib.pyplot`` for an example's plots, styled like all examples.
+    
+    Called only when an example runs with ``plot=True``, so importing the examples never loads matplotlib.
+    
+    return:  the ``matplotlib.pyplot`` module, or ``None`` if matplotlib is not installed
+    """
+    try:
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return None
+    
+    plt.style.use('ggplot')
+    return plt
 
 
 def run_all(plot=True, seed=None):
-    """ Run all examples. """
-    if seed is not None:
-        import random
-        random.seed(seed)
+    """
+    Run all examples.
+
+    seed (default=None):  if given, each example runs with its own generator spawned from this seed,
+                          so results are reproducible and independent of example order
+    """
+    from . import biggest_multiple, polynomials, travelling_salesman, irrigation
+    
+    if seed is None:
+        rngs = [None] * 4
+    else:
+        rngs = spawn_rngs(make_rng(seed), 4)
 
     print("Running biggest_multiple.py")
-    biggest_multiple.run(plot=plot)
+    biggest_multiple.run(plot=plot, rng=rngs[0])
 
     print("Running polynomials.py")
-    polynomials.run(plot=plot)
+    polynomials.run(plot=plot, rng=rngs[1])
 
     print("Running travelling_salesman.py")
-    travelling_salesman.run(plot=plot)
+    travelling_salesman.run(plot=plot, rng=rngs[2])
 
     print("Running irrigation.py")
-    irrigation.run()
\ No newline at end of file
+    irrigation.run(rng=rngs[3])
\ No newline at end of file
@@ -1,14 +1,11 @@
 import functools
 
-try:
-    import pylab as py
-    py.style.use('ggplot')
-except ImportError:
-    py = None
-
 from ..algorithms import BaseGeneticAlgorithm
 from ..chromosomes import Chromosome
+from ..stopping import TargetFitness
 from ..translators import BinaryIntTranslator
+from ..util import make_rng
+from . import import_pyplot
 
 
 class BiggestMultipleGA(BaseGeneticAlgorithm):
@@ -37,8 +34,11 @@ class BiggestMultipleGA(BaseGeneticAlgorithm):
         self.factors = factors
 
         self.max_encoded_val = int('1' * self.chromosomes[0].length, base=2)
-        self.best_possible_fit = len(self.factors)
-        self.found_best = False
+
+        # the optimal solution is the largest encodable multiple of the factors' product
+        min_product = functools.reduce(lambda a,b: a * b, self.factors)
+        self.best_possible_num = self.max_encoded_val // min_product * min_product
+        self.best_possible_fit = len(self.factors) * self.best_possible_num / self.max_encoded_val
 
     def eval_fitness(self, chromosome):
         """
@@ -57,34 +57,26 @@ class BiggestMultipleGA(BaseGeneticAlgorithm):
             else:
                 score -= 1
 
-        # check for optimal solution
-        if score == len(self.factors):
-            min_product = functools.reduce(lambda a,b: a * b, self.factors)
-
-            if number + min_product > self.max_encoded_val:
-                print("Found best solution:", number)
-                self.found_best = True
-
         # scale number of factors achieved/missed by ratio of
         # the solution number to the maximum possible integer
         # represented by binary strings of the given length
         return score * number / self.max_encoded_val
 
-    def should_terminate(self, overall_fittest):
-        return self.found_best
-
 
-def run(factors=(2, 3, 7, 11), gene_length=16, generations=2**32, plot=True):
+def run(factors=(2, 3, 7, 11), gene_length=16, generations=2**32, plot=True, rng=None):
+    rng = make_rng(rng)
+    
     # find largest encodable integer that has all factors
-    chromosomes = Chromosome.create_random(gene_length, n=10)
+    chromosomes = Chromosome.create_random(gene_length, n=10, rng=rng)
 
-    bm_ga = BiggestMultipleGA(factors, chromosomes)
+    bm_ga = BiggestMultipleGA(factors, chromosomes, rng=rng)
     
     # run until we (hopefully) find the largest encodable 
     # value that is a product of all the factors
     p_mutate = 0.15
     p_cross = 0.25
-    best = bm_ga.run(generations, p_mutate, p_cross, elitist=True)
+    best = bm_ga.run(generations, p_mutate, p_cross, elitist=True,
+                     stopping=TargetFitness(bm_ga.best_possible_fit))
     best_num = bm_ga.translator.translate_gene(best.genes[0])
     
     print("run took", bm_ga.run_time_s, "seconds")
@@ -94,6 +86,7 @@ def run(factors=(2, 3, 7, 11), gene_length=16, generations=2**32, plot=True):
         assert best_num % factor == 0
 
     if plot:
+        py = import_pyplot()
         if py:
             # plot fitness progression
             py.plot([v for k, v in sorted(bm_ga.overall_fittest_fit.items())], label='run')
@@ -2,13 +2,16 @@
 GA solution to reddit daily programmer from 3/18/15:
 http://www.reddit.com/r/dailyprogrammer/comments/2zezvf/20150318_challenge_206_intermediate_maximizing/
 """
+import functools
 from io import StringIO
 import math
 import time
 
 from ..algorithms import BaseGeneticAlgorithm
+from ..batched import BaseBatchedGeneticAlgorithm
 from ..chromosomes import Chromosome
 from ..translators import BinaryIntTranslator
+from ..util import make_rng
 
 MAP = (  # "x" denotes a crop cell
 """......x...x....x............x............x.................................x...............
@@ -90,6 +93,59 @@ def sprinkler_reaches_cell(x, y, sx, sy, r):
     return math.sqrt(dx ** 2 + dy ** 2) <= r
 
 
+@functools.lru_cache(maxsize=16)
+def coverage_grid(maplist, h, w, r):
+    """
+    Return the number of crop cells reached by a sprinkler at every cell of a map,
+    less 1 if the sprinkler itself sits on a crop cell.
+
+    Computed once per map and radius:  each map row gets a prefix sum of crop cells,
+    so the crops reached in one row of the sprinkler's circle cost a single subtraction,
+    and the whole grid costs O(h * w * r) instead of O(h * w * r^2) square roots.
+
+    maplist:  tuple of map rows (strings), e.g. from ``mapstr_to_list``
+    h:  height of the map (number of rows)
+    w:  width of the map (number of columns)
+    r:  how many cells away the sprinkler can reach
+
+    return:  tuple of ``h`` rows, each a tuple of ``w`` crop counts; index as ``grid[sy][sx]``
+    """
+    # prefix[y][x] = number of crop cells in row y with column < x
+    prefix = []
+    for y in range(h):
+        row = maplist[y] if y < len(maplist) else ''
+        counts = [0]
+        for x in range(w):
+            counts.append(counts[-1] + (x < len(row) and row[x] == 'x'))
+        prefix.append(counts)
+
+    # half-width of the sprinkler's circle for each row offset (cells with dx^2 + dy^2 <= r^2)
+    max_dy = int(math.floor(r))
+    half_widths = [int(math.floor(math.sqrt(r * r - dy * dy))) for dy in range(max_dy + 1)]
+
+    grid = []
+    for sy in range(h):
+        row_start_idx = max(0, sy - max_dy)
+        row_end_idx = min(sy + max_dy + 1, h)
+        grid_row = []
+
+        for sx in range(w):
+            crops_watered = 0
+
+            for y in range(row_start_idx, row_end_idx):
+                half = half_widths[abs(y - sy)]
+                counts = prefix[y]
+                crops_watered += counts[min(sx + half + 1, w)] - counts[max(0, sx - half)]
+
+            # reduce score by 1 if sprinkler placed on a crop cell
+            crops_watered -= prefix[sy][sx + 1] - prefix[sy][sx]
+            grid_row.append(crops_watered)
+
+        grid.append(tuple(grid_row))
+
+    return tuple(grid)
+
+
 class IrrigationGA(BaseGeneticAlgorithm):
     def __init__(self, mapstr, h, w, r, *args, **kwargs):
         """
@@ -115,15 +171,15 @@ class IrrigationGA(BaseGeneticAlgorithm):
         # parse map string into a list of strings, 1 string per row
         self.maplist = mapstr_to_list(mapstr)
 
-    def eval_fitness(self, chromosome):
+        # fitness of every sprinkler location, shared by all GAs using the same map and radius
+        self.coverage = coverage_grid(tuple(self.maplist), h, w, r)
+
+    def score(self, sx, sy):
         """
-        Return the number of plants reached by the sprinkler.
+        Return the number of plants reached by a sprinkler at (sx, sy).
 
         Returns a large penalty for sprinkler locations outside the map.
         """
-        # convert DNA to represented sprinkler coordinates
-        sx, sy = self.translator.translate_chromosome(chromosome)
-
         # check for invalid points
         penalty = 0
         if sx >= self.w:
@@ -132,30 +188,24 @@ class IrrigationGA(BaseGeneticAlgorithm):
             penalty += self.w * self.h
 
         if penalty > 0:
-            self.fitness_cache[chromosome.dna] = -penalty
             return -penalty
 
-        # calculate number of crop cells watered by sprinkler
-        crops_watered = 0
-
-        # check bounding box around sprinkler for crop cells
-        # circle guaranteed to be within square with side length 2*r around sprinkler
-        row_start_idx = max(0, sy - self.r)
-        row_end_idx = min(sy + self.r + 1, self.h)
-        col_start_idx = max(0, sx - self.r)
-        col_end_idx = min(sx + self.r + 1, self.w)
+        return self.coverage[sy][sx]
 
-        for y, row in enumerate(self.maplist[row_start_idx:row_end_idx], row_start_idx):
-            for x, cell in enumerate(row[col_start_idx:col_end_idx], col_start_idx):
-                if cell == 'x' and sprinkler_reaches_cell(x, y, sx, sy, self.r):
-                    crops_watered += 1
+    def eval_fitness(self, chromosome):
+        """
+        Return the number of plants reached by the sprinkler.
 
-        # reduce score by 1 if sprinkler placed on a crop cell
-        if self.maplist[sy][sx] == 'x':
-            crops_watered -= 1
+        Returns a large penalty for sprinkler locations outside the map.
+        """
+        # convert DNA to represented sprinkler coordinates
+        sx, sy = self.translator.translate_chromosome(chromosome)
+        return self.score(sx, sy)
 
-        self.fitness_cache[chromosome.dna] = crops_watered
-        return crops_watered
+    def eval_fitness_batch(self, chromosomes):
+        """ Score a whole population with coverage grid lookups. """
+        translate = self.translator.translate_chromosome
+        return [self.score(*translate(c)) for c in chromosomes]
 
     def map_sprinkler(self, sx, sy, watered_crop='^', watered_field='_', dry_field=' ', dry_crop='x'):
         """
@@ -181,11 +231,49 @@ class IrrigationGA(BaseGeneticAlgorithm):
         return '\n'.join([''.join(row) for row in maplist])
 
 
-def run(generations=500, p_mutate=0.10, p_crossover=0.65):
+class BatchedIrrigationGA(BaseBatchedGeneticAlgorithm):
+    def __init__(self, mapstr, h, w, r, *args, **kwargs):
+        """
+        Construct a new ``BatchedIrrigationGA`` instance, which evolves many independent
+        ``IrrigationGA``-style runs at once.
+
+        Assumes chromosomes have 2 genes (x, y) with binary DNA.
+
+        map:  ASCII map as a single string, 1 line per row
+        h:  height of ASCII crop map (number of rows)
+        w:  width of ASCII crop map (number of columns)
+        r:  how many cells away the sprinkler can reach
+        *args:  forwarded to BaseBatchedGeneticAlgorithm constructor
+        **kwargs:  forwarded to BaseBatchedGeneticAlgorithm constructor
+        """
+        super().__init__(*args, **kwargs)
+        self.h = h
+        self.w = w
+        self.coverage = coverage_grid(tuple(mapstr_to_list(mapstr)), h, w, r)
+
+    def eval_fitness_batch(self, bitmasks):
+        """ Score chromosomes of every run with coverage grid lookups; see ``IrrigationGA.score``. """
+        scores = []
+
+        for sx, sy in zip(*self.decode_batch(bitmasks)):
+            penalty = 0
+            if sx >= self.w:
+                penalty += self.w * self.h
+            if sy >= self.h:
+                penalty += self.w * self.h
+
+            scores.append(-penalty if penalty else self.coverage[sy][sx])
+
+        return scores
+
+
+def run(generations=500, p_mutate=0.10, p_crossover=0.65, rng=None):
+    rng = make_rng(rng)
+    
     # create GA instance
     gene_length = (7, 6)  # 2^6 = 64 > 51; 2^7 = 128 > 91
-    chromosomes = Chromosome.create_random(gene_length, n=20)
-    irrig_ga = IrrigationGA(MAP, 51, 91, 9, chromosomes)
+    chromosomes = Chromosome.create_random(gene_length, n=20, rng=rng)
+    irrig_ga = IrrigationGA(MAP, 51, 91, 9, chromosomes, rng=rng)
 
     # run GA
     t0 = time.time()
@@ -0,0 +1,15 @@
+"""
+A minimal child program for ``evaluators.SubprocessEvaluator``:  scores binary DNA by its number of 1's.
+
+    evaluator = SubprocessEvaluator([sys.executable, '-m', 'ga.examples.onemax_child'], processes=4)
+"""
+from ..evaluators import serve
+
+
+def fitness(solution):
+    """ Return the number of 1's in a DNA string. """
+    return solution.count('1')
+
+
+if __name__ == '__main__':
+    serve(fitness)
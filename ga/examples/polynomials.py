@@ -1,12 +1,8 @@
-try:
-    import pylab as py
-    py.style.use('ggplot')
-except ImportError:
-    py = None
-
 from ..algorithms import BaseGeneticAlgorithm
-from ..chromosomes import Chromosome
-from ..translators import BinaryFloatTranslator
+from ..chromosomes import Chromosome, FloatChromosome
+from ..translators import BinaryFloatTranslator, DirectTranslator
+from ..util import make_rng
+from . import import_pyplot
 
 
 class PolyModelGA(BaseGeneticAlgorithm):
@@ -19,11 +15,15 @@ class PolyModelGA(BaseGeneticAlgorithm):
 
         coefficients:  list of polynomial coefficients
         num_x:  number of x-values to compute, starting at 1
-        significand_length:  length of significand in genes
+        significand_length:  length of significand in genes; ignored for ``FloatChromosome`` solutions
         *args, **kwargs forwarded to ``BaseGeneticAlgorithm`` constructor
         """
         super().__init__(*args, **kwargs)
-        self.translator = BinaryFloatTranslator(significand_length)
+
+        if all(isinstance(c, FloatChromosome) for c in self.chromosomes):
+            self.translator = DirectTranslator()
+        else:
+            self.translator = BinaryFloatTranslator(significand_length)
 
         self.coefficients = coefficients
         self.num_x = num_x
@@ -76,7 +76,10 @@ class PolyModelGA(BaseGeneticAlgorithm):
         return fitness
 
 
-def run(coefficients=(0.001, 0.01, 0.1, 1), num_x=10, generations=5000, plot=True):
+def run(coefficients=(0.001, 0.01, 0.1, 1), num_x=10, generations=5000, plot=True, rng=None, real_valued=False,
+        local_search=None):
+    rng = make_rng(rng)
+    
     # fit a polynomial equation to expected values
     
     poly_str = ''
@@ -96,14 +99,21 @@ def run(coefficients=(0.001, 0.01, 0.1, 1), num_x=10, generations=5000, plot=Tru
     #   1 bit for exponent sign
     #   2 bits for exponent body (represent 0, 1, 2)
     significand_length = 8
-    gene_length = (1 + significand_length + 1 + 2,) * len(coefficients)  # 1 gene per polynomial coefficient
-    chromosomes = Chromosome.create_random(gene_length, n=20)
     
-    poly_ga = PolyModelGA(coefficients, num_x, significand_length, chromosomes, abs_fit_weight=1, rel_fit_weight=0)
+    if real_valued:
+        # or skip the encoding entirely and evolve the coefficients themselves
+        bounds = ((-2, 2),) * len(coefficients)
+        chromosomes = FloatChromosome.create_random(bounds, n=20, rng=rng, mutation='polynomial', eta=50)
+    else:
+        gene_length = (1 + significand_length + 1 + 2,) * len(coefficients)  # 1 gene per polynomial coefficient
+        chromosomes = Chromosome.create_random(gene_length, n=20, rng=rng)
+    
+    poly_ga = PolyModelGA(coefficients, num_x, significand_length, chromosomes,
+                          abs_fit_weight=1, rel_fit_weight=0, rng=rng)
     
     p_mutate = 0.15
     p_cross = 0.50
-    best = poly_ga.run(generations, p_mutate, p_cross, elitist=True)
+    best = poly_ga.run(generations, p_mutate, p_cross, elitist=True, local_search=local_search)
     
     best_coeff = poly_ga.translator.translate_chromosome(best)
     best_y = poly_ga.compute_y(best_coeff, num_x)
@@ -112,13 +122,14 @@ def run(coefficients=(0.001, 0.01, 0.1, 1), num_x=10, generations=5000, plot=Tru
     print("best solution coefficients =", best_coeff, "error =", poly_ga.compute_err(best_y, best_coeff))
 
     if plot:
+        py = import_pyplot()
         if py:
             # plot a curve for every solution that caused an upset
             # older solutions have higher transparency
             x = range(1, num_x + 1)
 
             for new_best_gen in poly_ga.new_fittest_generations:
-                gen_fittest = poly_ga.generation_fittest[new_best_gen]
+                gen_fittest = poly_ga.get_generation_fittest(new_best_gen)
                 sol_coefficients = poly_ga.translator.translate_chromosome(gen_fittest)
                 modeled_y = poly_ga.compute_y(sol_coefficients, num_x)
                 alpha = min(0.5, max(0.2, new_best_gen/max(poly_ga.new_fittest_generations)))
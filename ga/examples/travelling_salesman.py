@@ -1,121 +1,190 @@
+from argparse import ArgumentParser
+from array import array
 import math
-import random
-
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib.animation as animation
-
-    plt.style.use('ggplot')
-except ImportError:
-    plt = None
+import time
 
 from ..algorithms import BaseGeneticAlgorithm
-from ..chromosomes import ReorderingSetChromosome
-from ..genes import BinaryGene
-from ..translators import BinaryIntTranslator
+from ..chromosomes import PermutationChromosome
+from ..translators import DirectTranslator
+from ..util import canonical_cycle, make_rng
+from . import import_pyplot
 
 
 class TravellingSalesmanGA(BaseGeneticAlgorithm):
-    def __init__(self, city_distances, *args, **kwargs):
+    """
+    A GA that searches for the shortest round trip through a set of cities.
+
+    Solutions are ``chromosomes.PermutationChromosome`` tours of 0-based city indices.
+    """
+    def __init__(self, distances, *args, canonical_tours=False, **kwargs):
         """
-        city_distances:  2-deep mapping of city_id -> city_id -> distance
+        distances:  square distance matrix (sequence of rows), where ``distances[i][j]``
+                    is the distance from city ``i`` to city ``j``; see ``distance_matrix``
+        canonical_tours (default=False):  whether rotations (and, with symmetric distances, reversals)
+                                          of a tour share one cached fitness (see ``cache_key``)
+        *args, **kwargs forwarded to ``BaseGeneticAlgorithm`` constructor
         """
+        kwargs.setdefault('translator', DirectTranslator())
         super().__init__(*args, **kwargs)
-        self.city_distances = city_distances
+        self.canonical_tours = canonical_tours
+        self.distances = distances
+        self.num_cities = len(distances)
+        self._symmetric = None
 
-        self.max_distance = max([max(subdict.values()) for subdict in city_distances.values()])
-        self.num_cities = len(self.city_distances)
+        for c in self.chromosomes:
+            assert c.length == self.num_cities
+
+    @property
+    def symmetric(self):
+        """ Return whether the distance matrix is symmetric; checked on first use, as it takes O(n^2) time. """
+        if self._symmetric is None:
+            distances = self.distances
+            self._symmetric = all(distances[i][j] == distances[j][i]
+                                  for i in range(self.num_cities) for j in range(i))
+        return self._symmetric
+
+    def cache_key(self, chromosome):
+        """
+        With ``canonical_tours``, return the tour as a canonical round trip:  every rotation of a tour
+        (and, with symmetric distances, its reverse) has the same length, so they share one cached fitness.
+        This costs about as much as measuring the tour, so it only pays off when such tours recur.
+        """
+        if not self.canonical_tours:
+            return super().cache_key(chromosome)
+        return canonical_cycle(self.translator.translate_chromosome(chromosome), reversible=self.symmetric)
 
     def calc_distance(self, chromosome, pow=1):
-        # get list of city IDs
+        """ Return the total distance of a chromosome's round trip, raising each leg to a power. """
         city_ids = self.translator.translate_chromosome(chromosome)
+        distances = self.distances
 
-        # compute distance travelled
-        tot_dist = 0
-        for i, start_city_id in enumerate(city_ids[:-1]):
-            end_city_id = city_ids[i + 1]
-            tot_dist += self.city_distances[start_city_id][end_city_id] ** pow
+        # pair each city with the next one, wrapping around from the last city back to the first
+        legs = zip(city_ids, city_ids[1:] + city_ids[:1])
 
-        tot_dist += self.city_distances[city_ids[-1]][city_ids[0]] ** pow
-        return tot_dist
+        if pow == 1:
+            return sum(distances[start][end] for start, end in legs)
+        return sum(distances[start][end] ** pow for start, end in legs)
 
     def eval_fitness(self, chromosome):
         """
         Calculate the distance travelled by the salesman by converting
         the solution/chromosome into a sequence of visited city IDs.
 
-        Penalty distance is added each time any of these conditions occur:
-          1. cities are visited multiple times
-          2. not all cities are visited
-          3. an invalid city ID is encountered
+        Squaring each leg's distance penalizes long legs more heavily.
 
         return:  fitness value
         """
         return -self.calc_distance(chromosome, pow=2)
 
 
-def run(num_cities=20, num_chromosomes=20, generations=2500, plot=True):
+def random_cities(num_cities, rng=None, size=100):
+    """ Return ``num_cities`` random (x, y) points in a ``size`` x ``size`` square. """
+    rng = make_rng(rng)
+    return [(rng.random() * size, rng.random() * size) for _ in range(num_cities)]
+
+
+def read_tsplib(path):
+    """
+    Read city coordinates from a TSPLIB-format file (such as ``berlin52.tsp``).
+
+    Only ``EDGE_WEIGHT_TYPE: EUC_2D`` instances are supported, since their distances are the
+    rounded Euclidean distances of ``distance_matrix(points, rounded=True)``; other types
+    (``GEO``, ``ATT``, ``EXPLICIT`` matrices, ...) raise ``ValueError``.
+
+    Only the ``NODE_COORD_SECTION`` is used; cities are returned in file order,
+    so city index ``i`` is the file's node ``i + 1`` in the usual 1-based numbering.
+
+    return:  list of (x, y) points
+    """
+    points = []
+    edge_weight_type = None
+    in_coords = False
+
+    with open(path) as infile:
+        for line in infile:
+            line = line.strip()
+
+            if not line:
+                continue
+            if line == 'NODE_COORD_SECTION':
+                in_coords = True
+                continue
+            if line == 'EOF':
+                break
+
+            if in_coords:
+                fields = line.split()
+                if len(fields) < 3 or not fields[0].isdigit():
+                    # another section starts
+                    break
+                points.append((float(fields[1]), float(fields[2])))
+            else:
+                key, _, value = line.partition(':')
+                if key.strip() == 'EDGE_WEIGHT_TYPE':
+                    edge_weight_type = value.strip()
+
+    if edge_weight_type != 'EUC_2D':
+        raise ValueError('unsupported EDGE_WEIGHT_TYPE {!r} in {} (only EUC_2D is supported)'.format(
+            edge_weight_type, path))
+    if not points:
+        raise ValueError('no NODE_COORD_SECTION coordinates found in ' + path)
+
+    return points
+
+
+def distance_matrix(points, rounded=False):
+    """
+    Return the dense Euclidean distance matrix for a list of (x, y) points.
+
+    Rows are ``array.array('d')`` instances, 8 bytes per distance.
+
+    rounded (default=False):  round distances to the nearest integer, as TSPLIB's ``EUC_2D`` does
+    """
+    matrix = []
+
+    for x1, y1 in points:
+        if rounded:
+            row = array('d', [float(int(math.hypot(x2 - x1, y2 - y1) + 0.5)) for x2, y2 in points])
+        else:
+            row = array('d', [math.hypot(x2 - x1, y2 - y1) for x2, y2 in points])
+        matrix.append(row)
+
+    return matrix
+
+
+def run(num_cities=20, num_chromosomes=20, generations=2500, plot=True, rng=None, tsplib_path=None):
+    rng = make_rng(rng)
+
     # solve a simple travelling salesman problem
-    rs = random.randint(1, 1000000)
-    random.seed(100)
-    
-    gene_length = -1
-    for i in range(1, num_cities + 1):
-        if 2 ** i >= num_cities:
-            gene_length = i + 1
-            break
-    assert gene_length >= 1
-    
-    city_ids = list(range(1, num_cities + 1))
-    city_points = {city_id: (random.random() * 100, random.random() * 100) for city_id in city_ids}
-    
-    city_distances = {}
-    for start_city_id in city_ids:
-        city_distances[start_city_id] = {}
-        x1, y1 = city_points[start_city_id]
-        
-        for end_city_id in city_ids:
-            x2, y2 = city_points[end_city_id]
-            dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            city_distances[start_city_id][end_city_id] = dist
-    
-    print("city distances:")
-    for start_city_id in city_ids:
-        for end_city_id in city_ids:
-            print("distance from", start_city_id, "to", end_city_id, "=", city_distances[start_city_id][end_city_id])
-    
-    random.seed(rs)
-    
-    chromosomes = []
-    for x in range(num_chromosomes):
-        genes = []
-        
-        for city_id in city_ids:
-            dna = ('{:0' + str(gene_length) + 'd}').format(int(bin(city_id)[2:]))
-            g = BinaryGene(dna, name='city ' + str(x))
-            genes.append(g)
-            
-        choices = [g.dna for g in genes]
-        c = ReorderingSetChromosome(genes, choices)
-        chromosomes.append(c)
-        
-    ts_ga = TravellingSalesmanGA(city_distances, chromosomes, 
-                                 translator=BinaryIntTranslator(), 
-                                 abs_fit_weight=0, rel_fit_weight=1)
-    
+    if tsplib_path:
+        city_points = read_tsplib(tsplib_path)
+        distances = distance_matrix(city_points, rounded=True)
+        num_cities = len(city_points)
+    else:
+        # city layout uses its own fixed-seed generator so the map is the same for every run
+        city_points = random_cities(num_cities, rng=100)
+        distances = distance_matrix(city_points)
+
+    chromosomes = PermutationChromosome.create_random(num_cities, n=num_chromosomes, rng=rng)
+
+    ts_ga = TravellingSalesmanGA(distances, chromosomes, abs_fit_weight=0, rel_fit_weight=1, rng=rng)
+
     p_mutate = 0.10
     p_cross = 0.50
-    
+
     best = ts_ga.run(generations, p_mutate, p_cross, elitist=True, refresh_after=generations/2)
     best_city_ids = ts_ga.translator.translate_chromosome(best)
     best_dist = ts_ga.calc_distance(best)
-    
+
     print("run took", ts_ga.run_time_s, "seconds")
     print("best solution =", best_city_ids)
     print("best distance =", best_dist)
 
     if plot:
+        plt = import_pyplot()
         if plt:
+            import matplotlib.animation as animation
+
             # plot fitness progression
             plt.plot([v for k, v in sorted(ts_ga.overall_fittest_fit.items())], label='run best')
             plt.plot([v for k, v in sorted(ts_ga.generation_fittest_fit.items())], label='gen best')
@@ -129,11 +198,11 @@ def run(num_cities=20, num_chromosomes=20, generations=2500, plot=True):
                     yield gen
 
             def animate(generation):
-                chromosome = ts_ga.generation_fittest[generation]
+                chromosome = ts_ga.get_generation_fittest(generation)
                 ax.clear()
 
                 x, y = [], []
-                for city_id, point in city_points.items():
+                for point in city_points:
                     x.append(point[0])
                     y.append(point[1])
                 ax.plot(x, y, marker='s', linestyle='', label='cities', alpha=0.6)
@@ -166,3 +235,56 @@ def run(num_cities=20, num_chromosomes=20, generations=2500, plot=True):
             plt.show()
         else:
             print("Did not plot example results because matplotlib not installed")
+
+
+def benchmark(sizes=(100, 1000, 5000), num_chromosomes=20, generations=20, rng=None, tsplib_path=None):
+    """
+    Time the TSP workload for several instance sizes and print evaluations per second.
+
+    sizes:  numbers of random cities to benchmark
+    num_chromosomes:  population size
+    generations:  generations to run per instance
+    tsplib_path (default=None):  benchmark this TSPLIB instance instead of random ones
+
+    return:  list of (num_cities, matrix build seconds, run seconds, evaluations per second)
+    """
+    rng = make_rng(rng)
+    instances = [read_tsplib(tsplib_path)] if tsplib_path else [random_cities(n, rng=rng) for n in sizes]
+    results = []
+
+    for city_points in instances:
+        t0 = time.perf_counter()
+        distances = distance_matrix(city_points, rounded=bool(tsplib_path))
+        build_s = time.perf_counter() - t0
+
+        chromosomes = PermutationChromosome.create_random(len(city_points), n=num_chromosomes, rng=rng)
+        ts_ga = TravellingSalesmanGA(distances, chromosomes, abs_fit_weight=0, rel_fit_weight=1, rng=rng)
+        ts_ga.run(generations, 0.01, 0.5)
+
+        evals_per_s = ts_ga.num_evaluations / ts_ga.run_time_s
+        results.append((len(city_points), build_s, ts_ga.run_time_s, evals_per_s))
+
+        print("{:>6} cities: matrix {:.2f} s, {} generations {:.2f} s, {:.0f} evaluations/sec".format(
+            len(city_points), build_s, generations, ts_ga.run_time_s, evals_per_s))
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Travelling salesman GA example and timing harness')
+    parser.add_argument('--tsplib', help='EUC_2D TSPLIB file with NODE_COORD_SECTION city coordinates')
+    parser.add_argument('--benchmark', help='time instances of these sizes (default: 100 1000 5000)',
+                        nargs='*', type=int)
+    parser.add_argument('-c', '--cities', help='number of random cities', type=int, default=20)
+    parser.add_argument('-n', '--chromosomes', help='population size', type=int, default=20)
+    parser.add_argument('-g', '--generations', help='number of generations', type=int)
+    parser.add_argument('-s', '--seed', help='random seed', type=int)
+    parser.add_argument('-p', '--plot', help='show matplotlib plots', action='store_true')
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        benchmark(sizes=args.benchmark or (100, 1000, 5000), num_chromosomes=args.chromosomes,
+                  generations=args.generations or 20, rng=args.seed, tsplib_path=args.tsplib)
+    else:
+        run(num_cities=args.cities, num_chromosomes=args.chromosomes, generations=args.generations or 2500,
+            plot=args.plot, rng=args.seed, tsplib_path=args.tsplib)
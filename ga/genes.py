@@ -1,5 +1,102 @@
-import random
-import string
+import functools
+import itertools
+
+from .util import make_rng, mutation_sites
+
+
+# every DNA write gets a new stamp, so holders of a gene (such as chromosomes caching
+# their joined DNA) can detect changes without comparing DNA strings
+_dna_stamps = itertools.count()
+
+
+class Alphabet:
+    """
+    Integer codes for the characters of a ``GENETIC_MATERIAL_OPTIONS`` alphabet.
+    
+    Each character is coded as its index in the alphabet, so DNA can be converted to
+    a ``bytes`` string of small ints (and back) with a single ``str.translate`` call,
+    and operations such as mutation become integer arithmetic modulo the alphabet size.
+    Use ``get_alphabet`` to get the shared instance for an alphabet.
+    """
+    DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+    
+    def __init__(self, options):
+        """
+        options:  string of distinct characters; at most 256 so codes fit in a byte
+        """
+        assert len(set(options)) == len(options) <= 256
+        self.options = options
+        self.size = len(options)
+        self.index = {ch: i for i, ch in enumerate(options)}
+        
+        self._encode_table = str.maketrans({ch: chr(i) for i, ch in enumerate(options)})
+        self._latin1 = all(ord(ch) < 256 for ch in options)
+        if self._latin1:
+            self._decode_table = bytes.maketrans(bytes(range(self.size)), options.encode('latin-1'))
+        
+        # DNA as a base-``size`` numeral that ``int()`` parses in C
+        if 2 <= self.size <= len(self.DIGITS):
+            self._int_table = str.maketrans({ch: self.DIGITS[i] for i, ch in enumerate(options)})
+        else:
+            self._int_table = None
+        
+    def encode(self, dna):
+        """ Return the codes of a DNA string's characters as ``bytes``. """
+        return dna.translate(self._encode_table).encode('latin-1')
+        
+    def decode(self, codes):
+        """ Return the DNA string for a sequence of codes (``bytes``, ``bytearray`` or ints). """
+        if self._latin1:
+            return bytes(codes).translate(self._decode_table).decode('latin-1')
+        return ''.join([self.options[c] for c in codes])
+        
+    def to_int(self, dna):
+        """ Return the integer whose base-``size`` digits are the codes of a DNA string, most significant first. """
+        if self._int_table is not None:
+            return int(dna.translate(self._int_table), self.size) if dna else 0
+        
+        value = 0
+        for code in self.encode(dna):
+            value = value * self.size + code
+        return value
+        
+    def mutate(self, dna, p_mutate, rng):
+        """
+        Return a mutated copy of a DNA string, or ``None`` if no element mutated.
+        
+        Each element mutates with probability ``p_mutate`` (see ``util.mutation_sites``,
+        so only the mutated elements cost random draws) and becomes a different character (see ``mutate_sites``).
+        """
+        if self.size < 2:
+            return None
+        
+        return self.mutate_sites(dna, mutation_sites(len(dna), p_mutate, rng), rng)
+        
+    def mutate_sites(self, dna, sites, rng):
+        """
+        Return a copy of a DNA string with the elements at the given positions mutated,
+        or ``None`` if no element mutated.
+        
+        Each mutated element gets a random offset in [1, size - 1] added to its code, modulo ``size``:
+        a uniformly chosen different character, without retries.
+        """
+        if self.size < 2 or not sites:
+            return None
+        
+        codes = bytearray(self.encode(dna))
+        random = rng.random
+        size = self.size
+        
+        for i in sites:
+            codes[i] = (codes[i] + 1 + int(random() * (size - 1))) % size
+                
+        return self.decode(codes)
+
+
+@functools.lru_cache(maxsize=None)
+def get_alphabet(options):
+    """ Return the shared ``Alphabet`` for a ``GENETIC_MATERIAL_OPTIONS`` string. """
+    return Alphabet(options)
 
 
 class BaseGene:
@@ -13,17 +110,37 @@ class BaseGene:
     GENETIC_MATERIAL_OPTIONS = ''
     
     @classmethod
-    def create_random(cls, length, **kwargs):
+    def create_random(cls, length, rng=None, **kwargs):
         """
         Return a new instance of this gene class with random DNA,
         with characters chosen from ``GENETIC_MATERIAL_OPTIONS``.
         
         length:  the number of characters in the randomized DNA
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
         **kwargs:  forwarded to the ``cls`` constructor
         """
-        dna = ''.join([random.choice(cls.GENETIC_MATERIAL_OPTIONS) for _ in range(length)])
+        rng = make_rng(rng)
+
+        dna = ''.join(rng.choices(cls.GENETIC_MATERIAL_OPTIONS, k=length))
         return cls(dna, **kwargs)
 
+    @classmethod
+    def _from_valid_dna(cls, dna, name=None):
+        """
+        Return a new instance of this gene class without checking its DNA,
+        for DNA already known to only contain ``GENETIC_MATERIAL_OPTIONS`` characters.
+        Subclasses with their own constructor are constructed normally.
+        """
+        if cls.__init__ is not BaseGene.__init__:
+            return cls(dna, name=name)
+        
+        gene = object.__new__(cls)
+        gene._dna = dna
+        gene._stamp = next(_dna_stamps)
+        gene.suppressed = False
+        gene.name = name
+        return gene
+        
     def __init__(self, dna, suppressed=False, name=None):
         """
         Construct a new BaseGene.
@@ -36,6 +153,7 @@ class BaseGene:
         self._check_dna(dna)
         
         self._dna = dna
+        self._stamp = next(_dna_stamps)
         self.suppressed = suppressed
         self.name = name
         
@@ -57,35 +175,61 @@ class BaseGene:
         """
         self._check_dna(dna)
         self._dna = dna
+        self._stamp = next(_dna_stamps)
+        
+    @property
+    def codes(self):
+        """ Return this gene's DNA as ``bytes`` of alphabet indices (see ``Alphabet``). """
+        return get_alphabet(self.GENETIC_MATERIAL_OPTIONS).encode(self._dna)
         
-    def mutate(self, p_mutate):
+    @codes.setter
+    def codes(self, codes):
+        """ Set this gene's DNA from a sequence of alphabet indices. """
+        self.dna = get_alphabet(self.GENETIC_MATERIAL_OPTIONS).decode(codes)
+        
+    def mutate(self, p_mutate, rng=None):
         """
         Simulate mutation against a probability.
+        Each element mutates with probability ``p_mutate``; the cost is proportional to the
+        number of mutations (see ``util.mutation_sites``). Subclasses change how an element
+        mutates by overriding ``mutate_sites``.
         
         p_mutate:  probability for mutation to occur
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
         """
-        new_dna = []
-
-        for bit in self.dna:
-            if random.random() < p_mutate:
-                new_bit = bit
-
-                while new_bit == bit:
-                    new_bit = random.choice(self.GENETIC_MATERIAL_OPTIONS)
-                bit = new_bit
-
-            new_dna.append(bit)
+        rng = make_rng(rng)
+        sites = mutation_sites(self.length, p_mutate, rng)
+        
+        if sites:
+            self.mutate_sites(sites, rng=rng)
+            
+    def mutate_sites(self, sites, rng=None):
+        """
+        Mutate the elements at the given positions.
+        Each becomes a uniformly chosen different character (see ``Alphabet.mutate_sites``).
+        
+        sites:  positions to mutate, e.g. from ``util.mutation_sites``
+        rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+        """
+        rng = make_rng(rng)
+        new_dna = get_alphabet(self.GENETIC_MATERIAL_OPTIONS).mutate_sites(self.dna, sites, rng)
 
-        self.dna = ''.join(new_dna)
+        # leave unchanged DNA (and anything caching it) alone
+        if new_dna is not None:
+            self.dna = new_dna
         
     def copy(self):
-        """ Return a new instance of this gene with the same DNA. """
-        return type(self)(self.dna, suppressed=self.suppressed, name=self.name)
+        """
+        Return a new instance of this gene with the same DNA.
+        The DNA was validated when it was set, so it is not checked again.
+        """
+        other = object.__new__(type(self))
+        other.__dict__.update(self.__dict__)
+        return other
         
     def _check_dna(self, dna):
         """ Check that a DNA string only contains characters in ``GENETIC_MATERIAL_OPTIONS``. """
-        valid_chars = set(self.GENETIC_MATERIAL_OPTIONS)
-        assert all(char in valid_chars for char in dna)
+        assert set(dna).issubset(self.GENETIC_MATERIAL_OPTIONS)
         
     def __str__(self):
         s = 'Gene'
@@ -101,19 +245,19 @@ class BinaryGene(BaseGene):
     """
     GENETIC_MATERIAL_OPTIONS = '01'
         
-    def mutate(self, p_mutate):
+    def mutate_sites(self, sites, rng=None):
         """
-        Check each element for mutation, swapping "0" for "1" and vice-versa.
+        Swap "0" for "1" and vice-versa at the given positions.
+        No random numbers are needed, so ``rng`` is unused.
         """
-        new_dna = []
+        if not sites:
+            return
         
-        for bit in self.dna:
-            if random.random() < p_mutate:
-                bit = '1' if bit == '0' else '0'
-                
-            new_dna.append(bit)
+        bits = bytearray(self.dna, 'ascii')
+        for i in sites:
+            bits[i] ^= 1  # ord("0") ^ 1 == ord("1")
             
-        self.dna = ''.join(new_dna)
+        self.dna = bits.decode('ascii')
         
         
 class Base10Gene(BaseGene):
@@ -128,7 +272,7 @@ class AlphabetGene(BaseGene):
     """
     A gene that uses uppercase alphabet characters for DNA.
     """
-    GENETIC_MATERIAL_OPTIONS = string.ascii_uppercase
+    GENETIC_MATERIAL_OPTIONS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'  # string.ascii_uppercase, without importing string (and re)
 
 
 class DNAGene(BaseGene):
@@ -0,0 +1,206 @@
+from .chromosomes import Chromosome, FloatChromosome
+from .genes import BinaryGene
+from .util import make_rng
+
+
+STRATEGIES = ('uniform', 'latin_hypercube', 'halton')
+
+
+def random_dna(alphabet, length, rng=None):
+    """
+    Return one random string of ``length`` characters drawn uniformly from ``alphabet``.
+
+    Random bytes are drawn in bulk and mapped onto the alphabet with ``bytes.translate``,
+    dropping the few byte values that would bias the draw, so the cost per character
+    is a small constant amount of C work instead of a Python-level ``random`` call.
+
+    alphabet:  string of distinct characters, e.g. a gene class's ``GENETIC_MATERIAL_OPTIONS``
+    length:  number of characters to draw
+    rng (default=None):  ``random.Random`` instance (or seed) to draw from; defaults to the ``random`` module
+
+    return:  random string
+    """
+    rng = make_rng(rng)
+    m = len(alphabet)
+    assert m >= 1
+
+    if length <= 0:
+        return ''
+
+    if m == 1:
+        return alphabet * length
+
+    if max(alphabet) > '\xff':
+        # alphabets beyond latin-1 cannot be mapped bytewise
+        return ''.join(rng.choices(alphabet, k=length))
+
+    # byte b maps to alphabet[b % m]; bytes past the last whole multiple of m are rejected
+    usable = 256 - 256 % m
+    table = bytes(ord(alphabet[b % m]) if b < usable else 0 for b in range(256))
+    rejected = bytes(range(usable, 256))
+
+    chunks = []
+    remaining = length
+
+    while remaining > 0:
+        # draw a little extra to cover rejected bytes
+        num_bytes = remaining * 256 // usable + 16
+        chunk = rng.getrandbits(8 * num_bytes).to_bytes(num_bytes, 'little').translate(table, rejected)
+        chunks.append(chunk[:remaining])
+        remaining -= len(chunks[-1])
+
+    return b''.join(chunks).decode('latin-1')
+
+
+def _primes(n):
+    """ Return the first ``n`` prime numbers. """
+    primes = []
+    candidate = 2
+
+    while len(primes) < n:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+
+    return primes
+
+
+def _radical_inverse(i, base):
+    """ Return the ``i``-th element of the van der Corput sequence in ``base``, in [0, 1). """
+    result = 0.0
+    scale = 1.0 / base
+
+    while i:
+        i, digit = divmod(i, base)
+        result += digit * scale
+        scale /= base
+
+    return result
+
+
+def _sample_points(strategy, n, num_dims, rng):
+    """
+    Return ``n`` points in the unit hypercube, as lists of ``n`` (numerator, denominator) pairs per dimension.
+    Each point's coordinate lies anywhere in the cell [numerator / denominator, (numerator + 1) / denominator).
+    """
+    dims = []
+
+    if strategy == 'latin_hypercube':
+        # each dimension is split into n equal strata, and every stratum gets exactly one point
+        for _ in range(num_dims):
+            strata = list(range(n))
+            rng.shuffle(strata)
+            dims.append([(s, n) for s in strata])
+
+    else:
+        # Halton sequence with a random shift per dimension (Cranley-Patterson rotation),
+        # so different seeds give different but equally well spread point sets
+        resolution = 1 << 52
+        for base in _primes(num_dims):
+            shift = rng.random()
+            dims.append([(int(((_radical_inverse(i, base) + shift) % 1.0) * resolution), resolution)
+                         for i in range(1, n + 1)])
+
+    return dims
+
+
+def _to_digits(value, base, length, alphabet):
+    """ Return ``value`` written with ``length`` base-``base`` digits, using ``alphabet`` characters as digits. """
+    digits = []
+
+    for _ in range(length):
+        value, digit = divmod(value, base)
+        digits.append(alphabet[digit])
+
+    return ''.join(reversed(digits))
+
+
+def create_population(gene_length, n, gene_class=BinaryGene, rng=None, strategy='uniform',
+                      chromosome_class=Chromosome):
+    """
+    Create a population of chromosomes with random DNA, much faster than ``Chromosome.create_random``.
+
+    Initialization strategies:
+      * "uniform" - every DNA element is drawn independently; the whole population's DNA
+                    comes from a single bulk draw (see ``random_dna``)
+      * "latin_hypercube" - each gene is decoded as an integer (its DNA read as digits in
+                            ``GENETIC_MATERIAL_OPTIONS`` order, as ``translators.BinaryIntTranslator``
+                            and ``translators.Base10IntTranslator`` do) and the range of every gene
+                            is split into ``n`` strata with exactly one chromosome in each
+      * "halton" - genes are decoded as for "latin_hypercube" and placed on a randomly shifted
+                   Halton low-discrepancy sequence, one prime base per gene
+
+    Quasi-random strategies spread the initial population evenly over the decoded values,
+    which helps most when the population is small relative to the number of genes.
+
+    gene_length:  int (or sequence of ints) describing gene DNA length
+    n:  number of chromosomes to create
+    gene_class (default=BinaryGene):  subclass of ``genes.BaseGene`` to use for genes
+    rng (default=None):  ``random.Random`` instance (or seed) to draw from; defaults to the ``random`` module
+    strategy (default="uniform"):  initialization strategy, one of ``STRATEGIES``
+    chromosome_class (default=Chromosome):  class of the created chromosomes, constructed from a list of genes
+
+    return:  list of ``n`` new chromosomes
+    """
+    assert strategy in STRATEGIES
+    rng = make_rng(rng)
+
+    if not hasattr(gene_length, '__iter__'):
+        gene_length = [gene_length]
+    gene_length = list(gene_length)
+
+    alphabet = gene_class.GENETIC_MATERIAL_OPTIONS
+    make_gene = gene_class._from_valid_dna
+
+    if strategy == 'uniform':
+        chromosome_length = sum(gene_length)
+        dna = random_dna(alphabet, chromosome_length * n, rng=rng)
+        chromosomes = []
+
+        for start in range(0, chromosome_length * n, chromosome_length):
+            genes = []
+            for length in gene_length:
+                genes.append(make_gene(dna[start:start + length]))
+                start += length
+            chromosomes.append(chromosome_class(genes))
+
+        return chromosomes
+
+    base = len(alphabet)
+    dims = _sample_points(strategy, n, len(gene_length), rng)
+    gene_dnas = []
+
+    for length, cells in zip(gene_length, dims):
+        num_values = base ** length
+        # a uniformly random value within each point's cell of the gene's integer range
+        gene_dnas.append([_to_digits((numerator * num_values + rng.randrange(num_values)) // denominator,
+                                     base, length, alphabet)
+                          for numerator, denominator in cells])
+
+    return [chromosome_class([make_gene(dnas[i]) for dnas in gene_dnas]) for i in range(n)]
+
+
+def create_float_population(bounds, n, rng=None, strategy='uniform', **kwargs):
+    """
+    Create a population of ``chromosomes.FloatChromosome`` solutions with a given initialization strategy.
+
+    bounds:  sequence of (low, high) pairs, one per value
+    n:  number of chromosomes to create
+    rng (default=None):  ``random.Random`` instance (or seed) to draw from; defaults to the ``random`` module
+    strategy (default="uniform"):  initialization strategy, one of ``STRATEGIES`` (see ``create_population``)
+    **kwargs:  forwarded to the ``FloatChromosome`` constructor
+
+    return:  list of ``n`` new chromosomes
+    """
+    assert strategy in STRATEGIES
+    rng = make_rng(rng)
+    bounds = tuple((low, high) for low, high in bounds)
+
+    if strategy == 'uniform':
+        return [FloatChromosome([rng.uniform(low, high) for low, high in bounds], bounds, **kwargs) for _ in range(n)]
+
+    dims = _sample_points(strategy, n, len(bounds), rng)
+    columns = [[low + (high - low) * (numerator + rng.random()) / denominator for numerator, denominator in cells]
+               for (low, high), cells in zip(bounds, dims)]
+
+    return [FloatChromosome([column[i] for column in columns], bounds, **kwargs) for i in range(n)]
@@ -0,0 +1,227 @@
+"""
+Inner loops of the genetic operators, written as small kernels over plain numbers.
+
+Every kernel is a plain loop that also compiles with Numba's ``njit``. When Numba is installed
+(``pip install numba``), the compiled versions are used; otherwise, or when the ``GA_DISABLE_JIT``
+environment variable is set, the pure-Python implementations run. Numba (and NumPy) are only imported,
+and the kernels compiled, when a numba kernel is first called, so importing the library stays fast. Where a faster pure-Python
+equivalent exists (``bisect`` for ``cdf_indices``, the set-based ``PermutationChromosome._order_crossover``),
+that is the reference implementation and the operators only call the kernel with the numba backend.
+
+Kernels never draw random numbers themselves:  callers draw them from their ``rng`` in
+Python and pass them in, so both backends return identical results for the same seed.
+Each public function takes a ``backend`` argument ("python" or "numba") to force one
+implementation, e.g. to compare them; the default is ``BACKEND``.
+"""
+import bisect
+import importlib.util
+import os
+
+
+BACKENDS = ('python', 'numba')
+# numba is an optional dependency, looked up here without importing it (see ``_load_numba``)
+BACKEND = 'numba' if not os.environ.get('GA_DISABLE_JIT') and importlib.util.find_spec('numba') else 'python'
+
+
+def _survival_mask(fitness, rands, min_fit_ever, overall_fit_range, min_fit, current_fit_range,
+                   abs_fit_weight, rel_fit_weight, out):
+    for i in range(len(fitness)):
+        fit = fitness[i]
+        p_survival_absolute = (fit - min_fit_ever) / overall_fit_range if overall_fit_range != 0 else 1.0
+        p_survival_relative = (fit - min_fit) / current_fit_range if current_fit_range != 0 else 1.0
+        out[i] = rands[i] < p_survival_absolute * abs_fit_weight + p_survival_relative * rel_fit_weight
+
+
+def _cdf_indices(cdf, rands, out):
+    n = len(cdf)
+    for i in range(len(rands)):
+        # first index whose cumulative probability exceeds the draw, like bisect.bisect_right
+        rand = rands[i]
+        low = 0
+        high = n
+        while low < high:
+            mid = (low + high) // 2
+            if rand < cdf[mid]:
+                high = mid
+            else:
+                low = mid + 1
+        out[i] = low
+
+
+def _swap_mutation(order, rands, p_mutate):
+    n = len(order)
+    num_swaps = 0
+    for i in range(n):
+        rand = rands[i]
+        if rand < p_mutate:
+            # rand / p_mutate is uniform in [0, 1) given that position i mutates
+            j = min(int(rand / p_mutate * (n - 1)), n - 2)
+            if j >= i:
+                j += 1
+            tmp = order[i]
+            order[i] = order[j]
+            order[j] = tmp
+            num_swaps += 1
+    return num_swaps
+
+
+def _order_crossover(keep, fill, start, end, child):
+    n = len(keep)
+    kept = [False] * n
+    for pos in range(start, end + 1):
+        child[pos] = keep[pos]
+        kept[keep[pos]] = True
+
+    # the other parent's items, read from just after the segment and wrapping around,
+    # fill the child's positions after the segment, also wrapping around
+    pos = (end + 1) % n
+    for k in range(n):
+        item = fill[(end + 1 + k) % n]
+        if not kept[item]:
+            child[pos] = item
+            pos = (pos + 1) % n
+
+
+# loops compiled for the numba backend
+_SOURCES = {
+    'survival_mask': _survival_mask,
+    'cdf_indices': _cdf_indices,
+    'swap_mutation': _swap_mutation,
+    'order_crossover': _order_crossover,
+}
+
+# set by ``_load_numba``
+numpy = None
+_NUMBA = None
+
+
+def _load_numba():
+    """ Import numba and NumPy and compile the kernels, on first use of the numba backend. """
+    global numpy, _NUMBA
+
+    if _NUMBA is None:
+        try:
+            import numba
+            import numpy
+        except ImportError:
+            raise ImportError('the numba kernel backend requires numba')
+
+        _NUMBA = {name: numba.njit(cache=True)(fn) for name, fn in _SOURCES.items()}
+
+
+def _use_numba(backend):
+    if backend is None:
+        backend = BACKEND
+    assert backend in BACKENDS
+    if backend == 'numba':
+        _load_numba()
+    return backend == 'numba'
+
+
+def survival_mask(fitness, rands, min_fit_ever, max_fit_ever, abs_fit_weight, rel_fit_weight, backend=None):
+    """
+    Decide which members of a population survive competition (see ``BaseGeneticAlgorithm.compete``).
+
+    fitness:  fitness values of the population, sorted in ascending order
+    rands:  one uniform draw in [0, 1) per member
+    min_fit_ever:  lowest fitness seen in the run, including this population
+    max_fit_ever:  highest fitness seen in the run, including this population
+    abs_fit_weight:  weight of the survival probability from the run's fitness range
+    rel_fit_weight:  weight of the survival probability from the population's fitness range
+    backend (default=None):  "python" or "numba"; defaults to ``BACKEND``
+
+    return:  list of bools, ``True`` for survivors
+    """
+    assert len(fitness) == len(rands)
+    n = len(fitness)
+    if not n:
+        return []
+
+    args = (min_fit_ever, max_fit_ever - min_fit_ever, fitness[0], fitness[-1] - fitness[0],
+            abs_fit_weight, rel_fit_weight)
+
+    if _use_numba(backend):
+        out = numpy.empty(n, dtype=numpy.bool_)
+        _NUMBA['survival_mask'](numpy.asarray(fitness, dtype=numpy.float64),
+                                numpy.asarray(rands, dtype=numpy.float64), *args, out)
+        return out.tolist()
+
+    out = [False] * n
+    _survival_mask(fitness, rands, *args, out)
+    return out
+
+
+def cdf_indices(cdf, rands, backend=None):
+    """
+    Select indices from cumulative probabilities, one per draw (see ``util.weighted_choice``).
+
+    cdf:  non-decreasing cumulative probabilities in [0, 1], e.g. from ``util.compute_fitness_cdf``
+    rands:  uniform draws in [0, 1)
+    backend (default=None):  "python" or "numba"; defaults to ``BACKEND``
+
+    return:  list with, for each draw, the first index whose cumulative probability exceeds it
+             (``len(cdf)`` if there is none)
+    """
+    if _use_numba(backend):
+        out = numpy.empty(len(rands), dtype=numpy.int64)
+        _NUMBA['cdf_indices'](numpy.asarray(cdf, dtype=numpy.float64), numpy.asarray(rands, dtype=numpy.float64), out)
+        return out.tolist()
+
+    bisect_right = bisect.bisect_right
+    return [bisect_right(cdf, rand) for rand in rands]
+
+
+def swap_mutation(values, rands, p_mutate, backend=None):
+    """
+    Swap each element of a list with another, randomly chosen element with probability ``p_mutate``.
+
+    A position mutates if its draw is below ``p_mutate``, and the same draw, rescaled, picks its partner,
+    so exactly one draw per position is needed.
+
+    values:  list to reorder in place; may hold any objects
+    rands:  one uniform draw in [0, 1) per element
+    p_mutate:  probability in [0, 1] that each position is swapped
+    backend (default=None):  "python" or "numba"; defaults to ``BACKEND``
+
+    return:  number of swaps made
+    """
+    assert len(values) == len(rands)
+    if len(values) < 2 or p_mutate <= 0:
+        return 0
+
+    if _use_numba(backend):
+        # reorder an index array, then apply it to the (arbitrary) values
+        order = numpy.arange(len(values))
+        num_swaps = _NUMBA['swap_mutation'](order, numpy.asarray(rands, dtype=numpy.float64), p_mutate)
+        if num_swaps:
+            values[:] = [values[i] for i in order.tolist()]
+        return num_swaps
+
+    return _swap_mutation(values, rands, p_mutate)
+
+
+def order_crossover(keep, fill, start, end, backend=None):
+    """
+    Return an order crossover (OX) child of two orderings of the integers ``0..n-1``
+    (see ``PermutationChromosome.crossover``).
+
+    keep:  parent whose items at positions ``start..end`` (inclusive) are kept
+    fill:  parent whose order fills the remaining positions
+    start:  first position of the kept segment
+    end:  last position of the kept segment
+    backend (default=None):  "python" or "numba"; defaults to ``BACKEND``
+
+    return:  child ordering, as a list
+    """
+    assert len(keep) == len(fill)
+    assert 0 <= start <= end < len(keep)
+
+    if _use_numba(backend):
+        child = numpy.empty(len(keep), dtype=numpy.int64)
+        _NUMBA['order_crossover'](numpy.asarray(keep, dtype=numpy.int64), numpy.asarray(fill, dtype=numpy.int64),
+                                  start, end, child)
+        return child.tolist()
+
+    child = [0] * len(keep)
+    _order_crossover(keep, fill, start, end, child)
+    return child
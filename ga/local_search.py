@@ -0,0 +1,241 @@
+import abc
+
+from .chromosomes import FloatChromosome, PermutationChromosome, ReorderingSetChromosome
+
+
+class BaseLocalSearch(abc.ABC):
+    """
+    A local search operator refines the fittest chromosomes of a run in place,
+    turning a genetic algorithm into a hybrid ("memetic") one:  the GA explores
+    the search space and local search quickly climbs to the nearby optimum.
+
+    Operators are passed to ``BaseGeneticAlgorithm.run`` with the ``local_search`` argument.
+    Every ``every`` generations, the ``top_k`` fittest distinct chromosomes are improved,
+    spending at most ``budget`` (uncached) fitness evaluations between them.
+    Candidates are scored with the GA's ``get_fitness``, so they share its fitness cache.
+
+    Subclasses define a neighborhood with the ``moves`` method, and the default ``improve``
+    climbs it by first improvement; operators that need more control override ``improve``.
+    """
+    def __init__(self, every=10, top_k=1, budget=100):
+        """
+        every (default=10):  apply local search every N generations
+        top_k (default=1):  number of fittest distinct chromosomes to improve
+        budget (default=100):  fitness evaluations allowed each time local search is applied
+        """
+        assert every >= 1
+        assert top_k >= 1
+        assert budget >= 1
+        self.every = every
+        self.top_k = top_k
+        self.budget = budget
+
+        # statistics for the current run
+        self.num_evaluations = 0
+        self.num_improvements = 0
+
+    def start(self, ga):
+        """
+        Reset any state before a run begins.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        self.num_evaluations = 0
+        self.num_improvements = 0
+
+    def apply(self, ga, generation):
+        """
+        Improve the fittest chromosomes of the GA's population in place, if local search is due.
+        The population's fitness must already be cached (see ``BaseGeneticAlgorithm.evaluate``).
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``
+        generation:  1-based number of the current generation
+        """
+        if generation % self.every:
+            return
+
+        # the fittest chromosome for each distinct DNA, fittest first
+        candidates = {}
+        for chromosome in sorted(ga.chromosomes, key=ga.get_fitness, reverse=True):
+            candidates.setdefault(chromosome.dna, chromosome)
+            if len(candidates) == self.top_k:
+                break
+
+        start_evaluations = ga.num_evaluations
+
+        for chromosome in candidates.values():
+            remaining = self.budget - (ga.num_evaluations - start_evaluations)
+            if remaining <= 0:
+                break
+
+            fitness = ga.get_fitness(chromosome)
+            if self.improve(ga, chromosome, remaining) > fitness:
+                self.num_improvements += 1
+
+        self.num_evaluations += ga.num_evaluations - start_evaluations
+
+    def improve(self, ga, chromosome, max_evaluations):
+        """
+        Climb from a chromosome by first improvement:  take the first move that raises fitness,
+        then search again from there, until no move improves or the budget is spent.
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``, used to score candidates
+        chromosome:  chromosome to improve in place
+        max_evaluations:  number of (uncached) fitness evaluations allowed
+
+        return:  the chromosome's new fitness
+        """
+        start_evaluations = ga.num_evaluations
+        fitness = ga.get_fitness(chromosome)
+        improved = True
+
+        while improved:
+            improved = False
+
+            for dna in self.moves(chromosome, ga.rng):
+                if ga.num_evaluations - start_evaluations >= max_evaluations:
+                    return fitness
+
+                candidate_fit = self.try_move(ga, chromosome, dna, fitness)
+                if candidate_fit is not None:
+                    fitness = candidate_fit
+                    improved = True
+                    break
+
+        return fitness
+
+    def try_move(self, ga, chromosome, dna, fitness):
+        """
+        Score a chromosome's neighbor and move the chromosome there if it is fitter.
+
+        dna:  DNA of the neighbor
+        fitness:  the chromosome's current fitness
+
+        return:  the neighbor's fitness if the chromosome moved, else ``None``
+        """
+        candidate = chromosome.copy()
+        candidate.dna = dna
+        candidate_fit = ga.get_fitness(candidate)
+
+        if candidate_fit > fitness:
+            chromosome.dna = candidate.dna
+            return candidate_fit
+        return None
+
+    def moves(self, chromosome, rng):
+        """
+        Generate the DNA of a chromosome's neighbors.
+
+        chromosome:  chromosome to search around; must not be modified
+        rng:  ``random.Random`` instance for ordering the neighborhood
+
+        return:  iterable of DNA values
+        """
+        raise NotImplementedError
+
+    def __str__(self):
+        return type(self).__name__
+
+
+class BitFlipHillClimb(BaseLocalSearch):
+    """
+    Hill climbing over single-bit flips, for chromosomes made of ``genes.BinaryGene`` DNA.
+    Bits are tried in a random order.
+    """
+    def moves(self, chromosome, rng):
+        dna = chromosome.dna
+        assert isinstance(dna, str) and set(dna) <= {'0', '1'}
+
+        positions = list(range(len(dna)))
+        rng.shuffle(positions)
+
+        for i in positions:
+            yield dna[:i] + ('1' if dna[i] == '0' else '0') + dna[i + 1:]
+
+
+class TwoOpt(BaseLocalSearch):
+    """
+    2-opt for orderings:  reverse a segment of the order, which for a round trip replaces
+    two legs with two others. Works with ``chromosomes.PermutationChromosome`` and
+    ``chromosomes.ReorderingSetChromosome`` (whose genes are reordered as whole units).
+    Segments are tried from a random order of start positions.
+    """
+    def moves(self, chromosome, rng):
+        if isinstance(chromosome, PermutationChromosome):
+            items = chromosome.values[:]
+            join = tuple
+        else:
+            assert isinstance(chromosome, ReorderingSetChromosome)
+            items = [g.dna for g in chromosome]
+            join = ''.join
+
+            # reordered DNA is split back into genes by length
+            assert len(set(len(dna) for dna in items)) == 1
+
+        n = len(items)
+        starts = list(range(n - 1))
+        rng.shuffle(starts)
+
+        for i in starts:
+            for j in range(i + 2, n + 1):
+                yield join(items[:i] + items[i:j][::-1] + items[j:])
+
+
+class CoordinateDescent(BaseLocalSearch):
+    """
+    Coordinate descent for ``chromosomes.FloatChromosome`` solutions.
+
+    Each value in turn is stepped up and down by ``step`` times the width of its bounds,
+    keeping any step that improves fitness. When a full sweep finds no improvement,
+    the step is multiplied by ``shrink``, until it falls below ``min_step``.
+    """
+    def __init__(self, step=0.1, shrink=0.5, min_step=1e-6, **kwargs):
+        """
+        step (default=0.1):  initial step, as a fraction of each value's bounds
+        shrink (default=0.5):  factor in (0, 1) applied to the step after a sweep without improvement
+        min_step (default=1e-6):  smallest step tried
+        **kwargs:  forwarded to ``BaseLocalSearch`` constructor
+        """
+        super().__init__(**kwargs)
+        assert step > 0
+        assert 0 < shrink < 1
+        assert 0 < min_step <= step
+        self.step = step
+        self.shrink = shrink
+        self.min_step = min_step
+
+    def improve(self, ga, chromosome, max_evaluations):
+        assert isinstance(chromosome, FloatChromosome)
+
+        start_evaluations = ga.num_evaluations
+        fitness = ga.get_fitness(chromosome)
+        step = self.step
+        order = list(range(chromosome.length))
+
+        while step >= self.min_step:
+            improved = False
+            ga.rng.shuffle(order)
+
+            for i in order:
+                low, high = chromosome.bounds[i]
+
+                for direction in (1, -1):
+                    if ga.num_evaluations - start_evaluations >= max_evaluations:
+                        return fitness
+
+                    values = chromosome.values[:]
+                    values[i] += direction * step * (high - low)
+
+                    candidate_fit = self.try_move(ga, chromosome, values, fitness)
+                    if candidate_fit is not None:
+                        fitness = candidate_fit
+                        improved = True
+                        break
+
+            if not improved:
+                step *= self.shrink
+
+        return fitness
+
+    def __str__(self):
+        return 'CoordinateDescent(step={})'.format(self.step)
@@ -0,0 +1,241 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+
+from .util import dnas_diversity
+
+
+class MetricsExporter:
+    """
+    Publishes live metrics of a running genetic algorithm, either from a local HTTP endpoint
+    in Prometheus text format or as a JSON file rewritten every ``interval`` seconds.
+
+    Pass an exporter to ``BaseGeneticAlgorithm.run`` with the ``metrics`` argument. At the end
+    of each generation the run hands over a small snapshot (counters, best and mean fitness,
+    phase timings and the population's DNA values); everything else, including
+    the O(population * length) diversity measure, is computed in a background thread
+    only when metrics are actually read or written.
+
+    Published metrics:
+      * generation, elapsed run time
+      * fitness evaluations, evaluations per second (since the previous export), cache hits and hit rate
+      * overall best, generation best and population mean fitness
+      * population diversity (see ``util.dna_diversity``)
+      * cumulative seconds spent in each phase of a generation (see ``BaseGeneticAlgorithm.phase_time_s``)
+    """
+    def __init__(self, port=None, path=None, interval=5.0, host='127.0.0.1', prefix='ga'):
+        """
+        port (default=None):  serve Prometheus text format over HTTP on this port (0 picks a free port
+                              each time the endpoint starts; see ``port`` attribute once started)
+        path (default=None):  write metrics as JSON to this file every ``interval`` seconds
+        interval (default=5.0):  seconds between JSON file writes
+        host (default="127.0.0.1"):  address the HTTP endpoint listens on
+        prefix (default="ga"):  prefix of Prometheus metric names
+
+        At least one of ``port`` and ``path`` must be given.
+        """
+        assert port is not None or path is not None
+        assert interval > 0
+        self.port = port
+        self._requested_port = port
+        self.path = path
+        self.interval = interval
+        self.host = host
+        self.prefix = prefix
+
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rate_sample = None       # (elapsed seconds, evaluations, rate) at the previous export
+        self._diversity = (None, None)  # (generation, diversity) computed last
+
+        self._server = None
+        self._writer = None
+        self._stop_event = threading.Event()
+
+    def start(self, ga):
+        """
+        Start publishing, called when a run begins.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        self._snapshot = None
+        self._rate_sample = None
+        self._diversity = (None, None)
+        self._stop_event.clear()
+
+        if self._requested_port is not None and self._server is None:
+            self._server = ThreadingHTTPServer((self.host, self._requested_port), self._make_handler())
+            self._server.daemon_threads = True
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+        if self.path is not None and self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, daemon=True)
+            self._writer.start()
+
+    def update(self, ga, generation, start_time):
+        """
+        Record the state of the run, called at the end of each generation.
+        Only cheap work happens here; metrics are derived when they are read.
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``
+        generation:  1-based number of the generation that just finished
+        start_time:  ``time.time()`` when the run started
+        """
+        # DNA values are immutable and already cached by the chromosomes, so the
+        # background thread can use them without touching the live population
+        dnas = [c.dna for c in ga.chromosomes]
+        cache = ga.fitness_cache
+        fitnesses = [fit for fit in (cache.get(dna) for dna in dnas) if fit is not None]
+
+        # replacing the reference is atomic, so readers never see a partial snapshot
+        self._snapshot = {
+            'generation': generation,
+            'elapsed_s': time.time() - start_time,
+            'evaluations': ga.num_evaluations,
+            'cache_hits': ga.num_cache_hits,
+            'best_fitness': ga.overall_fittest_fit.get(generation),
+            'generation_best_fitness': ga.generation_fittest_fit.get(generation),
+            'mean_fitness': sum(fitnesses) / len(fitnesses) if fitnesses else None,
+            'phase_time_s': dict(ga.phase_time_s),
+            'dnas': dnas,
+        }
+
+    def stop(self):
+        """ Write the final metrics and stop the JSON writer, called when a run ends. The HTTP endpoint keeps serving. """
+        self._stop_event.set()
+
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+
+    def close(self):
+        """ Stop publishing and shut down the HTTP endpoint. """
+        self.stop()
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def collect(self):
+        """
+        Return the current metrics as a dict, or ``None`` before the first generation has finished.
+        Safe to call from any thread.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+
+        with self._lock:
+            elapsed = snapshot['elapsed_s']
+            evaluations = snapshot['evaluations']
+
+            # rate between the run times of this and the previous export's snapshots
+            if self._rate_sample is None:
+                rate = evaluations / elapsed if elapsed > 0 else 0.0
+            else:
+                last_elapsed, last_evaluations, rate = self._rate_sample
+                if elapsed > last_elapsed:
+                    rate = (evaluations - last_evaluations) / (elapsed - last_elapsed)
+            self._rate_sample = (elapsed, evaluations, rate)
+
+            generation, diversity = self._diversity
+            if generation != snapshot['generation']:
+                diversity = dnas_diversity(snapshot['dnas'])
+                self._diversity = (snapshot['generation'], diversity)
+
+        lookups = evaluations + snapshot['cache_hits']
+
+        metrics = {key: value for key, value in snapshot.items() if key != 'dnas'}
+        metrics['evaluations_per_s'] = rate
+        metrics['cache_hit_rate'] = snapshot['cache_hits'] / lookups if lookups else 0.0
+        metrics['diversity'] = diversity
+
+        return metrics
+
+    def render_prometheus(self):
+        """ Return the current metrics in Prometheus text exposition format. """
+        metrics = self.collect()
+        if metrics is None:
+            return ''
+
+        lines = []
+
+        def add(name, kind, help_text, value, labels=''):
+            if value is None:
+                return
+            full_name = '{}_{}'.format(self.prefix, name)
+            if not labels:
+                lines.append('# HELP {} {}'.format(full_name, help_text))
+                lines.append('# TYPE {} {}'.format(full_name, kind))
+            lines.append('{}{} {}'.format(full_name, labels, float(value)))
+
+        add('generation', 'gauge', 'Last finished generation.', metrics['generation'])
+        add('run_seconds', 'gauge', 'Wall-clock time since the run started.', metrics['elapsed_s'])
+        add('evaluations_total', 'counter', 'Fitness evaluations performed.', metrics['evaluations'])
+        add('evaluations_per_second', 'gauge', 'Fitness evaluations per second since the previous scrape.',
+            metrics['evaluations_per_s'])
+        add('cache_hits_total', 'counter', 'Population fitness lookups served from the fitness cache.',
+            metrics['cache_hits'])
+        add('cache_hit_ratio', 'gauge', 'Fraction of fitness lookups served from the fitness cache.',
+            metrics['cache_hit_rate'])
+        add('best_fitness', 'gauge', 'Best fitness found so far in the run.', metrics['best_fitness'])
+        add('generation_best_fitness', 'gauge', 'Best fitness in the last generation.',
+            metrics['generation_best_fitness'])
+        add('mean_fitness', 'gauge', 'Mean fitness of the population.', metrics['mean_fitness'])
+        add('diversity', 'gauge', 'Mean per-locus DNA diversity of the population.', metrics['diversity'])
+
+        phases = sorted(metrics['phase_time_s'].items())
+        if phases:
+            name = '{}_phase_seconds_total'.format(self.prefix)
+            lines.append('# HELP {} Time spent in each phase of a generation.'.format(name))
+            lines.append('# TYPE {} counter'.format(name))
+            for phase, seconds in phases:
+                add('phase_seconds_total', 'counter', '', seconds, labels='{{phase="{}"}}'.format(phase))
+
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self):
+        """ Write the current metrics to ``path``, replacing the file atomically. """
+        metrics = self.collect()
+        if metrics is None:
+            return
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump(metrics, outfile, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _write_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.write_json()
+
+        # final state at the end of the run
+        self.write_json()
+
+    def _make_handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # keep scrapes out of the run's output
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
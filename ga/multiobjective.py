@@ -0,0 +1,369 @@
+import abc
+import time
+
+from .algorithms import BaseGeneticAlgorithm
+from .stopping import BaseStoppingCriterion, AnyOf
+
+
+def dominates(fit1, fit2):
+    """
+    Return whether fitness vector ``fit1`` Pareto-dominates ``fit2``.
+
+    All objectives are maximized:  ``fit1`` dominates ``fit2`` if it is at least as good
+    in every objective and strictly better in at least one.
+    """
+    better = False
+
+    for a, b in zip(fit1, fit2):
+        if a < b:
+            return False
+        if a > b:
+            better = True
+
+    return better
+
+
+def fast_non_dominated_sort(fitnesses):
+    """
+    Sort fitness vectors into Pareto fronts (Deb et al., NSGA-II), in O(M * N^2) for N vectors of M objectives.
+
+    fitnesses:  sequence of fitness vectors
+
+    return:  list of fronts, each a list of indices into ``fitnesses``; front 0 is non-dominated
+    """
+    n = len(fitnesses)
+    dominated_by = [[] for _ in range(n)]  # indices that each solution dominates
+    num_dominators = [0] * n
+
+    for i in range(n):
+        fit_i = fitnesses[i]
+
+        for j in range(i + 1, n):
+            fit_j = fitnesses[j]
+
+            if dominates(fit_i, fit_j):
+                dominated_by[i].append(j)
+                num_dominators[j] += 1
+            elif dominates(fit_j, fit_i):
+                dominated_by[j].append(i)
+                num_dominators[i] += 1
+
+    fronts = [[i for i in range(n) if num_dominators[i] == 0]]
+
+    while fronts[-1]:
+        next_front = []
+
+        for i in fronts[-1]:
+            for j in dominated_by[i]:
+                num_dominators[j] -= 1
+
+                if num_dominators[j] == 0:
+                    next_front.append(j)
+
+        fronts.append(next_front)
+
+    return fronts[:-1]
+
+
+def crowding_distance(fitnesses, front):
+    """
+    Compute NSGA-II crowding distances for one front.
+
+    Boundary solutions of each objective get an infinite distance; others get the sum over
+    objectives of the normalized gap between their neighbors.
+
+    fitnesses:  sequence of fitness vectors
+    front:  indices into ``fitnesses`` that make up the front
+
+    return:  dict mapping index -> crowding distance
+    """
+    distance = {i: 0.0 for i in front}
+
+    if len(front) <= 2:
+        for i in front:
+            distance[i] = float('inf')
+        return distance
+
+    num_objectives = len(fitnesses[front[0]])
+
+    for m in range(num_objectives):
+        ordered = sorted(front, key=lambda i: fitnesses[i][m])
+        low = fitnesses[ordered[0]][m]
+        high = fitnesses[ordered[-1]][m]
+
+        distance[ordered[0]] = distance[ordered[-1]] = float('inf')
+
+        if high == low:
+            continue
+
+        for k in range(1, len(ordered) - 1):
+            gap = fitnesses[ordered[k + 1]][m] - fitnesses[ordered[k - 1]][m]
+            distance[ordered[k]] += gap / (high - low)
+
+    return distance
+
+
+class ParetoArchive:
+    """
+    An archive of the non-dominated solutions found during a multi-objective run.
+
+    Solutions are stored as copies so later evolution cannot change them.
+    When ``max_size`` is set, the most crowded solutions are dropped first.
+    """
+    def __init__(self, max_size=None):
+        """
+        max_size (default=None):  maximum number of solutions to keep; unlimited if ``None``
+        """
+        assert max_size is None or max_size >= 2
+        self.max_size = max_size
+
+        # maps DNA -> (chromosome copy, fitness vector)
+        self._solutions = {}
+
+    def add(self, chromosome, fitness):
+        """
+        Offer a solution to the archive.
+
+        return:  whether the solution was added (it is not dominated by, or equal to, an archived solution)
+        """
+        dna = chromosome.dna
+        if dna in self._solutions:
+            return False
+
+        dominated = []
+        for other_dna, (_, other_fit) in self._solutions.items():
+            if dominates(other_fit, fitness) or tuple(other_fit) == tuple(fitness):
+                return False
+            if dominates(fitness, other_fit):
+                dominated.append(other_dna)
+
+        for other_dna in dominated:
+            del self._solutions[other_dna]
+
+        self._solutions[dna] = (chromosome.copy(), tuple(fitness))
+
+        if self.max_size is not None and len(self._solutions) > self.max_size:
+            self._prune()
+
+        return True
+
+    def _prune(self):
+        """ Drop the most crowded solutions until the archive fits ``max_size``. """
+        while len(self._solutions) > self.max_size:
+            keys = list(self._solutions)
+            fitnesses = [self._solutions[k][1] for k in keys]
+            distance = crowding_distance(fitnesses, list(range(len(keys))))
+            most_crowded = min(distance, key=distance.get)
+            del self._solutions[keys[most_crowded]]
+
+    @property
+    def chromosomes(self):
+        """ Return the archived chromosomes. """
+        return [c for c, _ in self._solutions.values()]
+
+    @property
+    def fitnesses(self):
+        """ Return the archived fitness vectors, in the same order as ``chromosomes``. """
+        return [fit for _, fit in self._solutions.values()]
+
+    def clear(self):
+        self._solutions.clear()
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def __iter__(self):
+        return iter(self._solutions.values())
+
+
+class BaseMultiObjectiveGA(BaseGeneticAlgorithm):
+    """
+    Multi-objective genetic algorithm based on NSGA-II.
+
+    Subclasses must override the ``eval_fitness`` method to return a sequence of objective
+    values, all of which are maximized (negate any cost you want minimized). Fitness vectors
+    are cached the same way as scalar fitness.
+
+    Each generation, offspring are bred by binary tournament on (Pareto rank, crowding distance)
+    using the chromosomes' own ``crossover`` and ``mutate`` methods. Parents and offspring are
+    then merged and the next population is filled front by front, breaking ties in the last
+    front by crowding distance. Non-dominated solutions are collected in ``archive``.
+    """
+    def __init__(self, chromosomes, translator=None, archive_size=None, rng=None):
+        """
+        Construct a new ``BaseMultiObjectiveGA`` instance.
+
+        chromosomes:  collection of initial chromosomes
+        translator (default=None):  ``translators.BaseTranslator`` instance that may be needed
+                                    by ``eval_fitness`` method
+        archive_size (default=None):  maximum size of the Pareto archive; unlimited if ``None``
+        rng (default=None):  random number generator (see ``BaseGeneticAlgorithm``)
+        """
+        super().__init__(chromosomes, translator=translator, rng=rng)
+        self.archive = ParetoArchive(archive_size)
+
+        # run results
+        self.generation_front_size = {}
+
+    @abc.abstractmethod
+    def eval_fitness(self, chromosome):
+        """
+        Evaluate the fitness vector for a chromosome.
+        Does not use caching.
+        You should probably call get_fitness().
+
+        return:  sequence of objective values, all maximized
+        """
+        pass
+
+    def rank(self, chromosomes):
+        """
+        Compute Pareto rank and crowding distance for a population.
+
+        return:  tuple of lists (fronts, rank, crowding), where ``fronts`` holds lists of indices
+                 and ``rank``/``crowding`` hold one value per chromosome
+        """
+        self.evaluate(chromosomes)
+        fitnesses = [self.get_fitness(c) for c in chromosomes]
+        fronts = fast_non_dominated_sort(fitnesses)
+
+        rank = [0] * len(chromosomes)
+        crowding = [0.0] * len(chromosomes)
+
+        for front_idx, front in enumerate(fronts):
+            distance = crowding_distance(fitnesses, front)
+
+            for i in front:
+                rank[i] = front_idx
+                crowding[i] = distance[i]
+
+        return fronts, rank, crowding
+
+    def tournament(self, chromosomes, rank, crowding):
+        """ Pick a parent by binary tournament:  lower rank wins, then larger crowding distance. """
+        i = self.rng.randrange(len(chromosomes))
+        j = self.rng.randrange(len(chromosomes))
+
+        if (rank[j], -crowding[j]) < (rank[i], -crowding[i]):
+            i = j
+
+        return chromosomes[i]
+
+    def breed(self, chromosomes, rank, crowding, p_crossover, two_point_crossover=False):
+        """
+        Create one offspring per population member by tournament selection and crossover.
+        Offspring are copies; parents are not changed.
+
+        return:  list of offspring
+        """
+        offspring = []
+
+        while len(offspring) < len(chromosomes):
+            c1 = self.tournament(chromosomes, rank, crowding).copy()
+
+            if self.rng.random() < p_crossover:
+                c2 = self.tournament(chromosomes, rank, crowding).copy()
+                point1 = self.rng.randrange(0, c1.length)
+                point2 = self.rng.randrange(point1 + 1, c1.length + 1) if two_point_crossover else None
+                c1.crossover(c2, point1, point2, rng=self.rng)
+
+                offspring.append(c1)
+                if len(offspring) < len(chromosomes):
+                    offspring.append(c2)
+            else:
+                offspring.append(c1)
+
+        return offspring
+
+    def select(self, chromosomes, size):
+        """
+        Choose the next population of ``size`` chromosomes, front by front,
+        filling the last partial front with its least crowded members.
+
+        return:  tuple (selected chromosomes, first front of ``chromosomes`` as indices)
+        """
+        fronts, _, _ = self.rank(chromosomes)
+        fitnesses = [self.get_fitness(c) for c in chromosomes]
+        selected = []
+
+        for front in fronts:
+            if len(selected) + len(front) <= size:
+                selected.extend(chromosomes[i] for i in front)
+            else:
+                distance = crowding_distance(fitnesses, front)
+                front = sorted(front, key=distance.get, reverse=True)
+                selected.extend(chromosomes[i] for i in front[:size - len(selected)])
+
+            if len(selected) == size:
+                break
+
+        return selected, fronts[0]
+
+    def run(self, generations, p_mutate, p_crossover, two_point_crossover=False, stopping=None):
+        """
+        Run an NSGA-II simulation for a set number of generations, each consisting of:
+
+          1. breeding offspring from the current population (``breed`` method)
+          2. mutating the offspring (``mutate`` method)
+          3. choosing the next population from parents plus offspring (``select`` method)
+          4. adding the new first front to the Pareto archive
+
+        generations:  how many generations to run
+        p_mutate:  probability of mutation in [0, 1]
+        p_crossover:  probability in [0, 1] that a crossover event will occur for each offspring
+        two_point_crossover (default=False):  whether 2-point crossover is used
+        stopping (default=None):  ``stopping.BaseStoppingCriterion`` (or a sequence of them); only criteria based on
+                                  time, evaluations or diversity apply, since there is no single best fitness;
+                                  others (such as ``TargetFitness``) raise ``ValueError``
+
+        return:  list of non-dominated chromosomes in the Pareto archive
+        """
+        start_time = time.time()
+
+        assert 0 <= p_mutate <= 1
+        assert 0 <= p_crossover <= 1
+
+        if stopping is not None and not isinstance(stopping, BaseStoppingCriterion):
+            stopping = AnyOf(*stopping)
+
+        if stopping is not None and stopping.uses_fitness:
+            raise ValueError('{} needs a single best fitness, which multi-objective runs do not have'.format(stopping))
+
+        self.archive.clear()
+        self.generation_front_size.clear()
+        self.stopped_by = None
+
+        if stopping is not None:
+            stopping.start(self)
+
+        pop_size = len(self.chromosomes)
+        population = list(self.chromosomes)
+
+        for gen in range(1, generations + 1):
+            _, rank, crowding = self.rank(population)
+            offspring = self.breed(population, rank, crowding, p_crossover, two_point_crossover=two_point_crossover)
+            self.mutate(offspring, p_mutate)
+
+            combined = population + offspring
+            population, first_front = self.select(combined, pop_size)
+            self.chromosomes = population
+
+            for i in first_front:
+                self.archive.add(combined[i], self.get_fitness(combined[i]))
+
+            self.generation_front_size[gen] = len(first_front)
+
+            if stopping is not None and stopping.should_stop(self, gen, None):
+                self.stopped_by = stopping
+                print("stopping on generation", gen, "by", stopping)
+                break
+
+            # keep cached fitness for the surviving population only
+            survivors = {c.dna for c in population}
+            for dna in [dna for dna in self.fitness_cache if dna not in survivors]:
+                del self.fitness_cache[dna]
+            self.phenotype_cache.clear()
+
+        self.run_time_s = time.time() - start_time
+
+        return self.archive.chromosomes
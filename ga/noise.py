@@ -0,0 +1,149 @@
+import collections
+import math
+
+from .util import RunningStats
+
+
+class NoisyFitness:
+    """
+    Support for stochastic fitness functions, such as simulations that return a different
+    result every time the same solution is evaluated.
+
+    Pass an instance to any ``BaseGeneticAlgorithm`` with the ``noise`` constructor argument.
+    Each ``eval_fitness`` call is then treated as one sample of a solution's fitness:
+    a running mean and variance are kept per genome (DNA), and survive the GA's per-generation
+    fitness cache clearing, so a surviving solution keeps its samples from generation to generation.
+    The fitness the GA sees for a genome is its sample mean.
+
+    New genomes get ``initial_samples`` samples. Extra samples then go only to genomes whose rank
+    is uncertain (racing):  the ``top_k`` genomes with the highest means are separated from the rest
+    by confidence intervals of ``confidence`` standard errors around each mean, and every genome
+    whose interval overlaps the other group's is sampled again, until the groups no longer overlap,
+    the genomes involved reach ``max_samples``, or ``race_budget`` extra samples have been spent.
+    Genomes whose fitness is clearly good or clearly bad are not resampled.
+    """
+    def __init__(self, initial_samples=2, max_samples=30, confidence=2.0, top_k=1, race_budget=None,
+                 max_genomes=10000):
+        """
+        initial_samples (default=2):  samples taken of every new genome (at least 2, so its variance is known)
+        max_samples (default=30):  samples after which a genome is no longer resampled
+        confidence (default=2.0):  half-width of confidence intervals, in standard errors of the mean
+        top_k (default=1):  number of best genomes to separate from the rest of each evaluated population
+        race_budget (default=None):  maximum number of extra samples each time a population is evaluated;
+                                     unlimited if ``None``
+        max_genomes (default=10000):  number of genomes whose statistics are kept (least recently evaluated are dropped)
+        """
+        assert initial_samples >= 2
+        assert max_samples >= initial_samples
+        assert confidence > 0
+        assert top_k >= 1
+        assert race_budget is None or race_budget >= 0
+        assert max_genomes >= 1
+        self.initial_samples = initial_samples
+        self.max_samples = max_samples
+        self.confidence = confidence
+        self.top_k = top_k
+        self.race_budget = race_budget
+        self.max_genomes = max_genomes
+
+        # maps DNA -> RunningStats of its fitness samples, least recently evaluated first
+        self.stats = collections.OrderedDict()
+
+        self.start(None)
+
+    def start(self, ga):
+        """
+        Reset sample counters before a run begins. Statistics per genome are kept.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        self.num_samples = 0
+        self.num_race_samples = 0
+
+    def reset(self):
+        """ Forget all statistics. """
+        self.stats.clear()
+        self.start(None)
+
+    def sample_count(self, dna):
+        """ Return the number of fitness samples taken of a genome (0 if unknown). """
+        stats = self.stats.get(dna)
+        return stats.n if stats is not None else 0
+
+    def std_err(self, dna):
+        """ Return the standard error of a genome's mean fitness (infinite with fewer than 2 samples). """
+        stats = self.stats.get(dna)
+        return stats.std_err if stats is not None and stats.n > 1 else math.inf
+
+    def _sample(self, ga, chromosomes):
+        """ Evaluate chromosomes (possibly repeated) once each, adding the results to their statistics. """
+        if not chromosomes:
+            return
+
+        for chromosome, fitness in zip(chromosomes, ga.eval_fitness_batch(chromosomes)):
+            self.stats[chromosome.dna].push(fitness)
+
+        ga.num_evaluations += len(chromosomes)
+        self.num_samples += len(chromosomes)
+
+    def _contenders(self, dnas):
+        """ Return the genomes whose confidence intervals overlap across the boundary of the top ``top_k``. """
+        if len(dnas) <= self.top_k:
+            return []
+
+        stats = self.stats
+        ranked = sorted(dnas, key=lambda dna: stats[dna].mean, reverse=True)
+
+        def bounds(dna):
+            s = stats[dna]
+            half_width = self.confidence * s.std_err if s.n > 1 else math.inf
+            return s.mean - half_width, s.mean + half_width
+
+        top = [(dna,) + bounds(dna) for dna in ranked[:self.top_k]]
+        rest = [(dna,) + bounds(dna) for dna in ranked[self.top_k:]]
+        top_lower = min(lower for _, lower, _ in top)
+        rest_upper = max(upper for _, _, upper in rest)
+
+        return ([dna for dna, lower, _ in top if lower < rest_upper] +
+                [dna for dna, _, upper in rest if upper > top_lower])
+
+    def evaluate(self, ga, chromosomes):
+        """
+        Sample and race a population, then cache every genome's mean fitness in the GA's ``fitness_cache``.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` whose chromosomes are evaluated
+        chromosomes:  chromosomes to evaluate
+        """
+        stats = self.stats
+        unique = {}
+
+        for chromosome in chromosomes:
+            unique.setdefault(chromosome.dna, chromosome)
+
+        batch = []
+        for dna, chromosome in unique.items():
+            if dna in stats:
+                stats.move_to_end(dna)
+            else:
+                stats[dna] = RunningStats()
+            batch.extend([chromosome] * (self.initial_samples - stats[dna].n))
+        self._sample(ga, batch)
+
+        remaining = self.race_budget
+        while remaining is None or remaining > 0:
+            batch = [unique[dna] for dna in self._contenders(list(unique)) if stats[dna].n < self.max_samples]
+            if not batch:
+                break
+
+            if remaining is not None:
+                batch = batch[:remaining]
+                remaining -= len(batch)
+
+            self._sample(ga, batch)
+            self.num_race_samples += len(batch)
+
+        for dna in unique:
+            ga.fitness_cache[dna] = stats[dna].mean
+
+        while len(stats) > max(self.max_genomes, len(unique)):
+            stats.popitem(last=False)
@@ -0,0 +1,340 @@
+import importlib
+import json
+import mmap
+import os
+import struct
+
+from .chromosomes import Chromosome
+from .genes import BaseGene
+
+
+# file layout:  MAGIC, header length (little-endian uint32), UTF-8 JSON header padded with spaces
+# so rows start on an 8-byte boundary, then one fixed-size row of bit-packed DNA per chromosome
+MAGIC = b'GAPOP\x00'
+VERSION = 1
+_HEADER_LENGTH = struct.Struct('<I')
+
+
+def _class_path(cls):
+    return '{}:{}'.format(cls.__module__, cls.__qualname__)
+
+
+def _import_class(path):
+    """ Import a class from a ``module:qualname`` path, raising ``ValueError`` if it does not exist. """
+    module_name, _, qualname = path.partition(':')
+
+    try:
+        obj = importlib.import_module(module_name)
+        for name in qualname.split('.'):
+            obj = getattr(obj, name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError('cannot import {}: {}'.format(path, e))
+
+    return obj
+
+
+class _RowCodec:
+    """
+    Packs DNA strings into fixed-size rows of bytes and back.
+
+    Each DNA element is stored as its index in the alphabet, using the fewest bits that fit
+    every index; binary DNA therefore costs 1 bit per element.
+    """
+    def __init__(self, alphabet, num_elements):
+        assert len(alphabet) == len(set(alphabet)) >= 1
+        self.alphabet = alphabet
+        self.num_elements = num_elements
+        self.bits_per_element = max(1, (len(alphabet) - 1).bit_length())
+        self.num_bits = num_elements * self.bits_per_element
+        self.row_bytes = (self.num_bits + 7) // 8
+        self.pad_bits = self.row_bytes * 8 - self.num_bits
+
+        k = self.bits_per_element
+        codes = [format(i, '0{}b'.format(k)) for i in range(len(alphabet))]
+        self._encode_table = str.maketrans(dict(zip(alphabet, codes)))
+        self._decode_table = dict(zip(codes, alphabet))
+        self._is_binary = alphabet == '01'
+
+    def encode(self, dna):
+        """ Return the packed row for a DNA string. """
+        if len(dna) != self.num_elements:
+            raise ValueError('DNA has {} elements, expected {}'.format(len(dna), self.num_elements))
+
+        bits = dna if self._is_binary else dna.translate(self._encode_table)
+        try:
+            value = int(bits, 2) if bits else 0
+        except ValueError:
+            raise ValueError('DNA contains elements outside the alphabet {!r}'.format(self.alphabet))
+
+        return (value << self.pad_bits).to_bytes(self.row_bytes, 'big')
+
+    def decode(self, row):
+        """ Return the DNA string for a packed row. """
+        if not self.num_elements:
+            return ''
+
+        bits = format(int.from_bytes(row, 'big') >> self.pad_bits, '0{}b'.format(self.num_bits))
+
+        if self._is_binary:
+            return bits
+
+        k = self.bits_per_element
+        try:
+            return ''.join([self._decode_table[bits[i:i + k]] for i in range(0, self.num_bits, k)])
+        except KeyError:
+            raise ValueError('row contains element codes outside the alphabet {!r}'.format(self.alphabet))
+
+
+def _make_header(template, translator=None, metadata=None):
+    """ Return the header dict describing chromosomes shaped like ``template``. """
+    genes = list(template)
+    if not genes or not all(isinstance(g, BaseGene) for g in genes):
+        raise ValueError('only chromosomes made of genes.BaseGene genes can be serialized')
+
+    gene_class = type(genes[0])
+    if not all(type(g) is gene_class for g in genes):
+        raise ValueError('all genes must be of the same class')
+
+    header = {
+        'version': VERSION,
+        'gene_class': _class_path(gene_class),
+        'alphabet': gene_class.GENETIC_MATERIAL_OPTIONS,
+        'gene_lengths': [g.length for g in genes],
+        'gene_names': [g.name for g in genes],
+        'translator': None,
+        'metadata': metadata or {},
+    }
+
+    if translator is not None:
+        header['translator'] = {'class': _class_path(type(translator)), 'params': translator.params()}
+
+    # fail now rather than when the file is read back
+    json.dumps(header)
+    return header
+
+
+def _encode_header(header):
+    """ Return the magic, length prefix and JSON header, padded so rows start 8-byte aligned. """
+    data = json.dumps(header, sort_keys=True).encode('utf-8')
+    prefix_length = len(MAGIC) + _HEADER_LENGTH.size
+    data += b' ' * (-(prefix_length + len(data)) % 8)
+
+    return MAGIC + _HEADER_LENGTH.pack(len(data)) + data
+
+
+def _decode_header(buffer):
+    """
+    Parse the start of a population file.
+
+    return:  tuple (header dict, offset of the first row)
+    """
+    prefix_length = len(MAGIC) + _HEADER_LENGTH.size
+
+    if len(buffer) < prefix_length or bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError('not a population file')
+
+    header_length, = _HEADER_LENGTH.unpack(bytes(buffer[len(MAGIC):prefix_length]))
+    data_offset = prefix_length + header_length
+
+    if len(buffer) < data_offset:
+        raise ValueError('population file header is truncated')
+
+    try:
+        header = json.loads(bytes(buffer[prefix_length:data_offset]).decode('utf-8'))
+    except ValueError as e:
+        raise ValueError('population file header is corrupt: {}'.format(e))
+
+    if header.get('version') != VERSION:
+        raise ValueError('unsupported population file version {!r}'.format(header.get('version')))
+
+    return header, data_offset
+
+
+class PopulationFile:
+    """
+    A read-only, memory-mapped population file written by ``PopulationWriter`` or ``write_population``.
+
+    Opening a file only parses its header, whatever the number of chromosomes; rows are
+    read from the memory map and decoded when accessed, so a few chromosomes can be drawn
+    from a very large file (e.g. to seed an initial population) without reading the rest.
+
+    Gene names are restored from the header; other gene attributes (such as ``suppressed``) are not stored.
+    """
+    def __init__(self, path):
+        """
+        path:  population file to open
+
+        Raises ``ValueError`` if the file is not a valid population file.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = b''
+
+        try:
+            if size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.header, self._data_offset = _decode_header(self._map)
+
+            self.gene_class = _import_class(self.header['gene_class'])
+            if not (isinstance(self.gene_class, type) and issubclass(self.gene_class, BaseGene)):
+                raise ValueError('{} is not a gene class'.format(self.header['gene_class']))
+            if self.gene_class.GENETIC_MATERIAL_OPTIONS != self.header['alphabet']:
+                raise ValueError('alphabet of {} has changed since the file was written'.format(self.header['gene_class']))
+
+            self.gene_lengths = self.header['gene_lengths']
+            self.gene_names = self.header.get('gene_names') or [None] * len(self.gene_lengths)
+            self.metadata = self.header.get('metadata', {})
+            self._codec = _RowCodec(self.header['alphabet'], sum(self.gene_lengths))
+
+            # a partially written last row (e.g. from an interrupted append) is ignored
+            self._num_rows = (size - self._data_offset) // self._codec.row_bytes if self._codec.row_bytes else 0
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def translator(self):
+        """ Return a new instance of the translator recorded in the header, or ``None``. """
+        spec = self.header.get('translator')
+        if spec is None:
+            return None
+
+        return _import_class(spec['class'])(**spec['params'])
+
+    def dna(self, index):
+        """ Return the DNA string of the chromosome at ``index``. """
+        if index < 0:
+            index += self._num_rows
+        if not 0 <= index < self._num_rows:
+            raise IndexError('population file index out of range')
+
+        start = self._data_offset + index * self._codec.row_bytes
+        return self._codec.decode(self._map[start:start + self._codec.row_bytes])
+
+    def chromosome(self, index):
+        """ Return a new chromosome for the row at ``index``. """
+        dna = self.dna(index)
+        genes = []
+        i = 0
+
+        for length, name in zip(self.gene_lengths, self.gene_names):
+            # decoded DNA is always within the alphabet
+            genes.append(self.gene_class._from_valid_dna(dna[i:i + length], name=name))
+            i += length
+
+        return Chromosome(genes)
+
+    def chromosomes(self, indices=None):
+        """
+        Return new chromosomes for several rows.
+
+        indices (default=None):  iterable of row indices (e.g. a ``range`` or a random sample); all rows if ``None``
+        """
+        if indices is None:
+            indices = range(self._num_rows)
+        return [self.chromosome(i) for i in indices]
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._num_rows
+
+    def __getitem__(self, index):
+        return self.chromosome(index)
+
+    def __iter__(self):
+        for i in range(self._num_rows):
+            yield self.chromosome(i)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PopulationWriter:
+    """
+    Writes chromosomes to a population file one row at a time, e.g. to export each generation's elites.
+
+    Every chromosome written must have the same gene layout (gene class and lengths) as ``template``.
+    Rows are appended as they are written, so the file can be read with ``PopulationFile`` at any time.
+    """
+    def __init__(self, path, template, translator=None, metadata=None, append=False):
+        """
+        path:  population file to write
+        template:  chromosome whose gene layout all written chromosomes share
+        translator (default=None):  ``translators.BaseTranslator`` whose class and parameters are recorded in the header
+        metadata (default=None):  JSON-serializable dict stored in the header
+        append (default=False):  add rows to an existing file with the same gene layout instead of replacing it;
+                                 raises ``ValueError`` if the layouts differ
+        """
+        header = _make_header(template, translator=translator, metadata=metadata)
+        self.path = path
+        self._codec = _RowCodec(header['alphabet'], sum(header['gene_lengths']))
+        self._gene_lengths = header['gene_lengths']
+
+        if append and os.path.exists(path) and os.path.getsize(path):
+            with PopulationFile(path) as existing:
+                for key in ('gene_class', 'alphabet', 'gene_lengths'):
+                    if existing.header[key] != header[key]:
+                        raise ValueError('cannot append to {}: {} differs'.format(path, key))
+                end = existing._data_offset + len(existing) * self._codec.row_bytes
+
+            self._file = open(path, 'r+b')
+            self._file.truncate(end)  # drop any partially written row
+            self._file.seek(end)
+        else:
+            self._file = open(path, 'wb')
+            self._file.write(_encode_header(header))
+
+    def _encode(self, chromosome):
+        gene_lengths = [len(g.dna) for g in chromosome]
+        if gene_lengths != self._gene_lengths:
+            raise ValueError('chromosome has gene lengths {}, expected {}'.format(gene_lengths, self._gene_lengths))
+
+        return self._codec.encode(chromosome.dna)
+
+    def write(self, chromosome):
+        """ Append a chromosome; raises ``ValueError`` if its gene lengths differ from the template's. """
+        self._file.write(self._encode(chromosome))
+
+    def write_dna(self, dna):
+        """ Append a DNA string, such as a snapshot from ``BaseGeneticAlgorithm.elites``. """
+        self._file.write(self._codec.encode(dna))
+
+    def write_many(self, chromosomes):
+        """ Append several chromosomes (see ``write``); nothing is written if any of them is rejected. """
+        encode = self._encode
+        self._file.write(b''.join([encode(c) for c in chromosomes]))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_population(path, chromosomes, translator=None, metadata=None):
+    """
+    Write a population to a new population file (see ``PopulationFile``).
+
+    path:  file to write
+    chromosomes:  non-empty sequence of chromosomes with the same gene layout
+    translator (default=None):  ``translators.BaseTranslator`` whose class and parameters are recorded in the header
+    metadata (default=None):  JSON-serializable dict stored in the header
+    """
+    assert chromosomes
+
+    with PopulationWriter(path, chromosomes[0], translator=translator, metadata=metadata) as writer:
+        writer.write_many(chromosomes)
@@ -0,0 +1,233 @@
+import collections
+import math
+import operator
+
+from .util import make_rng
+
+
+class Speciation:
+    """
+    Groups a population into species of similar genomes, so that several optima of a multi-modal
+    problem can be kept in the population at once (niching).
+
+    Pass an instance to any ``BaseGeneticAlgorithm`` with the ``speciation`` constructor argument.
+    Before each competition, the population is clustered, and:
+      * selection uses shared fitness (see ``BaseGeneticAlgorithm.selection_fitness``):  each
+        chromosome's fitness above the population's minimum is divided by the size of its species,
+        so a crowded optimum stops out-competing the others
+      * the ``elitism`` fittest members of every species always survive competition, and are
+        not mutated that generation (see ``BaseGeneticAlgorithm.species_elites``); a ``threshold`` so
+        small that most chromosomes found their own species therefore leaves little of the population to evolve
+      * crossover mates are chosen from the same species, so species do not dissolve into hybrids
+
+    Clustering is leader-based:  every species has a leader genome, and a chromosome joins the
+    species of a leader within ``threshold``, or else founds a new species and leads it.
+    Leaders are carried over to the next generation as the fittest member of their species.
+    Instead of measuring the distance to every leader, leaders are indexed by locality-sensitive
+    hashing:  each of ``num_bands`` hash tables keys a genome by a fixed random sample of ``band_size``
+    of its coordinates, and only leaders sharing a key with the chromosome in some table are compared,
+    those sharing the most keys first, until one is within ``threshold``. Most chromosomes join
+    a species after a distance check or two, so clustering costs close to O(n) per generation instead
+    of the O(n^2) of pairwise fitness sharing; a chromosome near a leader may occasionally miss it
+    and found a new species.
+
+    Distances are Hamming distances between DNA sequences (the number of differing elements),
+    or Euclidean distances between the vectors returned by ``features``, e.g. decoded solutions.
+    """
+    def __init__(self, threshold, features=None, elitism=1, num_bands=16, band_size=None, rng=None):
+        """
+        threshold:  maximum distance from a chromosome to the leader of its species
+        features (default=None):  function mapping a chromosome to a sequence of numbers
+                                  (e.g. a translator's ``translate_chromosome``); DNA is compared if ``None``
+        elitism (default=1):  number of fittest members of each species that always survive competition
+        num_bands (default=16):  number of hash tables in the leader index
+        band_size (default=None):  coordinates sampled by each hash table; if ``None``, chosen so that a genome
+                                   at distance ``threshold`` from a leader shares a key with it in some table
+                                   with probability 0.9
+        rng (default=None):  random number generator for the sampled coordinates (see ``util.make_rng``)
+        """
+        assert threshold > 0
+        assert elitism >= 0
+        assert num_bands >= 1
+        assert band_size is None or band_size >= 1
+        self.threshold = threshold
+        self.features = features
+        self.elitism = elitism
+        self.num_bands = num_bands
+        self.band_size = band_size
+        self.rng = make_rng(rng)
+
+        self.reset()
+
+    def start(self, ga):
+        """
+        Forget species before a run begins.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        self.reset()
+
+    def reset(self):
+        """ Forget species, the leader index layout and statistics. """
+        self._bands = None
+        self._leaders = {}  # species id -> leader coordinates
+        self._next_id = 0
+
+        # results of the last ``assign``
+        self.species = {}  # DNA -> species id
+        self.species_sizes = {}  # species id -> number of members
+        self.shared_fitness = {}  # DNA -> shared fitness
+        self.num_distance_checks = 0
+
+    @property
+    def num_species(self):
+        """ Return the number of species found by the last ``assign``. """
+        return len(self.species_sizes)
+
+    def coordinates(self, chromosome):
+        """ Return the sequence that distances are measured between:  a tuple of features, or the DNA itself. """
+        if self.features is not None:
+            return tuple(float(v) for v in self.features(chromosome))
+        return chromosome.dna
+
+    def distance(self, a, b):
+        """ Return the distance between two coordinate sequences. """
+        if self.features is not None:
+            return math.sqrt(sum((x - y) * (x - y) for x, y in zip(a, b)))
+        return sum(x != y for x, y in zip(a, b))
+
+    def _make_bands(self, num_coordinates):
+        """ Sample the coordinates (and, for ``features``, grid offsets) keyed by each hash table. """
+        band_size = self.band_size
+        if band_size is None:
+            if self.features is not None:
+                # a coordinate differing by d of the cell width 2 * threshold falls in another cell
+                # with probability d / (2 * threshold), at most 1/2
+                band_size = 1
+            else:
+                # each sampled element differs with probability threshold / num_coordinates
+                p_band = 1 - 0.1 ** (1 / self.num_bands)
+                p_same = max(1e-9, 1 - self.threshold / num_coordinates)
+                band_size = max(1, int(math.log(p_band) / math.log(p_same)))
+        band_size = min(band_size, num_coordinates)
+
+        bands = []
+        for _ in range(self.num_bands):
+            positions = tuple(sorted(self.rng.sample(range(num_coordinates), band_size)))
+            offsets = tuple(self.rng.random() for _ in positions)
+            bands.append((positions, offsets, operator.itemgetter(*positions)))
+
+        return bands
+
+    def _keys(self, coordinates):
+        """ Return a genome's key in every hash table. """
+        if self.features is None:
+            return [get_key(coordinates) for _, _, get_key in self._bands]
+
+        width = 2 * self.threshold
+        return [tuple(math.floor(coordinates[i] / width + offset) for i, offset in zip(positions, offsets))
+                for positions, offsets, _ in self._bands]
+
+    def assign(self, ga, chromosomes):
+        """
+        Cluster a population into species, and compute its shared fitness.
+        The population's fitness must already be cached (see ``BaseGeneticAlgorithm.evaluate``).
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``
+        chromosomes:  the population
+        """
+        # distinct genomes with their number of copies, fittest first so they lead new species
+        counts = {}
+        for chromosome in chromosomes:
+            dna = chromosome.dna
+            if dna in counts:
+                counts[dna][1] += 1
+            else:
+                counts[dna] = [chromosome, 1]
+        genomes = sorted(counts.values(), key=lambda pair: ga.get_fitness(pair[0]), reverse=True)
+
+        if self._bands is None:
+            self._bands = self._make_bands(len(self.coordinates(genomes[0][0])))
+
+        index = [{} for _ in self._bands]
+
+        def add_leader(species_id, keys):
+            for table, key in zip(index, keys):
+                table.setdefault(key, []).append(species_id)
+
+        for species_id, leader in self._leaders.items():
+            add_leader(species_id, self._keys(leader))
+
+        species = {}
+        sizes = {}
+        fittest = {}
+
+        for chromosome, count in genomes:
+            coordinates = self.coordinates(chromosome)
+            keys = self._keys(coordinates)
+
+            # leaders sharing more keys are likely nearer, so they are tried first
+            collisions = collections.Counter()
+            for table, key in zip(index, keys):
+                collisions.update(table.get(key, ()))
+
+            best_id = None
+            for species_id, _ in collisions.most_common():
+                self.num_distance_checks += 1
+                if self.distance(coordinates, self._leaders[species_id]) <= self.threshold:
+                    best_id = species_id
+                    break
+
+            if best_id is None:
+                best_id = self._next_id
+                self._next_id += 1
+                self._leaders[best_id] = coordinates
+                add_leader(best_id, keys)
+
+            species[chromosome.dna] = best_id
+            sizes[best_id] = sizes.get(best_id, 0) + count
+            if best_id not in fittest:
+                # genomes are visited fittest first
+                fittest[best_id] = coordinates
+
+        # species without members die out, the others are led by their fittest member next generation
+        self._leaders = fittest
+
+        min_fit = ga.get_fitness(genomes[-1][0])
+        self.species = species
+        self.species_sizes = sizes
+        self.shared_fitness = {dna: min_fit + (ga.get_fitness(chromosome) - min_fit) / sizes[species[dna]]
+                               for dna, (chromosome, _) in counts.items()}
+
+    def groups(self, chromosomes):
+        """
+        Return the members of each species found by the last ``assign``, as a dict mapping
+        species ids to lists of chromosomes. Chromosomes that were not assigned are left out.
+        """
+        groups = {}
+        for chromosome in chromosomes:
+            species_id = self.species.get(chromosome.dna)
+            if species_id is not None:
+                groups.setdefault(species_id, []).append(chromosome)
+
+        return groups
+
+    def elites(self, ga, chromosomes):
+        """
+        Return the DNA of the ``elitism`` fittest distinct members of every species found by the last ``assign``.
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``
+        chromosomes:  the population
+        """
+        if not self.elitism:
+            return set()
+
+        elites = set()
+        for members in self.groups(chromosomes).values():
+            fitness = {c.dna: ga.get_fitness(c) for c in members}
+            if len(fitness) <= self.elitism:
+                elites.update(fitness)
+            else:
+                elites.update(sorted(fitness, key=fitness.get, reverse=True)[:self.elitism])
+
+        return elites
@@ -0,0 +1,241 @@
+import abc
+import collections
+import time
+
+from .util import RunningStats, dna_diversity
+
+
+class BaseStoppingCriterion(abc.ABC):
+    """
+    A stopping criterion decides when a genetic algorithm run should end early.
+
+    Criteria are passed to ``BaseGeneticAlgorithm.run`` with the ``stopping`` argument
+    and are checked at the end of every generation. They should be cheap to evaluate,
+    keeping running statistics rather than re-scanning a run's history.
+
+    Criteria can be combined with ``AnyOf`` and ``AllOf``.
+    """
+    # whether ``should_stop`` reads the run's best fitness; such criteria do not apply to
+    # multi-objective runs, which have no single best fitness
+    uses_fitness = False
+
+    def start(self, ga):
+        """
+        Reset any state before a run begins.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        pass
+
+    @abc.abstractmethod
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        """
+        Return whether the run should stop, called at the end of each generation.
+
+        ga:  the running ``algorithms.BaseGeneticAlgorithm``
+        generation:  1-based number of the generation that just finished
+        overall_fittest_fit:  best fitness encountered thus far in the run
+
+        return:  bool
+        """
+        raise NotImplementedError
+
+    def __str__(self):
+        return type(self).__name__
+
+
+class TargetFitness(BaseStoppingCriterion):
+    """ Stop once a fitness at least as good as a target has been found. """
+    uses_fitness = True
+
+    def __init__(self, target):
+        """
+        target:  fitness value that is good enough to stop
+        """
+        self.target = target
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        return overall_fittest_fit >= self.target
+
+    def __str__(self):
+        return 'TargetFitness({})'.format(self.target)
+
+
+class TimeBudget(BaseStoppingCriterion):
+    """ Stop once a run has taken a set amount of wall-clock time. """
+    def __init__(self, seconds):
+        """
+        seconds:  wall-clock time budget for the run
+        """
+        assert seconds > 0
+        self.seconds = seconds
+        self._start_time = None
+
+    def start(self, ga):
+        self._start_time = time.perf_counter()
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        return time.perf_counter() - self._start_time >= self.seconds
+
+    def __str__(self):
+        return 'TimeBudget({}s)'.format(self.seconds)
+
+
+class EvaluationBudget(BaseStoppingCriterion):
+    """ Stop once a run has called ``eval_fitness`` a set number of times. """
+    def __init__(self, max_evaluations):
+        """
+        max_evaluations:  number of (uncached) fitness evaluations the run may perform
+        """
+        assert max_evaluations > 0
+        self.max_evaluations = max_evaluations
+        self._start_evaluations = 0
+
+    def start(self, ga):
+        self._start_evaluations = ga.num_evaluations
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        return ga.num_evaluations - self._start_evaluations >= self.max_evaluations
+
+    def __str__(self):
+        return 'EvaluationBudget({})'.format(self.max_evaluations)
+
+
+class FitnessPlateau(BaseStoppingCriterion):
+    """
+    Stop once the best fitness per generation has stopped improving significantly.
+
+    The most recent ``window`` generation-best fitness values are split into an older and
+    a newer half, and a one-sided Welch z-test checks whether the newer half has a
+    significantly higher mean. If it does not (and it improved by no more than
+    ``min_delta``), the run has plateaued.
+
+    Both halves are kept as running statistics, so each update costs O(1).
+    """
+    uses_fitness = True
+
+    def __init__(self, window=50, z=1.645, min_delta=0):
+        """
+        window (default=50):  number of recent generations to test, at least 4
+        z (default=1.645):  critical z-score for a significant improvement (1.645 ~ 95% one-sided)
+        min_delta (default=0):  improvement in mean fitness between the halves that always counts as progress
+        """
+        assert window >= 4
+        self.window = window
+        self.z = z
+        self.min_delta = min_delta
+
+        self._older = collections.deque()
+        self._newer = collections.deque()
+        self._older_stats = RunningStats()
+        self._newer_stats = RunningStats()
+
+    def start(self, ga):
+        self._older.clear()
+        self._newer.clear()
+        self._older_stats = RunningStats()
+        self._newer_stats = RunningStats()
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        fit = ga.generation_fittest_fit.get(generation, overall_fittest_fit)
+        half = self.window // 2
+
+        # slide the window:  newest value enters the newer half, whose oldest value moves to the older half
+        self._newer.append(fit)
+        self._newer_stats.push(fit)
+
+        if len(self._newer) > half:
+            moved = self._newer.popleft()
+            self._newer_stats.pop(moved)
+            self._older.append(moved)
+            self._older_stats.push(moved)
+
+        if len(self._older) > half:
+            self._older_stats.pop(self._older.popleft())
+
+        if len(self._older) < half:
+            return False
+
+        improvement = self._newer_stats.mean - self._older_stats.mean
+        if improvement > self.min_delta:
+            std_err = (self._older_stats.std_err ** 2 + self._newer_stats.std_err ** 2) ** 0.5
+
+            if std_err == 0 or improvement / std_err >= self.z:
+                return False
+
+        return True
+
+    def __str__(self):
+        return 'FitnessPlateau(window={})'.format(self.window)
+
+
+class DiversityCollapse(BaseStoppingCriterion):
+    """
+    Stop once the population's genetic diversity falls below a threshold.
+
+    See ``util.dna_diversity`` for the diversity measure.
+    """
+    def __init__(self, min_diversity=0.01, every=1):
+        """
+        min_diversity (default=0.01):  diversity in [0, 1) below which the population has collapsed
+        every (default=1):  only measure diversity every N generations, since it costs O(population * length)
+        """
+        assert every >= 1
+        self.min_diversity = min_diversity
+        self.every = every
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        if generation % self.every:
+            return False
+
+        return dna_diversity(ga.chromosomes) < self.min_diversity
+
+    def __str__(self):
+        return 'DiversityCollapse({})'.format(self.min_diversity)
+
+
+class AnyOf(BaseStoppingCriterion):
+    """ Stop as soon as any of several criteria says so. """
+    def __init__(self, *criteria):
+        assert criteria and all(isinstance(c, BaseStoppingCriterion) for c in criteria)
+        self.criteria = criteria
+        self.uses_fitness = any(c.uses_fitness for c in criteria)
+        self.triggered = None
+
+    def start(self, ga):
+        self.triggered = None
+        for criterion in self.criteria:
+            criterion.start(ga)
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        # every criterion is updated so running statistics never miss a generation
+        stop = False
+        for criterion in self.criteria:
+            if criterion.should_stop(ga, generation, overall_fittest_fit) and not stop:
+                self.triggered = criterion
+                stop = True
+
+        return stop
+
+    def __str__(self):
+        if self.triggered is not None:
+            return str(self.triggered)
+        return 'AnyOf({})'.format(', '.join(str(c) for c in self.criteria))
+
+
+class AllOf(BaseStoppingCriterion):
+    """ Stop only when all of several criteria agree. """
+    def __init__(self, *criteria):
+        assert criteria and all(isinstance(c, BaseStoppingCriterion) for c in criteria)
+        self.criteria = criteria
+        self.uses_fitness = any(c.uses_fitness for c in criteria)
+
+    def start(self, ga):
+        for criterion in self.criteria:
+            criterion.start(ga)
+
+    def should_stop(self, ga, generation, overall_fittest_fit):
+        return all([c.should_stop(ga, generation, overall_fittest_fit) for c in self.criteria])
+
+    def __str__(self):
+        return 'AllOf({})'.format(', '.join(str(c) for c in self.criteria))
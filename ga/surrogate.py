@@ -0,0 +1,257 @@
+import collections
+import math
+
+from .util import RunningStats
+
+
+def _ranks(values):
+    """ Return the rank of each value (0 = smallest), with ties given their mean rank. """
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0.0] * len(values)
+    i = 0
+
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2
+        i = j + 1
+
+    return ranks
+
+
+def rank_correlation(a, b):
+    """
+    Return the Spearman rank correlation of two equal-length sequences of numbers,
+    or ``None`` if either has fewer than 2 distinct values.
+    """
+    assert len(a) == len(b)
+    if len(a) < 2:
+        return None
+
+    ra = _ranks(a)
+    rb = _ranks(b)
+    mean = (len(a) - 1) / 2
+    cov = sum((x - mean) * (y - mean) for x, y in zip(ra, rb))
+    var_a = sum((x - mean) ** 2 for x in ra)
+    var_b = sum((y - mean) ** 2 for y in rb)
+
+    if not var_a or not var_b:
+        return None
+
+    return cov / math.sqrt(var_a * var_b)
+
+
+class KNNSurrogate:
+    """
+    Screens offspring with a cheap model of the fitness function, so that only the most
+    promising fraction of each batch is evaluated for real (a surrogate-assisted GA).
+
+    Pass a surrogate to any ``BaseGeneticAlgorithm`` with the ``surrogate`` constructor argument;
+    its ``evaluate`` method then routes every batch of uncached chromosomes through ``screen``.
+
+    The model is distance-weighted k-nearest-neighbor regression on feature vectors:
+    by default the chromosome decoded by the GA's translator (or its DNA elements, without
+    a translator), each dimension scaled by its observed range. It is trained online on every
+    real evaluation, keeping the most recent ``max_samples`` in a training archive.
+
+    Each batch is screened as follows:
+      1. chromosomes already in the training archive get their recorded fitness, at no cost
+      2. until ``min_samples`` evaluations have been made, everything else is evaluated for real
+      3. afterwards, the ``fraction`` of the rest with the highest predicted fitness
+         (at least 1) is evaluated for real, and the others receive their prediction,
+         or ``penalty`` if it is set
+      4. once ``budget`` real evaluations have been made in a run, nothing more is evaluated for real
+
+    Predictions are capped at the best real fitness seen, so only a real evaluation can
+    set a new best solution in a run.
+
+    Accuracy statistics are kept for the current run:  the absolute error of predictions for
+    chromosomes that were then evaluated for real (``abs_error``, a ``util.RunningStats``), and
+    the rank correlation between predicted and real fitness in the last screened batch.
+
+    Assumes the fitness function is deterministic and returns a single number.
+    """
+    def __init__(self, k=5, fraction=0.25, min_samples=20, max_samples=2000, budget=None, penalty=None,
+                 features=None):
+        """
+        k (default=5):  number of nearest neighbors averaged by a prediction
+        fraction (default=0.25):  fraction in (0, 1] of each screened batch that is evaluated for real
+        min_samples (default=20):  real evaluations made before the surrogate starts screening
+        max_samples (default=2000):  size of the training archive (the most recent evaluations are kept)
+        budget (default=None):  maximum number of real evaluations in a run; unlimited if ``None``
+        penalty (default=None):  fitness given to chromosomes that are not evaluated for real,
+                                 instead of their predicted fitness
+        features (default=None):  function mapping a chromosome to a sequence of numbers;
+                                  defaults to the chromosome decoded by the GA's translator
+        """
+        assert k >= 1
+        assert 0 < fraction <= 1
+        assert min_samples >= 1
+        assert max_samples >= k
+        assert budget is None or budget >= 1
+        self.k = k
+        self.fraction = fraction
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.budget = budget
+        self.penalty = penalty
+        self.features = features
+
+        # training archive:  feature tuple -> fitness, oldest first
+        self._samples = collections.OrderedDict()
+        self._lows = None
+        self._highs = None
+        self._best_fitness = None
+
+        self.start(None)
+
+    def start(self, ga):
+        """
+        Reset statistics and the real-evaluation budget before a run begins.
+        The training archive is kept, as the fitness function does not change between runs.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` about to run
+        """
+        self.num_real = 0
+        self.num_predicted = 0
+        self.num_archived = 0
+        self.abs_error = RunningStats()
+        self.last_rank_correlation = None
+
+    def reset(self):
+        """ Forget the training archive and statistics. """
+        self._samples.clear()
+        self._lows = None
+        self._highs = None
+        self._best_fitness = None
+        self.start(None)
+
+    @property
+    def num_samples(self):
+        """ Return the number of real evaluations in the training archive. """
+        return len(self._samples)
+
+    def featurize(self, ga, chromosome):
+        """ Return a chromosome's feature vector as a tuple of floats. """
+        if self.features is not None:
+            values = self.features(chromosome)
+        elif ga.translator is not None:
+            values = ga.translator.translate_chromosome(chromosome)
+        else:
+            values = [e if isinstance(e, (int, float)) else ord(e) for e in chromosome.dna]
+
+        return tuple(float(v) for v in values)
+
+    def add(self, features, fitness):
+        """ Add a real evaluation to the training archive. """
+        self._samples.pop(features, None)
+        self._samples[features] = fitness
+        if len(self._samples) > self.max_samples:
+            self._samples.popitem(last=False)
+
+        if self._lows is None:
+            self._lows = list(features)
+            self._highs = list(features)
+        else:
+            self._lows = [min(low, v) for low, v in zip(self._lows, features)]
+            self._highs = [max(high, v) for high, v in zip(self._highs, features)]
+
+        if self._best_fitness is None or fitness > self._best_fitness:
+            self._best_fitness = fitness
+
+    def predict(self, features):
+        """ Return the predicted fitness for a feature vector, from its ``k`` nearest archived neighbors. """
+        assert self._samples
+
+        if features in self._samples:
+            return self._samples[features]
+
+        # every dimension contributes over the range observed for it
+        scales = [1.0 / (high - low) if high > low else 0.0 for low, high in zip(self._lows, self._highs)]
+        nearest = []
+
+        for sample, fitness in self._samples.items():
+            d = 0.0
+            for x, y, scale in zip(features, sample, scales):
+                diff = (x - y) * scale
+                d += diff * diff
+            nearest.append((d, fitness))
+
+        nearest.sort(key=lambda pair: pair[0])
+        total_weight = 0.0
+        total = 0.0
+
+        for d, fitness in nearest[:self.k]:
+            if d == 0:
+                # same point in scaled feature space
+                return fitness
+            weight = 1.0 / math.sqrt(d)
+            total_weight += weight
+            total += weight * fitness
+
+        return total / total_weight
+
+    def screen(self, ga, chromosomes):
+        """
+        Return fitness values for a batch of uncached chromosomes, evaluating only the most
+        promising ones for real (with the GA's ``eval_fitness_batch``) and predicting the rest.
+
+        ga:  the ``algorithms.BaseGeneticAlgorithm`` whose chromosomes are screened
+        chromosomes:  chromosomes with distinct DNA
+
+        return:  list of fitness values, in the same order as ``chromosomes``
+        """
+        features = [self.featurize(ga, c) for c in chromosomes]
+        fitness = [None] * len(chromosomes)
+        pending = []
+
+        for i, f in enumerate(features):
+            if f in self._samples:
+                fitness[i] = self._samples[f]
+                self.num_archived += 1
+            else:
+                pending.append(i)
+
+        if not pending:
+            return fitness
+
+        remaining = len(pending) if self.budget is None else max(0, self.budget - self.num_real)
+        predictions = {}
+
+        if self.num_samples < self.min_samples:
+            # too few samples to trust the model
+            chosen = pending[:remaining]
+        else:
+            predictions = {i: self.predict(features[i]) for i in pending}
+            pending.sort(key=predictions.get, reverse=True)
+            num_chosen = min(remaining, max(1, int(math.ceil(self.fraction * len(pending)))))
+            chosen = pending[:num_chosen]
+
+        if chosen:
+            real = ga.eval_fitness_batch([chromosomes[i] for i in chosen])
+            ga.num_evaluations += len(chosen)
+            self.num_real += len(chosen)
+
+            for i, fit in zip(chosen, real):
+                fitness[i] = fit
+                self.add(features[i], fit)
+
+            scored = [i for i in chosen if i in predictions]
+            for i in scored:
+                self.abs_error.push(abs(predictions[i] - fitness[i]))
+            if len(scored) >= 2:
+                self.last_rank_correlation = rank_correlation([predictions[i] for i in scored],
+                                                              [fitness[i] for i in scored])
+
+        for i in pending:
+            if fitness[i] is None:
+                if self.penalty is not None:
+                    fitness[i] = self.penalty
+                else:
+                    prediction = predictions[i] if i in predictions else self.predict(features[i])
+                    fitness[i] = min(prediction, self._best_fitness)
+                self.num_predicted += 1
+
+        return fitness
@@ -1,6 +1,7 @@
 import abc
 
 from .chromosomes import Chromosome
+from .genes import get_alphabet
 
 
 class BaseTranslator(abc.ABC):
@@ -38,6 +39,25 @@ class BaseTranslator(abc.ABC):
         assert isinstance(chromosome, Chromosome)
         return [self.translate_gene(g) for g in chromosome]
         
+    def cache_key(self, chromosome):
+        """
+        Return the key under which a chromosome's fitness is cached (see ``BaseGeneticAlgorithm.cache_key``).
+        
+        Translators that decode different DNA into the same solution override this to return the
+        solution, so equivalent chromosomes are evaluated once. The default defers to the chromosome.
+        """
+        return chromosome.cache_key()
+        
+    def params(self):
+        """
+        Return the constructor arguments that recreate this translator, as a dict
+        (e.g. to record it in a population file; see ``serialization``).
+        
+        The default returns the public instance attributes; internal state such as caches
+        is kept in ``_``-prefixed attributes and left out.
+        """
+        return {name: value for name, value in vars(self).items() if not name.startswith('_')}
+        
         
 class BinaryIntTranslator(BaseTranslator):
     """
@@ -51,7 +71,12 @@ class BinaryIntTranslator(BaseTranslator):
 class BinaryFloatTranslator(BaseTranslator):
     """
     A translator that translates binary DNA into base-10 floating point real numbers.
+    
+    Decoded values are remembered per gene DNA (up to ``MAX_CACHED_VALUES`` of them), since
+    short genes repeat throughout a run and each chromosome is decoded for both its cache key and its fitness.
     """
+    MAX_CACHED_VALUES = 65536
+    
     def __init__(self, significand_length, signed=True):
         """
         Construct a new ``BinaryFloatTranslator``.
@@ -61,6 +86,7 @@ class BinaryFloatTranslator(BaseTranslator):
         """
         self.significand_length = significand_length
         self.signed = signed
+        self._values = {}  # gene DNA -> value
 
     def translate_gene(self, gene):
         """
@@ -82,19 +108,36 @@ class BinaryFloatTranslator(BaseTranslator):
           4. The remaining "1" bit is converted into the base-10 integer 1 and becomes -1 due to step (3)
           5. The final result becomes:  3 * 10^-1 = 0.3
         """
+        dna = gene.dna
+        value = self._values.get(dna)
+        if value is not None:
+            return value
+        
         if self.signed:
-            sign = 1 if gene.dna[0] == '0' else -1
+            sign = 1 if dna[0] == '0' else -1
             base_start_idx = 1
         else:
             sign = 1
             base_start_idx = 0
 
-        base = sign * int(gene.dna[base_start_idx:base_start_idx + self.significand_length], base=2)
+        base = sign * int(dna[base_start_idx:base_start_idx + self.significand_length], base=2)
+        
+        exponent_sign = 1 if dna[1 + self.significand_length] == '0' else -1
+        exponent = exponent_sign * int(dna[self.significand_length + 2:], base=2)
         
-        exponent_sign = 1 if gene.dna[1 + self.significand_length] == '0' else -1
-        exponent = exponent_sign * int(gene.dna[self.significand_length + 2:], base=2)
+        value = float(base * 10 ** exponent)
+        if len(self._values) >= self.MAX_CACHED_VALUES:
+            self._values.clear()
+        self._values[dna] = value
         
-        return float(base * 10 ** exponent)
+        return value
+        
+    def cache_key(self, chromosome):
+        """
+        Return the decoded numbers as a tuple:  a zero significand is 0 whatever its sign and
+        exponent bits, and the same number can have several significand/exponent encodings.
+        """
+        return tuple(self.translate_chromosome(chromosome))
         
         
 class Base10IntTranslator(BaseTranslator):
@@ -102,4 +145,33 @@ class Base10IntTranslator(BaseTranslator):
     A translator that translates base-10 DNA into a positive base-10 integer.
     """
     def translate_gene(self, gene):
-        return int(gene.dna)
\ No newline at end of file
+        return int(gene.dna)
+        
+        
+class AlphabetIntTranslator(BaseTranslator):
+    """
+    A translator that reads any gene's DNA as a non-negative integer written in its own alphabet:
+    each character is the digit given by its position in ``GENETIC_MATERIAL_OPTIONS``.
+    
+    For example, ``DNAGene`` DNA "TA" is 1 * 4 + 0 = 4 (A=0, T=1, C=2, G=3), and for ``BinaryGene``
+    and ``Base10Gene`` this gives the same results as ``BinaryIntTranslator`` and ``Base10IntTranslator``.
+    The conversion is done by ``int()`` for alphabets of up to 36 characters.
+    """
+    def translate_gene(self, gene):
+        """ Return the integer represented by a gene's DNA. """
+        return get_alphabet(gene.GENETIC_MATERIAL_OPTIONS).to_int(gene.dna)
+        
+
+class DirectTranslator(BaseTranslator):
+    """
+    A translator for chromosomes that store their solution values directly,
+    such as ``chromosomes.FloatChromosome``. Nothing has to be decoded.
+    """
+    def translate_gene(self, gene):
+        """ Return the value unchanged. """
+        return gene
+        
+    def translate_chromosome(self, chromosome):
+        """ Return a list of the chromosome's values. """
+        assert isinstance(chromosome, Chromosome)
+        return list(chromosome)
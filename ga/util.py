@@ -1,18 +1,115 @@
+import bisect
+import heapq
+import itertools
+import math
 import random
 
 
+def make_rng(rng=None):
+    """
+    Return a random number generator suitable for the ``rng`` arguments used throughout this package.
+    
+    rng:  ``None`` for the global ``random`` module, an int/str/bytes seed for a new ``random.Random``,
+          or an existing ``random.Random`` instance (returned unchanged)
+    
+    return:  ``random`` module or ``random.Random`` instance
+    """
+    if rng is None:
+        return random
+    if isinstance(rng, (int, str, bytes)):
+        return random.Random(rng)
+    return rng
+
+
+def spawn_rngs(rng, n):
+    """
+    Deterministically derive independent child generators from a parent generator,
+    e.g. one per worker process or island.
+    
+    Each child is seeded from 128 bits of parent entropy combined with its index,
+    so the same parent state always spawns the same children, in any execution order.
+    
+    rng:  parent generator or seed (see ``make_rng``)
+    n:  number of child generators to create
+    
+    return:  list of ``n`` ``random.Random`` instances
+    """
+    entropy = make_rng(rng).getrandbits(128)
+    return [random.Random('{}/{}'.format(entropy, i)) for i in range(n)]
+
+
+def mutation_sites(n, p_mutate, rng=None):
+    """
+    Choose the positions of a sequence that mutate, each independently with probability ``p_mutate``.
+    
+    Instead of drawing a number for every position, the gaps between consecutive sites are
+    drawn from the geometric distribution, so the cost is proportional to the number of sites
+    (plus 1 draw) rather than to ``n``; the positions have the same distribution either way.
+    Above ``p_mutate`` = 0.2, where most positions would cost a gap anyway, one plain draw
+    per position is cheaper and is used instead.
+    
+    n:  number of positions
+    p_mutate:  probability in [0, 1] that each position mutates
+    rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
+    
+    return:  list of positions in [0, n), in ascending order
+    """
+    if n <= 0 or p_mutate <= 0:
+        return []
+    if p_mutate >= 1:
+        return list(range(n))
+    
+    rand = (rng or random).random
+    if p_mutate > 0.2:
+        return [i for i in range(n) if rand() < p_mutate]
+        
+    log_q = math.log1p(-p_mutate)
+    sites = []
+    
+    # number of positions skipped before the next site:  floor(log(U) / log(1 - p)), with U in (0, 1]
+    position = int(math.log(1.0 - rand()) / log_q)
+    while position < n:
+        sites.append(position)
+        position += 1 + int(math.log(1.0 - rand()) / log_q)
+        
+    return sites
+    
+    
+def canonical_cycle(items, reversible=True):
+    """
+    Return the same canonical tuple for every rotation of a cyclic sequence, such as a round trip.
+    
+    items:  sequence of distinct, comparable items
+    reversible (default=True):  whether a sequence and its reverse are the same cycle
+                                (e.g. a round trip with symmetric distances)
+    
+    return:  tuple starting with the smallest item, continuing in the direction
+             with the smaller next item if ``reversible``
+    """
+    items = tuple(items)
+    if not items:
+        return items
+    
+    start = items.index(min(items))
+    forward = items[start:] + items[:start]
+    
+    if reversible and len(forward) > 2 and forward[-1] < forward[1]:
+        return forward[:1] + forward[:0:-1]
+    return forward
+    
+    
 def compute_fitness_cdf(chromosomes, ga):
     """
     Return a list of fitness-weighted cumulative probabilities for a set of chromosomes.
     
     chromosomes:  chromosomes to use for fitness-based calculations
-    ga:  ``algorithms.BaseGeneticAlgorithm`` used to obtain fitness values using its ``eval_fitness`` method
+    ga:  ``algorithms.BaseGeneticAlgorithm`` used to obtain fitness values using its ``selection_fitness`` method
     
     return:  list of fitness-weighted cumulative probabilities in [0, 1]
     """
     ga.sort(chromosomes)
     
-    fitness = [ga.eval_fitness(c) for c in chromosomes]
+    fitness = [ga.selection_fitness(c) for c in chromosomes]
     min_fit = min(fitness)
     fit_range = max(fitness) - min_fit
     
@@ -24,23 +121,154 @@ def compute_fitness_cdf(chromosomes, ga):
     return [(fit - min_fit) / fit_range for fit in fitness]
     
     
-def weighted_choice(seq, cdf):
+def weighted_choice(seq, cdf, rng=None):
     """
     Select a random element from a sequence, given cumulative probabilities of selection.
     
     See ``compute_fitness_cdf`` function for obtaining cumulative probabilities.
     
     seq:  sequence to select from
-    cdf:  sequence with 1 cumulative probability value in [0, 1] for each element in ``seq``
+    cdf:  sequence with 1 non-decreasing cumulative probability value in [0, 1] for each element in ``seq``
+    rng (default=None):  ``random.Random`` instance to draw from; defaults to the ``random`` module
     
     return:  randomly selected element
     """
     assert len(seq) == len(cdf)
-    rand = random.random()
+    rand = (rng or random).random()
+    
+    # first element whose cumulative probability exceeds the draw, by binary search
+    i = bisect.bisect_right(cdf, rand)
+    if i < len(seq):
+        return seq[i]
+
+
+def dna_diversity(chromosomes):
+    """
+    Return the mean per-locus diversity of a population's DNA.
+    
+    Diversity at a single DNA position is the probability that two randomly chosen
+    chromosomes have different elements there (Gini-Simpson index). It is 0 when every
+    chromosome is identical and approaches 1 as elements become evenly spread.
+    
+    chromosomes:  chromosomes of equal length
+    
+    return:  diversity in [0, 1)
+    """
+    return dnas_diversity([c.dna for c in chromosomes])
+
+
+def dnas_diversity(dnas):
+    """ Return the mean per-locus diversity of a sequence of DNA values (see ``dna_diversity``). """
+    n = len(dnas)
+    if n < 2:
+        return 0.0
+    
+    total = 0.0
+    num_loci = 0
+    
+    for column in zip(*dnas):
+        counts = {}
+        for element in column:
+            counts[element] = counts.get(element, 0) + 1
+        
+        total += 1 - sum(count * count for count in counts.values()) / (n * n)
+        num_loci += 1
+    
+    return total / num_loci if num_loci else 0.0
+
+
+class RunningStats:
+    """
+    Running count, mean and variance of a stream of values (Welford's algorithm).
+    
+    Values can also be removed again, which lets sliding windows be maintained in O(1) per update.
+    """
+    def __init__(self, values=()):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        
+        for value in values:
+            self.push(value)
+            
+    def push(self, value):
+        """ Add a value. """
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+        
+    def pop(self, value):
+        """ Remove a value that was previously added. """
+        assert self.n > 0
+        
+        if self.n == 1:
+            self.n = 0
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        
+        delta = value - self.mean
+        self.n -= 1
+        self.mean -= delta / self.n
+        self._m2 = max(0.0, self._m2 - delta * (value - self.mean))
+        
+    @property
+    def variance(self):
+        """ Return the unbiased sample variance (0 with fewer than 2 values). """
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+        
+    @property
+    def std_err(self):
+        """ Return the standard error of the mean (0 with fewer than 2 values). """
+        return (self.variance / self.n) ** 0.5 if self.n > 1 else 0.0
+
+
+class EliteArchive:
+    """
+    The ``size`` fittest distinct DNA snapshots seen so far.
     
-    for i, e in enumerate(seq):
-        cp = cdf[i]
-        assert 0 <= cp <= 1
+    Snapshots are immutable DNA values (strings or tuples) rather than chromosome copies,
+    and are kept in a min-heap so offering a candidate costs O(log size).
+    """
+    def __init__(self, size=1):
+        assert size >= 1
+        self.size = size
+        self._heap = []  # (fitness, insertion order, dna); weakest elite first
+        self._members = set()
+        self._counter = itertools.count()
+        
+    def offer(self, dna, fitness):
+        """
+        Offer a DNA snapshot with its fitness.
+        
+        return:  whether it entered the archive
+        """
+        if dna in self._members:
+            return False
+        
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, (fitness, next(self._counter), dna))
+        elif fitness > self._heap[0][0]:
+            _, _, dropped = heapq.heapreplace(self._heap, (fitness, next(self._counter), dna))
+            self._members.discard(dropped)
+        else:
+            return False
+        
+        self._members.add(dna)
+        return True
+        
+    @property
+    def dnas(self):
+        """ Return the archived DNA snapshots, fittest first. """
+        return [dna for _, _, dna in sorted(self._heap, reverse=True)]
+        
+    def clear(self):
+        self._heap.clear()
+        self._members.clear()
+        
+    def __len__(self):
+        return len(self._heap)
         
-        if rand < cp:
-            return e
\ No newline at end of file
+    def __contains__(self, dna):
+        return dna in self._members
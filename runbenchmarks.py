@@ -0,0 +1,448 @@
+from argparse import ArgumentParser
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from ga.algorithms import BaseGeneticAlgorithm
+from ga.cellular import BaseCellularGeneticAlgorithm
+from ga.chromosomes import Chromosome, FloatChromosome, PermutationChromosome
+from ga.evaluators import SharedMemoryEvaluator
+from ga.examples.irrigation import MAP, BatchedIrrigationGA, IrrigationGA
+from ga.examples.polynomials import PolyModelGA
+from ga.examples.travelling_salesman import TravellingSalesmanGA, distance_matrix, random_cities
+from ga.genes import AlphabetGene, Base10Gene, DNAGene
+from ga.initialization import create_population
+from ga.noise import NoisyFitness
+from ga.serialization import PopulationFile, PopulationWriter
+from ga.speciation import Speciation
+from ga.stopping import EvaluationBudget
+from ga.surrogate import KNNSurrogate
+from ga.translators import BinaryIntTranslator
+
+
+def _best_time(fn, repeat):
+    """ Return the fastest of ``repeat`` timings of ``fn()``, in seconds. """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def _eager_copy(chromosome):
+    """ Copy a chromosome the way ``Chromosome.copy`` used to:  rebuild and re-validate every gene. """
+    genes = [type(g)(g.dna, suppressed=g.suppressed, name=g.name) for g in chromosome]
+    return type(chromosome)(genes)
+
+
+def _retry_mutate(gene, p_mutate, rng):
+    """ Mutate a gene the way ``BaseGene.mutate`` used to:  redraw characters until one differs. """
+    new_dna = []
+
+    for element in gene.dna:
+        if rng.random() < p_mutate:
+            new_element = element
+            while new_element == element:
+                new_element = rng.choice(gene.GENETIC_MATERIAL_OPTIONS)
+            element = new_element
+        new_dna.append(element)
+
+    gene.dna = ''.join(new_dna)
+
+
+def _per_bit_mutate(chromosome, p_mutate, rng):
+    """ Mutate a binary chromosome the way ``BinaryGene.mutate`` used to:  one draw per bit, gene by gene. """
+    for gene in chromosome.genes:
+        new_dna = []
+        mutated = False
+
+        for bit in gene.dna:
+            if rng.random() < p_mutate:
+                bit = '1' if bit == '0' else '0'
+                mutated = True
+            new_dna.append(bit)
+
+        if mutated:
+            gene.dna = ''.join(new_dna)
+
+
+def _sum_fitness(solution):
+    return sum(solution)
+
+
+def _evaluate_pickled(chromosome):
+    """ Evaluate a chromosome sent to a worker process by pickling. """
+    return _sum_fitness(BinaryIntTranslator().translate_chromosome(chromosome))
+
+
+class _OneMaxGA(BaseGeneticAlgorithm):
+    """ Counts "1" bits. """
+    def eval_fitness(self, chromosome):
+        return chromosome.dna.count('1')
+
+
+class _CellularOneMaxGA(BaseCellularGeneticAlgorithm):
+    """ Counts "1" bits, on a grid. """
+    def eval_fitness(self, chromosome):
+        return chromosome.dna.count('1')
+
+
+def _matches(a, b):
+    """ Return the number of positions where two sequences are equal. """
+    return sum(x == y for x, y in zip(a, b))
+
+
+class _PeaksGA(BaseGeneticAlgorithm):
+    """ Counts the bits matching the nearest of several equally good target strings. """
+    def __init__(self, peaks, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.peaks = peaks
+
+    def eval_fitness(self, chromosome):
+        return max(_matches(chromosome.dna, peak) for peak in self.peaks)
+
+
+class _DNAKeyedPolyModelGA(PolyModelGA):
+    """ Caches fitness by raw DNA, the way every GA used to. """
+    def cache_key(self, chromosome):
+        return chromosome.dna
+
+
+class _NoisyOneMaxGA(BaseGeneticAlgorithm):
+    """ Counts "1" bits plus Gaussian noise, averaged over ``repeats`` simulated runs per ``eval_fitness`` call. """
+    def __init__(self, *args, sigma=4.0, repeats=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sigma = sigma
+        self.repeats = repeats
+        self.num_simulations = 0
+        self.noise_rng = random.Random(12345)
+
+    def eval_fitness(self, chromosome):
+        ones = chromosome.dna.count('1')
+        self.num_simulations += self.repeats
+        return sum(ones + self.noise_rng.gauss(0, self.sigma) for _ in range(self.repeats)) / self.repeats
+
+
+def bench_reproduce(pop_size=10000, gene_length=(100,) * 10, p_crossover=0.6, p_mutate=0.001, repeat=3):
+    """
+    Time offspring creation (copy, crossover and mutation of ``pop_size`` offspring)
+    with copy-on-write copies versus eagerly rebuilt copies.
+    """
+    rng = random.Random(0)
+    parents = Chromosome.create_random(gene_length, n=pop_size, rng=rng)
+    length = parents[0].length
+
+    def make_offspring(copy_fn):
+        offspring_rng = random.Random(1)
+        offspring = []
+
+        for _ in range(pop_size):
+            c1 = copy_fn(offspring_rng.choice(parents))
+
+            if offspring_rng.random() < p_crossover:
+                c2 = copy_fn(offspring_rng.choice(parents))
+                c1.crossover(c2, offspring_rng.randrange(0, length))
+
+            if p_mutate:
+                c1.mutate(p_mutate, rng=offspring_rng)
+            offspring.append(c1)
+
+        return offspring
+
+    eager_s = _best_time(lambda: make_offspring(_eager_copy), repeat)
+    cow_s = _best_time(lambda: make_offspring(Chromosome.copy), repeat)
+
+    print("reproduce:  {} offspring x {} bits, p_crossover={}, p_mutate={}".format(
+        pop_size, length, p_crossover, p_mutate))
+    print("  eager copies:          {:.3f} s".format(eager_s))
+    print("  copy-on-write copies:  {:.3f} s ({:.1f}x)".format(cow_s, eager_s / cow_s))
+
+
+def bench_offspring_allocation():
+    """ Time offspring creation without mutation, isolating the cost of copying and crossover. """
+    bench_reproduce(p_mutate=0)
+
+
+def bench_population_file(pop_size=1000000, gene_length=(50, 50), sample_size=1000):
+    """ Time writing a large population file, then opening it and drawing a random initial population. """
+    rng = random.Random(0)
+    block = Chromosome.create_random(gene_length, n=1000, rng=rng)
+    path = os.path.join(tempfile.mkdtemp(), 'population.gapop')
+
+    try:
+        t0 = time.perf_counter()
+        with PopulationWriter(path, block[0]) as writer:
+            for _ in range(pop_size // len(block)):
+                writer.write_many(block)
+        write_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with PopulationFile(path) as population:
+            open_s = time.perf_counter() - t0
+            seeds = population.chromosomes(rng.sample(range(len(population)), sample_size))
+            sample_s = time.perf_counter() - t0 - open_s
+
+        print("population file:  {} chromosomes x {} bits, {:.1f} MB".format(
+            pop_size, seeds[0].length, os.path.getsize(path) / 1e6))
+        print("  write:                    {:.3f} s".format(write_s))
+        print("  open:                     {:.2f} ms".format(open_s * 1000))
+        print("  load {} random rows:    {:.2f} ms".format(sample_size, sample_s * 1000))
+    finally:
+        os.remove(path)
+        os.rmdir(os.path.dirname(path))
+
+
+def bench_initialization(pop_size=100000, gene_length=1000, repeat=3):
+    """ Time creating a random population chromosome by chromosome versus in one bulk draw. """
+    # chromosome-by-chromosome creation is timed on a tenth of the population and scaled up
+    per_chromosome_s = _best_time(lambda: Chromosome.create_random(gene_length, n=pop_size // 10, rng=1), repeat) * 10
+    bulk_s = _best_time(lambda: create_population(gene_length, pop_size, rng=1), repeat)
+
+    print("initialization:  {} chromosomes x {} bits".format(pop_size, gene_length))
+    print("  Chromosome.create_random:  {:.3f} s (estimated from {} chromosomes)".format(per_chromosome_s, pop_size // 10))
+    print("  create_population:         {:.3f} s ({:.1f}x)".format(bulk_s, per_chromosome_s / bulk_s))
+
+
+def bench_alphabet_mutation(num_genes=1000, gene_length=1000, p_mutate=(0.01, 0.5), repeat=3):
+    """ Time mutation of non-binary genes with integer-coded offsets versus redraw-until-different. """
+    print("alphabet mutation:  {} genes x {} elements".format(num_genes, gene_length))
+
+    for gene_class in (DNAGene, Base10Gene, AlphabetGene):
+        genes = [gene_class.create_random(gene_length, rng=i) for i in range(num_genes)]
+
+        for p in p_mutate:
+            retry_s = _best_time(lambda: [_retry_mutate(g, p, random.Random(1)) for g in genes], repeat)
+            coded_s = _best_time(lambda: [g.mutate(p, rng=random.Random(1)) for g in genes], repeat)
+
+            print("  {:<12} p_mutate={:<5} redraw {:.3f} s, offset codes {:.3f} s ({:.1f}x)".format(
+                gene_class.__name__, p, retry_s, coded_s, retry_s / coded_s))
+
+
+def bench_sparse_mutation(pop_size=1000, gene_length=(100,) * 10, p_mutate=(0.001, 0.01, 0.1), repeat=3):
+    """ Time mutation of binary chromosomes with one draw per bit versus geometric gaps between mutation sites. """
+    population = Chromosome.create_random(gene_length, n=pop_size, rng=0)
+    print("sparse mutation:  {} chromosomes x {} bits".format(pop_size, sum(gene_length)))
+
+    for p in p_mutate:
+        per_bit_s = _best_time(lambda: [_per_bit_mutate(c, p, random.Random(1)) for c in population], repeat)
+        sparse_s = _best_time(lambda: [c.mutate(p, rng=random.Random(1)) for c in population], repeat)
+
+        print("  p_mutate={:<6} per bit {:.3f} s, mutation sites {:.3f} s ({:.1f}x)".format(
+            p, per_bit_s, sparse_s, per_bit_s / sparse_s))
+
+
+def bench_shared_memory(pop_sizes=(10000, 100000), gene_length=(16,) * 8, processes=4, repeat=3):
+    """ Time evaluating a population in worker processes via shared memory versus a pickling process pool. """
+    print("process-pool evaluation:  {} processes, {} bits per chromosome".format(processes, sum(gene_length)))
+
+    for pop_size in pop_sizes:
+        chromosomes = Chromosome.create_random(gene_length, n=pop_size, rng=0)
+        chunk_size = max(1, pop_size // (processes * 4))
+
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_evaluate_pickled, chromosomes[:processes])  # start the workers
+            pickle_s = _best_time(lambda: pool.map(_evaluate_pickled, chromosomes, chunk_size), repeat)
+
+        with SharedMemoryEvaluator(_sum_fitness, translator=BinaryIntTranslator(), processes=processes) as evaluator:
+            evaluator.evaluate(chromosomes)  # start the workers and allocate segments
+            shared_s = _best_time(lambda: evaluator.evaluate(chromosomes), repeat)
+
+        print("  {:>7} chromosomes:  pickled {:.3f} s, shared memory {:.3f} s ({:.1f}x)".format(
+            pop_size, pickle_s, shared_s, pickle_s / shared_s))
+
+
+def bench_batched_runs(num_runs=200, generations=500, sequential_runs=5):
+    """ Time ``IrrigationGA``-sized replicate runs evolved one ``run()`` at a time versus all at once. """
+    def sequential():
+        for seed in range(sequential_runs):
+            chromosomes = Chromosome.create_random((7, 6), n=20, rng=seed)
+            IrrigationGA(MAP, 51, 91, 9, chromosomes, rng=seed).run(generations, 0.10, 0.65)
+
+    sequential_s = _best_time(sequential, 1) / sequential_runs
+
+    batched_ga = BatchedIrrigationGA(MAP, 51, 91, 9, (7, 6), 20, num_runs, rng=0)
+    batched_s = _best_time(lambda: batched_ga.run(generations, 0.10, 0.65), 1)
+
+    print("batched runs:  {} generations of 20 chromosomes x 13 bits".format(generations))
+    print("  sequential:  {:.3f} s per run (mean of {} runs)".format(sequential_s, sequential_runs))
+    print("  batched:     {:.3f} s for {} runs, {:.4f} s per run ({:.1f}x), same time as {:.1f} sequential runs".format(
+        batched_s, num_runs, batched_s / num_runs, sequential_s * num_runs / batched_s, batched_s / sequential_s))
+
+
+def bench_startup(repeat=20):
+    """ Time starting a fresh interpreter that imports parts of the package, as a worker process or CLI does. """
+    def start(code):
+        return _best_time(lambda: subprocess.run([sys.executable, '-c', code], check=True), repeat)
+
+    interpreter_s = start('pass')
+    print("startup:  python -c (best of {}), minus {:.1f} ms for a bare interpreter".format(repeat, interpreter_s * 1000))
+
+    for label, code in (('import ga', 'import ga'),
+                        ('import ga.algorithms', 'import ga.algorithms'),
+                        ('import ga.examples', 'import ga.examples'),
+                        ('every module (eager)', 'import ga; [getattr(ga, name) for name in ga.__all__]; '
+                                                 'import ga.examples; [getattr(ga.examples, name) for name in ga.examples.__all__]')):
+        print("  {:<22} {:6.1f} ms".format(label, (start(code) - interpreter_s) * 1000))
+
+
+def bench_surrogate(budgets=(500, 2000), seeds=range(5)):
+    """ Compare the real-valued polynomial fit reached within a fixed number of real evaluations, with and without a surrogate. """
+    def final_error(seed, budget, surrogate):
+        chromosomes = FloatChromosome.create_random(((-2, 2),) * 4, n=20, rng=seed, mutation='polynomial', eta=50)
+        poly_ga = PolyModelGA((0.001, 0.01, 0.1, 1), 10, 8, chromosomes, abs_fit_weight=1, rel_fit_weight=0,
+                              rng=seed, surrogate=surrogate)
+        best = poly_ga.run(1000000, 0.15, 0.5, stopping=EvaluationBudget(budget))
+        return -poly_ga.eval_fitness(best)
+
+    results = []
+    for budget in budgets:
+        plain = [final_error(seed, budget, None) for seed in seeds]
+        surrogates = [KNNSurrogate() for _ in seeds]
+        screened = [final_error(seed, budget, surrogate) for seed, surrogate in zip(seeds, surrogates)]
+        results.append((budget, plain, screened, surrogates))
+
+    print("surrogate:  polynomial fit error after a fixed number of real evaluations (mean of {} seeds)".format(len(seeds)))
+    for budget, plain, screened, surrogates in results:
+        print("  {:>5} evaluations:  plain {:.2f}, surrogate {:.2f} ({:.0f} predicted, mean abs. error {:.2f})".format(
+            budget, sum(plain) / len(plain), sum(screened) / len(screened),
+            sum(s.num_predicted for s in surrogates) / len(surrogates),
+            sum(s.abs_error.mean for s in surrogates) / len(surrogates)))
+
+
+def bench_noise(seeds=range(8), generations=150):
+    """ Compare simulator calls and the true fitness of the result on a noisy problem:  one sample, fixed averaging, racing. """
+    def trial(seed, repeats, noise):
+        chromosomes = Chromosome.create_random(40, n=20, rng=seed)
+        noisy_ga = _NoisyOneMaxGA(chromosomes, rng=seed, repeats=repeats, noise=noise)
+        best = noisy_ga.run(generations, 0.02, 0.6)
+        return best.dna.count('1'), noisy_ga.num_simulations
+
+    print("noisy fitness:  40-bit OneMax + N(0, 4) noise, {} generations (mean of {} seeds)".format(generations, len(seeds)))
+
+    for label, repeats, make_noise in (('1 sample', 1, lambda: None),
+                                       ('mean of 5 samples', 5, lambda: None),
+                                       ('mean of 10 samples', 10, lambda: None),
+                                       ('racing, max. 15', 1, lambda: NoisyFitness(max_samples=15)),
+                                       ('racing, max. 30', 1, lambda: NoisyFitness(max_samples=30))):
+        results = [trial(seed, repeats, make_noise()) for seed in seeds]
+        print("  {:<20} best has {:.2f} ones, {:>8.0f} simulator calls".format(
+            label, sum(r[0] for r in results) / len(results), sum(r[1] for r in results) / len(results)))
+
+
+def bench_cellular(sides=(32, 64, 128), gene_length=64, generations=10):
+    """ Compare generation time, fitness evaluations and progress of a panmictic GA and a cellular GA as the population grows. """
+    print("cellular:  {}-bit OneMax, {} generations".format(gene_length, generations))
+
+    for side in sides:
+        pop_size = side * side
+        chromosomes = Chromosome.create_random(gene_length, n=pop_size, rng=0)
+        runs = [('panmictic', _OneMaxGA([c.copy() for c in chromosomes], rng=0))]
+        for update in ('synchronous', 'asynchronous'):
+            runs.append((update, _CellularOneMaxGA([c.copy() for c in chromosomes], side, update=update, rng=0)))
+
+        for label, ga in runs:
+            ga.run(generations, 0.01, 0.6)
+            print("  {:>5} ({:>3}x{:<3}) {:<13} {:6.1f} ms/generation, {:5.1f} us/chromosome, {:>6} evaluations, best {}".format(
+                pop_size, side, side, label, ga.run_time_s / generations * 1000, ga.run_time_s / generations / pop_size * 1e6,
+                ga.num_evaluations, ga.overall_fittest_fit[generations]))
+
+
+def bench_speciation(gene_length=60, num_peaks=4, pop_size=200, generations=150, seeds=range(4)):
+    """ Count the optima of a multi-modal problem kept in the final population, with and without speciation. """
+    rng = random.Random(7)
+    peaks = [''.join(rng.choice('01') for _ in range(gene_length)) for _ in range(num_peaks)]
+
+    print("speciation:  {} random {}-bit optima, {} chromosomes, {} generations (mean of {} seeds)".format(
+        num_peaks, gene_length, pop_size, generations, len(seeds)))
+
+    for threshold in (None, gene_length // 3, 2 * gene_length // 5):
+        kept = []
+        run_times = []
+        checks = []
+        for seed in seeds:
+            speciation = Speciation(threshold, rng=seed) if threshold else None
+            peaks_ga = _PeaksGA(peaks, Chromosome.create_random(gene_length, n=pop_size, rng=seed), rng=seed,
+                                speciation=speciation)
+            peaks_ga.run(generations, 1 / gene_length, 0.6)
+            # an optimum is kept if some chromosome matches at least 90% of it
+            kept.append(sum(any(_matches(c.dna, peak) >= 0.9 * gene_length for c in peaks_ga.chromosomes)
+                            for peak in peaks))
+            run_times.append(peaks_ga.run_time_s)
+            if speciation is not None:
+                checks.append(speciation.num_distance_checks / generations)
+
+        label = 'threshold {}'.format(threshold) if threshold else 'no speciation'
+        print("  {:<14} {:.2f} optima kept, {:.2f} s per run{}".format(
+            label, sum(kept) / len(kept), sum(run_times) / len(run_times),
+            ", {:.0f} distance checks per generation (pairwise:  {})".format(
+                sum(checks) / len(checks), pop_size * (pop_size - 1) // 2) if checks else ''))
+
+
+def bench_cache_keys(significand_lengths=(2, 3, 8), generations=1000, seeds=range(3)):
+    """ Count fitness evaluations with fitness cached by raw DNA versus by canonical cache key. """
+    print("cache keys:  fitness evaluations in {} generations (mean of {} seeds)".format(generations, len(seeds)))
+
+    for significand_length in significand_lengths:
+        gene_length = (1 + significand_length + 1 + 2,) * 4
+        results = []
+        for ga_class in (_DNAKeyedPolyModelGA, PolyModelGA):
+            evaluations = []
+            for seed in seeds:
+                chromosomes = Chromosome.create_random(gene_length, n=20, rng=seed)
+                poly_ga = ga_class((0.001, 0.01, 0.1, 1), 10, significand_length, chromosomes, rng=seed)
+                poly_ga.run(generations, 0.05, 0.6)
+                evaluations.append(poly_ga.num_evaluations)
+            results.append(sum(evaluations) / len(evaluations))
+
+        print("  PolyModelGA, {}-bit significands:  DNA {:.0f}, decoded {:.0f} ({:.1%} fewer)".format(
+            significand_length, results[0], results[1], 1 - results[1] / results[0]))
+
+    distances = distance_matrix(random_cities(20, rng=100))
+    results = []
+    for canonical_tours in (False, True):
+        evaluations = []
+        for seed in seeds:
+            tsp_ga = TravellingSalesmanGA(distances, PermutationChromosome.create_random(20, n=20, rng=seed), rng=seed,
+                                          canonical_tours=canonical_tours)
+            tsp_ga.run(generations, 0.1, 0.6)
+            evaluations.append(tsp_ga.num_evaluations)
+        results.append(sum(evaluations) / len(evaluations))
+
+    print("  TravellingSalesmanGA, 20 cities:  DNA {:.0f}, canonical tours {:.0f} ({:.1%} fewer)".format(
+        results[0], results[1], 1 - results[1] / results[0]))
+
+
+BENCHMARKS = {
+    'reproduce': bench_reproduce,
+    'offspring_allocation': bench_offspring_allocation,
+    'population_file': bench_population_file,
+    'initialization': bench_initialization,
+    'alphabet_mutation': bench_alphabet_mutation,
+    'sparse_mutation': bench_sparse_mutation,
+    'shared_memory': bench_shared_memory,
+    'batched_runs': bench_batched_runs,
+    'startup': bench_startup,
+    'surrogate': bench_surrogate,
+    'noise': bench_noise,
+    'cellular': bench_cellular,
+    'speciation': bench_speciation,
+    'cache_keys': bench_cache_keys,
+}
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Run performance benchmarks')
+    parser.add_argument('names', help='benchmarks to run (default: all): ' + ', '.join(sorted(BENCHMARKS)), nargs='*')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmark(s): {} (choose from {})'.format(', '.join(unknown), ', '.join(sorted(BENCHMARKS))))
+
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,21 @@
+"""
+Child program for the ``SubprocessEvaluator`` tests:  the ``onemax_child`` example, except that
+DNA "0000" makes the process exit and DNA "1111" makes it hang.
+"""
+import os
+import time
+
+from ga.evaluators import serve
+from ga.examples.onemax_child import fitness
+
+
+def faulty_fitness(solution):
+    if solution == '0000':
+        os._exit(1)
+    if solution == '1111':
+        time.sleep(60)
+    return fitness(solution)
+
+
+if __name__ == '__main__':
+    serve(faulty_fitness)
@@ -0,0 +1,34 @@
+import pytest
+
+from ga.cellular import BaseCellularGeneticAlgorithm
+from ga.chromosomes import Chromosome
+from ga.speciation import Speciation
+from ga.surrogate import KNNSurrogate
+
+
+class CellularOneMaxGA(BaseCellularGeneticAlgorithm):
+    def eval_fitness(self, chromosome):
+        return chromosome.dna.count('1')
+
+
+def test_asynchronous_offspring_respect_surrogate_budget():
+    surrogate = KNNSurrogate(budget=150)
+    ga = CellularOneMaxGA(Chromosome.create_random(32, n=64, rng=0), 8, update='asynchronous',
+                          surrogate=surrogate, rng=0)
+    ga.run(10, 0.05, 0.6)
+
+    assert surrogate.num_real == ga.num_evaluations == 150
+    assert surrogate.num_predicted > 0
+
+
+def test_run_times_phases():
+    for update in ('synchronous', 'asynchronous'):
+        ga = CellularOneMaxGA(Chromosome.create_random(32, n=64, rng=0), 8, update=update, rng=0)
+        ga.run(3, 0.05, 0.6)
+
+        assert {'breed', 'evaluate'} <= set(ga.phase_time_s)
+
+
+def test_rejects_speciation():
+    with pytest.raises(ValueError):
+        CellularOneMaxGA(Chromosome.create_random(32, n=64, rng=0), 8, speciation=Speciation(threshold=4), rng=0)
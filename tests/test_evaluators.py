@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+from ga.chromosomes import Chromosome
+from ga.evaluators import EvaluationError, SharedMemoryEvaluator, SubprocessEvaluator
+from ga.genes import BinaryGene
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = dict(os.environ, PYTHONPATH=ROOT)
+ONEMAX_CHILD = [sys.executable, '-m', 'ga.examples.onemax_child']
+FAULTY_CHILD = [sys.executable, os.path.join(ROOT, 'tests', 'evaluator_child.py')]
+
+
+def chromosomes(*dnas):
+    return [Chromosome([BinaryGene(dna)]) for dna in dnas]
+
+
+def test_batch():
+    batch = Chromosome.create_random(16, n=20, rng=0)
+
+    with SubprocessEvaluator(ONEMAX_CHILD, processes=3, env=ENV) as evaluator:
+        assert evaluator.evaluate(batch) == [c.dna.count('1') for c in batch]
+        assert evaluator.evaluate(batch[:2]) == [c.dna.count('1') for c in batch[:2]]
+        assert evaluator.num_requests == 22
+        assert evaluator.num_restarts == evaluator.num_failures == 0
+
+
+def test_crash_restarts_worker():
+    with SubprocessEvaluator(FAULTY_CHILD, processes=2, failure_fitness=-1, max_retries=1, env=ENV) as evaluator:
+        assert evaluator.evaluate(chromosomes('0110', '0000', '0111')) == [2, -1, 3]
+        # the request was retried once in a restarted worker, which crashed again
+        assert evaluator.num_restarts == 2
+        assert evaluator.num_failures == 1
+
+        # the restarted workers keep serving
+        assert evaluator.evaluate(chromosomes('0100', '1110')) == [1, 3]
+
+
+def test_crash_raises_without_failure_fitness():
+    with SubprocessEvaluator(FAULTY_CHILD, max_retries=0, env=ENV) as evaluator:
+        with pytest.raises(EvaluationError):
+            evaluator.evaluate(chromosomes('0000'))
+
+        assert evaluator.evaluate(chromosomes('0101')) == [2]
+
+
+def test_timeout_restarts_worker():
+    with SubprocessEvaluator(FAULTY_CHILD, processes=2, timeout=0.5, failure_fitness=-1, env=ENV) as evaluator:
+        assert evaluator.evaluate(chromosomes('1111', '1000', '1100')) == [-1, 1, 2]
+        assert evaluator.num_restarts == 1
+        assert evaluator.num_failures == 1
+
+        assert evaluator.evaluate(chromosomes('1010')) == [2]
+
+
+def count_ones(dna):
+    return dna.count('1')
+
+
+def test_shared_memory_batch():
+    batch = Chromosome.create_random((4, 12), n=30, rng=0)
+
+    with SharedMemoryEvaluator(count_ones, processes=2) as evaluator:
+        assert evaluator.evaluate(batch) == [c.dna.count('1') for c in batch]
+
+
+def test_shared_memory_rejects_mixed_layouts():
+    batch = Chromosome.create_random((4, 12), n=3, rng=0) + Chromosome.create_random((8, 8), n=3, rng=0)
+
+    with SharedMemoryEvaluator(count_ones, processes=2) as evaluator:
+        with pytest.raises(ValueError):
+            evaluator.evaluate(batch)
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from ga import kernels
+from ga.chromosomes import PermutationChromosome
+
+
+def _cases(seed=0, num_cases=50):
+    """ Yield random populations:  sorted fitness, CDF, draws, orderings and crossover segments. """
+    rng = random.Random(seed)
+    for _ in range(num_cases):
+        n = rng.randrange(2, 40)
+        fitness = sorted(rng.uniform(-5, 5) for _ in range(n))
+        cdf = [sum(range(i + 1)) / sum(range(n)) for i in range(n)]
+        rands = [rng.random() for _ in range(n)]
+        keep = rng.sample(range(n), n)
+        fill = rng.sample(range(n), n)
+        start = rng.randrange(n)
+        end = rng.randrange(start, n)
+        yield fitness, cdf, rands, keep, fill, start, end
+
+
+def test_python_loops_match_reference_implementations():
+    # the loops compiled for numba are only called directly by the numba backend
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        out = [None] * len(rands)
+        kernels._cdf_indices(cdf, rands, out)
+        assert out == kernels.cdf_indices(cdf, rands, backend='python')
+
+        child = [None] * len(keep)
+        kernels._order_crossover(keep, fill, start, end, child)
+        assert child == PermutationChromosome._order_crossover(keep, fill, start, end)
+
+
+def test_swap_mutation_keeps_items():
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        values = list(keep)
+        kernels.swap_mutation(values, rands, 0.2, backend='python')
+        assert sorted(values) == sorted(keep)
+
+
+def test_numba_backend_is_loaded_lazily():
+    # the backend is chosen without importing numba; it is imported on first use
+    assert kernels.BACKEND in kernels.BACKENDS
+    if kernels.BACKEND == 'python':
+        assert kernels._NUMBA is None
+
+
+@pytest.fixture
+def numba_backend():
+    pytest.importorskip('numba')
+    return 'numba'
+
+
+def test_survival_mask_parity(numba_backend):
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        args = (fitness, rands, fitness[0] - 1, fitness[-1] + 1, 0.25, 0.75)
+        assert kernels.survival_mask(*args, backend=numba_backend) == kernels.survival_mask(*args, backend='python')
+
+
+def test_cdf_indices_parity(numba_backend):
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        assert kernels.cdf_indices(cdf, rands, backend=numba_backend) == kernels.cdf_indices(cdf, rands, backend='python')
+
+
+def test_swap_mutation_parity(numba_backend):
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        for p_mutate in (0.0, 0.1, 1.0):
+            numba_values = list(keep)
+            python_values = list(keep)
+            assert (kernels.swap_mutation(numba_values, rands, p_mutate, backend=numba_backend) ==
+                    kernels.swap_mutation(python_values, rands, p_mutate, backend='python'))
+            assert numba_values == python_values
+
+
+def test_order_crossover_parity(numba_backend):
+    for fitness, cdf, rands, keep, fill, start, end in _cases():
+        assert (kernels.order_crossover(keep, fill, start, end, backend=numba_backend) ==
+                kernels.order_crossover(keep, fill, start, end, backend='python'))
@@ -0,0 +1,55 @@
+import socket
+
+import pytest
+
+from ga.algorithms import BaseGeneticAlgorithm
+from ga.chromosomes import Chromosome
+from ga.metrics import MetricsExporter
+
+
+class FailingOneMaxGA(BaseGeneticAlgorithm):
+    """ Counts 1's, and raises after a set number of evaluations. """
+    def __init__(self, *args, max_evaluations=50, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_evaluations = max_evaluations
+        self.calls = 0
+
+    def eval_fitness(self, chromosome):
+        self.calls += 1
+        if self.calls > self.max_evaluations:
+            raise RuntimeError('simulator failed')
+        return chromosome.dna.count('1')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_failed_run_releases_port():
+    port = free_port()
+    metrics = MetricsExporter(port=port)
+    ga = FailingOneMaxGA(Chromosome.create_random(16, n=10, rng=0), rng=0)
+
+    with pytest.raises(RuntimeError):
+        ga.run(100, 0.1, 0.6, metrics=metrics)
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', port))
+
+
+def test_port_zero_picks_a_free_port_on_each_start():
+    metrics = MetricsExporter(port=0)
+    ga = FailingOneMaxGA(Chromosome.create_random(16, n=10, rng=0), max_evaluations=10 ** 6, rng=0)
+
+    ga.run(2, 0.1, 0.6, metrics=metrics)
+    first_port = metrics.port
+    metrics.close()
+
+    # hold the first port so a second start cannot reuse it
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', first_port))
+        ga.run(2, 0.1, 0.6, metrics=metrics)
+        assert metrics.port not in (0, first_port)
+        metrics.close()
@@ -0,0 +1,25 @@
+import pytest
+
+from ga.chromosomes import Chromosome
+from ga.multiobjective import BaseMultiObjectiveGA
+from ga.stopping import EvaluationBudget, FitnessPlateau, TargetFitness
+
+
+class OnesZerosGA(BaseMultiObjectiveGA):
+    """ Maximizes the numbers of both 1's and 0's. """
+    def eval_fitness(self, chromosome):
+        return chromosome.dna.count('1'), chromosome.dna.count('0')
+
+
+def test_rejects_fitness_based_stopping():
+    for stopping in (TargetFitness(10), FitnessPlateau(), [EvaluationBudget(100), TargetFitness(10)]):
+        ga = OnesZerosGA(Chromosome.create_random(16, n=10, rng=0), rng=0)
+        with pytest.raises(ValueError):
+            ga.run(5, 0.05, 0.6, stopping=stopping)
+
+
+def test_stops_on_evaluation_budget():
+    ga = OnesZerosGA(Chromosome.create_random(16, n=10, rng=0), rng=0)
+    budget = EvaluationBudget(100)
+    ga.run(1000, 0.05, 0.6, stopping=budget)
+    assert ga.stopped_by is budget
@@ -0,0 +1,52 @@
+import mmap
+
+import pytest
+
+from ga.chromosomes import Chromosome
+from ga.serialization import PopulationFile, PopulationWriter, write_population
+from ga.translators import BinaryFloatTranslator
+
+
+def test_binary_float_translator_round_trip(tmp_path):
+    translator = BinaryFloatTranslator(3, signed=False)
+    chromosomes = Chromosome.create_random((8, 8), n=5, rng=1)
+    # fill the translator's memo of decoded genes
+    values = [translator.translate_chromosome(c) for c in chromosomes]
+
+    path = str(tmp_path / 'population.gapop')
+    write_population(path, chromosomes, translator=translator)
+
+    with PopulationFile(path) as population:
+        loaded = population.translator
+        assert type(loaded) is BinaryFloatTranslator
+        assert loaded.params() == {'significand_length': 3, 'signed': False}
+        assert [c.dna for c in population.chromosomes()] == [c.dna for c in chromosomes]
+        assert [loaded.translate_chromosome(c) for c in population.chromosomes()] == values
+
+
+def test_open_closes_file_when_mmap_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / 'population.gapop')
+    write_population(path, Chromosome.create_random(8, n=2, rng=0))
+
+    class FailingMmap(mmap.mmap):
+        def __new__(cls, *args, **kwargs):
+            raise OSError('mmap failed')
+
+    monkeypatch.setattr(mmap, 'mmap', FailingMmap)
+    with pytest.raises(OSError, match='mmap failed'):
+        PopulationFile(path)
+
+
+def test_writer_rejects_other_gene_lengths(tmp_path):
+    path = str(tmp_path / 'population.gapop')
+    template = Chromosome.create_random((8, 8), rng=0)
+
+    with PopulationWriter(path, template) as writer:
+        writer.write(template)
+        with pytest.raises(ValueError):
+            writer.write(Chromosome.create_random((4, 12), rng=0))
+        with pytest.raises(ValueError):
+            writer.write_many([template, Chromosome.create_random((8, 4, 4), rng=0)])
+
+    with PopulationFile(path) as population:
+        assert [c.dna for c in population.chromosomes()] == [template.dna]
@@ -0,0 +1,24 @@
+from ga.algorithms import BaseGeneticAlgorithm
+from ga.chromosomes import Chromosome
+from ga.speciation import Speciation
+
+
+class RecordingOneMaxGA(BaseGeneticAlgorithm):
+    """ Counts 1's, and records the DNA of every species elite chosen by ``compete``. """
+    def eval_fitness(self, chromosome):
+        return chromosome.dna.count('1')
+
+    def compete(self, chromosomes):
+        survivors = super().compete(chromosomes)
+        self.elite_dnas = self.speciation.elites(self, chromosomes)
+        return survivors
+
+
+def test_species_elites_survive_a_generation():
+    for seed in range(5):
+        chromosomes = Chromosome.create_random(64, n=30, rng=seed)
+        ga = RecordingOneMaxGA(chromosomes, rng=seed, speciation=Speciation(8, rng=seed))
+        ga.run(1, 0.05, 0.6)
+
+        assert len(ga.elite_dnas) > 1
+        assert ga.elite_dnas <= {c.dna for c in ga.chromosomes}
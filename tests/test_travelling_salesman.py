@@ -0,0 +1,35 @@
+import pytest
+
+from ga.examples.travelling_salesman import distance_matrix, read_tsplib
+
+
+TSPLIB = """NAME : square4
+TYPE : TSP
+DIMENSION : 4
+EDGE_WEIGHT_TYPE : {}
+NODE_COORD_SECTION
+1 0 0
+2 3 0
+3 3 4
+4 0 4
+EOF
+"""
+
+
+def write_instance(tmp_path, edge_weight_type):
+    path = tmp_path / 'square4.tsp'
+    path.write_text(TSPLIB.format(edge_weight_type))
+    return str(path)
+
+
+def test_read_euc_2d(tmp_path):
+    points = read_tsplib(write_instance(tmp_path, 'EUC_2D'))
+
+    assert points == [(0, 0), (3, 0), (3, 4), (0, 4)]
+    assert list(distance_matrix(points, rounded=True)[0]) == [0, 3, 5, 4]
+
+
+@pytest.mark.parametrize('edge_weight_type', ['GEO', 'ATT', 'CEIL_2D', 'EXPLICIT'])
+def test_read_rejects_other_edge_weight_types(tmp_path, edge_weight_type):
+    with pytest.raises(ValueError):
+        read_tsplib(write_instance(tmp_path, edge_weight_type))